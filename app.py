@@ -1,7 +1,18 @@
 import streamlit as st
 import pandas as pd
-import joblib
+import io
 import os
+import time
+
+import inference_client
+import model_registry
+import tracing
+from image_assets import show_image
+from paged_table import PagedTable, render_paged_table
+from prediction_cache import PredictionCache
+from score_model import predict_in_chunks
+from student_aggregates import FOCUS_MAJOR, build_aggregates, data_version, major_slice
+from student_store import load_students
 
 # 全局变量：截图列表
 SCREENSHOTS = [
@@ -18,485 +29,573 @@ st.set_page_config(
     initial_sidebar_state='expanded'
 )
 
-# 加载模型和数据
-@st.cache_resource
-def load_model():
-    model = joblib.load('score_prediction_model.pkl')
-    features = joblib.load('features.pkl')
-    return model, features
+# 加载模型和数据；模型和预测缓存以注册表中的模型版本为缓存键，发布新版本后自动改用新模型
+@st.cache_resource(max_entries=2)
+def load_model(model_version):
+    # 从模型注册表加载展开后的随机森林引擎，数组以只读内存映射方式在多个进程间共享；
+    # 预测时绕过sklearn每次调用的校验开销
+    artifact = model_registry.load('student_score', model_version)
+    return artifact['engine'], artifact['features']
 
+# 预测结果缓存，所有会话共享，每个模型版本一份；容量和存活时间（秒）可通过环境变量配置
+@st.cache_resource(max_entries=2)
+def load_prediction_cache(model_version):
+    return PredictionCache(
+        maxsize=int(os.environ.get('PREDICTION_CACHE_SIZE', 4096)),
+        ttl=float(os.environ.get('PREDICTION_CACHE_TTL', 3600))
+    )
+
+# 数据和统计结果都以数据版本号为缓存键，CSV文件更新后自动重新计算
 @st.cache_data
-def load_data():
-    return pd.read_csv('student_data_adjusted_rounded.csv')
+def load_data(version):
+    return load_students()
+
+@st.cache_data
+def load_aggregates(version):
+    return build_aggregates(load_data(version))
+
+# 各专业详细数据的分页表格，各列排序顺序只计算一次，所有会话共享
+@st.cache_resource
+def load_detail_table(version, major):
+    return PagedTable(major_slice(load_aggregates(version)['major_index'], major))
 
-model, features = load_model()
-df = load_data()
+def shift_screenshot(step):
+    st.session_state.current_screenshot = (st.session_state.current_screenshot + step) % len(SCREENSHOTS)
 
-# 侧边栏导航
-st.sidebar.title('📊 学生成绩分析与预测系统')
+# 截图轮播：点击按钮时只重跑这一部分，不重新执行整个页面脚本
+@st.fragment
+def screenshot_carousel():
+    with tracing.fragment_span('app.py', 'carousel'):
+        # 显示图片（按显示宽度预先压缩的版本）
+        show_image(SCREENSHOTS[st.session_state.current_screenshot], 960, display_width='stretch')
+        
+        # 创建左右按钮布局，使用 Streamlit 的 columns
+        col1, col2, col3 = st.columns([1, 2, 1])
+        
+        with col1:
+            st.button("◀ 上一张", key="prev_btn", on_click=shift_screenshot, args=(-1,))
+        
+        with col3:
+            st.button("下一张 ▶", key="next_btn", on_click=shift_screenshot, args=(1,))
+
+def render():
+    """页面内容"""
+    with tracing.span('load_model'):
+        model_version = model_registry.current_version('student_score')
+        engine, features = load_model(model_version)
+    prediction_cache = load_prediction_cache(model_version)
+    current_version = data_version()
+    with tracing.span('load_data'):
+        df = load_data(current_version)
 
-# 确保使用默认深色模式
-# 获取当前工作目录
-current_dir = os.getcwd()
-config_dir = os.path.join(current_dir, '.streamlit')
-config_path = os.path.join(config_dir, 'config.toml')
+    # 侧边栏导航
+    st.sidebar.title('📊 学生成绩分析与预测系统')
 
-# 确保.config目录存在
-if not os.path.exists(config_dir):
-    os.makedirs(config_dir, exist_ok=True)
+    # 确保使用默认深色模式
+    # 获取当前工作目录
+    current_dir = os.getcwd()
+    config_dir = os.path.join(current_dir, '.streamlit')
+    config_path = os.path.join(config_dir, 'config.toml')
 
-# 写入深色模式配置
-with open(config_path, 'w') as f:
-    f.write('[theme]\nbase = "dark"\n')
+    # 确保.config目录存在
+    if not os.path.exists(config_dir):
+        os.makedirs(config_dir, exist_ok=True)
 
-# 验证配置文件是否正确创建
-if os.path.exists(config_path):
-    with open(config_path, 'r') as f:
-        content = f.read()
-    if 'base = "dark"' in content:
-        print(f"配置文件已创建，主题设置为深色模式: {config_path}")
+    # 写入深色模式配置
+    with open(config_path, 'w') as f:
+        f.write('[theme]\nbase = "dark"\n')
+
+    # 验证配置文件是否正确创建
+    if os.path.exists(config_path):
+        with open(config_path, 'r') as f:
+            content = f.read()
+        if 'base = "dark"' in content:
+            print(f"配置文件已创建，主题设置为深色模式: {config_path}")
+        else:
+            print(f"配置文件已创建，但主题设置不正确: {config_path}")
+            print(f"配置内容: {content}")
     else:
-        print(f"配置文件已创建，但主题设置不正确: {config_path}")
-        print(f"配置内容: {content}")
-else:
-    print(f"无法创建配置文件: {config_path}")
-    print(f"当前工作目录: {current_dir}")
-    print(f"是否有权限创建目录: {os.access(current_dir, os.W_OK)}")
+        print(f"无法创建配置文件: {config_path}")
+        print(f"当前工作目录: {current_dir}")
+        print(f"是否有权限创建目录: {os.access(current_dir, os.W_OK)}")
 
-page = st.sidebar.radio(
-    '功能模块',
-    ['项目介绍', '专业数据分析', '期末成绩预测'],
-    index=0,
-    label_visibility='collapsed'
-)
+    page = st.sidebar.radio(
+        '功能模块',
+        ['项目介绍', '专业数据分析', '期末成绩预测'],
+        index=0,
+        label_visibility='collapsed'
+    )
+    tracing.set_page(page)
 
-# 页面1：项目介绍
-if page == '项目介绍':
-    # 页面标题
-    st.title('学生成绩分析与预测系统')
-    
-    # 项目概述
-    st.header('项目概述')
-    
-    # 创建左右两列布局，调整比例让图片更宽
-    overview_cols = st.columns([1.2, 1.8])
-    
-    with overview_cols[0]:
-        # 左侧文字内容
+    # 页面1：项目介绍
+    if page == '项目介绍':
+        # 页面标题
+        st.title('学生成绩分析与预测系统')
+        
+        # 项目概述
+        st.header('项目概述')
+        
+        # 创建左右两列布局，调整比例让图片更宽
+        overview_cols = st.columns([1.2, 1.8])
+        
+        with overview_cols[0]:
+            # 左侧文字内容
+            st.markdown("""
+            本项目是一个基于streamlit的学生成绩分析平台，通过数据可视化和机器学习技术，帮助教育工作者和学生深入了解学业表现，并预测期末考试成绩。
+            """)
+        
+        with overview_cols[1]:
+            # 右侧截图，添加左右按钮切换功能
+            if len(SCREENSHOTS) > 1:
+                # 初始化状态
+                if 'current_screenshot' not in st.session_state:
+                    st.session_state.current_screenshot = 0
+                
+                screenshot_carousel()
+            else:
+                # 只有一个截图时直接显示
+                show_image(SCREENSHOTS[0], 960, display_width='stretch')
+        
+        # 主要特点
+        st.header('主要特点')
+        
+        # 无序列表展示主要特点
         st.markdown("""
-        本项目是一个基于streamlit的学生成绩分析平台，通过数据可视化和机器学习技术，帮助教育工作者和学生深入了解学业表现，并预测期末考试成绩。
+        - 📊 **数据可视化**：多维度展示学生学业数据
+        - 📚 **专业分析**：按专业分类的详细统计分析
+        - 🤖 **智能预测**：基于机器学习模型的成绩预测
+        - 💡 **学习建议**：根据预测结果提供个性化反馈
         """)
-    
-    with overview_cols[1]:
-        # 右侧截图，添加左右按钮切换功能
-        if len(SCREENSHOTS) > 1:
-            # 初始化状态
-            if 'current_screenshot' not in st.session_state:
-                st.session_state.current_screenshot = 0
-            
-            # 创建一个容器来放置图片和按钮
-            image_container = st.container()
+        
+        # 项目目标
+        st.header('项目目标')
+        
+        # 目标卡片
+        goal_cards = st.columns(3)
+        
+        with goal_cards[0]:
+            st.subheader("🎯 目标一")
+            st.write("实现学生成绩数据的可视化分析")
+            st.write("提供多维度的数据统计")
+            st.write("帮助教师了解教学效果")
+        
+        with goal_cards[1]:
+            st.subheader("🎯 目标二")
+            st.write("建立准确的成绩预测模型")
+            st.write("帮助学生了解自身学习情况")
+            st.write("提供个性化的学习建议")
+        
+        with goal_cards[2]:
+            st.subheader("🎯 目标三")
+            st.write("提升学生学习积极性")
+            st.write("促进教学质量的提高")
+            st.write("实现数据驱动的教学管理")
+        
+        # 技术架构
+        st.header('技术架构')
+        
+        # 技术架构卡片
+        tech_cols = st.columns(4)
+        
+        with tech_cols[0]:
+            st.write("🖥️")
+            st.subheader("前端框架")
+            st.write("Streamlit")
+        
+        with tech_cols[1]:
+            st.write("🐍")
+            st.subheader("后端语言")
+            st.write("Python")
+        
+        with tech_cols[2]:
+            st.write("🌲")
+            st.subheader("机器学习算法")
+            st.write("随机森林")
+        
+        with tech_cols[3]:
+            st.write("📊")
+            st.subheader("数据处理")
+            st.write("Pandas")
+
+    # 页面2：专业数据分析
+    elif page == '专业数据分析':
+        st.title('专业数据分析')
+        
+        # 页面只从预计算的统计结果渲染
+        with tracing.span('load_aggregates'):
+            aggregates = load_aggregates(current_version)
+        major_stats = aggregates['major_stats']
+        
+        # 1. 各专业每周平均学时、期中考试平均分和期末考试平均分表格
+        with st.container():
+            st.header('各专业学习数据统计')
             
-            with image_container:
-                # 显示图片
-                    st.image(SCREENSHOTS[st.session_state.current_screenshot], width='stretch')
+            # 显示表格
+            with tracing.span('dataframe:major_stats'):
+                st.dataframe(major_stats, width='stretch')
+        
+        # 2. 各专业男女性别比例（左侧图，右侧表）
+        with st.container():
+            st.header('各专业男女性别比例')
             
-            # 创建左右按钮布局，使用 Streamlit 的 columns
-            button_container = st.container()
+            # 左右两列布局
+            gender_cols = st.columns([2, 1])
             
-            with button_container:
-                col1, col2, col3 = st.columns([1, 2, 1])
+            with gender_cols[0]:
+                # 使用Plotly创建双列柱状图
+                import plotly.express as px
                 
-                with col1:
-                    if st.button("◀ 上一张", key="prev_btn"):
-                        st.session_state.current_screenshot = (st.session_state.current_screenshot - 1) % len(SCREENSHOTS)
-                        st.rerun()
+                # 各专业男女比例（长格式数据）
+                gender_ratio_long = aggregates['gender_ratio_long']
                 
-                with col3:
-                    if st.button("下一张 ▶", key="next_btn"):
-                        st.session_state.current_screenshot = (st.session_state.current_screenshot + 1) % len(SCREENSHOTS)
-                        st.rerun()
-        else:
-            # 只有一个截图时直接显示
-            st.image(SCREENSHOTS[0], width='stretch')
-    
-    # 主要特点
-    st.header('主要特点')
-    
-    # 无序列表展示主要特点
-    st.markdown("""
-    - 📊 **数据可视化**：多维度展示学生学业数据
-    - 📚 **专业分析**：按专业分类的详细统计分析
-    - 🤖 **智能预测**：基于机器学习模型的成绩预测
-    - 💡 **学习建议**：根据预测结果提供个性化反馈
-    """)
-    
-    # 项目目标
-    st.header('项目目标')
-    
-    # 目标卡片
-    goal_cards = st.columns(3)
-    
-    with goal_cards[0]:
-        st.subheader("🎯 目标一")
-        st.write("实现学生成绩数据的可视化分析")
-        st.write("提供多维度的数据统计")
-        st.write("帮助教师了解教学效果")
-    
-    with goal_cards[1]:
-        st.subheader("🎯 目标二")
-        st.write("建立准确的成绩预测模型")
-        st.write("帮助学生了解自身学习情况")
-        st.write("提供个性化的学习建议")
-    
-    with goal_cards[2]:
-        st.subheader("🎯 目标三")
-        st.write("提升学生学习积极性")
-        st.write("促进教学质量的提高")
-        st.write("实现数据驱动的教学管理")
-    
-    # 技术架构
-    st.header('技术架构')
-    
-    # 技术架构卡片
-    tech_cols = st.columns(4)
-    
-    with tech_cols[0]:
-        st.write("🖥️")
-        st.subheader("前端框架")
-        st.write("Streamlit")
-    
-    with tech_cols[1]:
-        st.write("🐍")
-        st.subheader("后端语言")
-        st.write("Python")
-    
-    with tech_cols[2]:
-        st.write("🌲")
-        st.subheader("机器学习算法")
-        st.write("随机森林")
-    
-    with tech_cols[3]:
-        st.write("📊")
-        st.subheader("数据处理")
-        st.write("Pandas")
-
-# 页面2：专业数据分析
-elif page == '专业数据分析':
-    st.title('专业数据分析')
-    
-    # 1. 各专业每周平均学时、期中考试平均分和期末考试平均分表格
-    with st.container():
-        st.header('各专业学习数据统计')
-        
-        # 按专业分组计算平均值
-        major_stats = df.groupby('专业').agg({
-            '每周学习时长（小时）': 'mean',
-            '期中考试分数': 'mean',
-            '期末考试分数': 'mean'
-        }).round(2)
-        
-        # 重命名列名
-        major_stats.columns = ['每周平均学时', '期中考试平均分', '期末考试平均分']
-        
-        # 显示表格
-        st.dataframe(major_stats, width='stretch')
-    
-    # 2. 各专业男女性别比例（左侧图，右侧表）
-    with st.container():
-        st.header('各专业男女性别比例')
+                with tracing.span('figure:gender_ratio'):
+                    # 创建双列柱状图
+                    fig = px.bar(
+                        gender_ratio_long,
+                        x='专业',
+                        y='比例',
+                        color='性别',
+                        barmode='group',  # 双列柱状图
+                        color_discrete_map={'男': '#0099ff', '女': '#0066cc'},
+                        category_orders={'性别': ['男', '女']},
+                        labels={'比例': '比例', '专业': '专业', '性别': '性别'},
+                        height=400
+                    )
+                
+                    # 设置图表样式
+                    fig.update_layout(
+                        legend_title_text='性别',
+                        legend=dict(
+                            orientation='h',  # 水平方向
+                            yanchor='top', 
+                            y=1.2,  # 顶部位置，图表外部
+                            xanchor='center', 
+                            x=0.5  # 水平居中
+                        ),
+                        xaxis_tickangle=0,  # 文字不倾斜，水平显示
+                        margin=dict(t=100)  # 顶部留足够空间给图例
+                    )
+                
+                # 显示图表
+                with tracing.span('plotly_chart:gender_ratio'):
+                    st.plotly_chart(fig, width='stretch')
+            
+            with gender_cols[1]:
+                # 显示性别比例表格
+                with tracing.span('dataframe:gender_table'):
+                    st.dataframe(aggregates['gender_table'], width='stretch', height=400)
         
-        # 左右两列布局
-        gender_cols = st.columns([2, 1])
+        # 3. 各专业平均上课出勤率（左侧图，右侧表）
+        with st.container():
+            st.header('各专业平均上课出勤率')
+            
+            # 左右两列布局
+            attendance_cols = st.columns([2, 1])
+            
+            with attendance_cols[0]:
+                # 各专业平均出勤率（百分比格式）
+                attendance_stats_percent = aggregates['attendance_stats_percent']
+                
+                # 使用Plotly创建柱状图，确保X轴文字水平显示
+                import plotly.express as px
+                
+                with tracing.span('figure:attendance'):
+                    # 创建柱状图
+                    fig = px.bar(
+                        attendance_stats_percent,
+                        x=attendance_stats_percent.index,
+                        y=attendance_stats_percent.values,
+                        labels={'x': '专业', 'y': '平均出勤率(%)'},
+                        height=400
+                    )
+                
+                    # 设置图表样式，确保X轴文字水平显示
+                    fig.update_layout(
+                        xaxis_tickangle=0,  # X轴文字水平显示
+                        margin=dict(t=50, b=50)
+                    )
+                
+                # 显示图表
+                with tracing.span('plotly_chart:attendance'):
+                    st.plotly_chart(fig, width='stretch')
+            
+            with attendance_cols[1]:
+                # 显示出勤率表格
+                with tracing.span('dataframe:attendance_table'):
+                    st.dataframe(aggregates['attendance_table'], width='stretch', height=400, hide_index=True)
         
-        with gender_cols[0]:
-            # 计算每个专业的男女人数
-            gender_counts = df.groupby(['专业', '性别']).size().unstack(fill_value=0)
-            # 确保列顺序是男在前，女在后
-            gender_counts = gender_counts[['男', '女']]
-            # 计算比例
-            gender_ratio = gender_counts.div(gender_counts.sum(axis=1), axis=0)
+        # 4. 各专业期中期末成绩趋势（左侧图，右侧表）
+        with st.container():
+            st.header('各专业期中期末成绩趋势')
             
-            # 使用Plotly创建双列柱状图
-            import plotly.express as px
+            # 左右两列布局
+            comparison_cols = st.columns([2, 1])
             
-            # 转换为长格式数据
-            gender_ratio_long = gender_ratio.reset_index().melt(id_vars=['专业'], var_name='性别', value_name='比例')
+            with comparison_cols[0]:
+                # 使用Plotly创建折线图，确保X轴文字水平显示
+                import plotly.express as px
+                import plotly.graph_objects as go
+                
+                with tracing.span('figure:comparison'):
+                    # 创建图表
+                    fig = go.Figure()
+                
+                    # 添加期中考试分数折线（蓝色）
+                    fig.add_trace(go.Scatter(
+                        x=major_stats.index,
+                        y=major_stats['期中考试平均分'],
+                        name='期中考试分数',
+                        mode='lines+markers',
+                        line=dict(color='#1f77b4', width=2),
+                        marker=dict(size=8),
+                        yaxis='y1'
+                    ))
+                
+                    # 添加期末考试分数折线（红色）
+                    fig.add_trace(go.Scatter(
+                        x=major_stats.index,
+                        y=major_stats['期末考试平均分'],
+                        name='期末考试分数',
+                        mode='lines+markers',
+                        line=dict(color='#d62728', width=2),
+                        marker=dict(size=8),
+                        yaxis='y1'
+                    ))
+                
+                    # 添加每周学习时长折线（灰色）
+                    fig.add_trace(go.Scatter(
+                        x=major_stats.index,
+                        y=major_stats['每周平均学时'],
+                        name='每周学习时长',
+                        mode='lines+markers',
+                        line=dict(color='#7f7f7f', width=2),
+                        marker=dict(size=8),
+                        yaxis='y2'
+                    ))
+                
+                    # 设置图表布局
+                    fig.update_layout(
+                        title='各专业期中期末成绩趋势',
+                        xaxis_tickangle=0,  # X轴文字水平显示
+                        xaxis=dict(title='专业'),
+                        yaxis=dict(
+                            title=dict(
+                                text='分数',
+                                font=dict(color='#1f77b4')
+                            ),
+                            tickfont=dict(color='#1f77b4')
+                        ),
+                        yaxis2=dict(
+                            title=dict(
+                                text='每周学习时长（小时）',
+                                font=dict(color='#7f7f7f')
+                            ),
+                            tickfont=dict(color='#7f7f7f'),
+                            anchor='free',
+                            overlaying='y',
+                            side='right',
+                            position=1.0
+                        ),
+                        legend=dict(
+                            orientation='h',
+                            yanchor='top',
+                            y=1.15,
+                            xanchor='left',
+                            x=0.01
+                        ),
+                        margin=dict(t=120, r=120),
+                        height=400
+                    )
+                
+                # 显示图表
+                with tracing.span('plotly_chart:comparison'):
+                    st.plotly_chart(fig, width='stretch')
             
-            # 创建双列柱状图
-            fig = px.bar(
-                gender_ratio_long,
-                x='专业',
-                y='比例',
-                color='性别',
-                barmode='group',  # 双列柱状图
-                color_discrete_map={'男': '#0099ff', '女': '#0066cc'},
-                category_orders={'性别': ['男', '女']},
-                labels={'比例': '比例', '专业': '专业', '性别': '性别'},
-                height=400
+            with comparison_cols[1]:
+                # 显示成绩对比表格
+                with tracing.span('dataframe:comparison_table'):
+                    st.dataframe(aggregates['comparison_table'], width='stretch', height=400, hide_index=True)
+        
+        # 5. 专业专项分析（默认大数据管理专业，可切换为任一专业）
+        with st.container():
+            major_index = aggregates['major_index']
+            major_names = list(major_index['majors'])
+            selected_major = st.selectbox(
+                '选择专业',
+                major_names,
+                index=major_names.index(FOCUS_MAJOR) if FOCUS_MAJOR in major_names else 0,
+                key='drilldown_major'
             )
+            st.header(f'{selected_major}专业专项分析')
             
-            # 设置图表样式
-            fig.update_layout(
-                legend_title_text='性别',
-                legend=dict(
-                    orientation='h',  # 水平方向
-                    yanchor='top', 
-                    y=1.2,  # 顶部位置，图表外部
-                    xanchor='center', 
-                    x=0.5  # 水平居中
-                ),
-                xaxis_tickangle=0,  # 文字不倾斜，水平显示
-                margin=dict(t=100)  # 顶部留足够空间给图例
-            )
+            # 所选专业的预计算指标
+            major_info = major_index['majors'][selected_major]
             
-            # 显示图表
-            st.plotly_chart(fig, width='stretch')
-        
-        with gender_cols[1]:
-            # 准备性别比例表格数据
-            gender_table = gender_counts.copy()
-            gender_table['总人数'] = gender_table['男'] + gender_table['女']
-            gender_table['男性比例(%)'] = (gender_table['男'] / gender_table['总人数']).round(4) * 100
-            gender_table['女性比例(%)'] = (gender_table['女'] / gender_table['总人数']).round(4) * 100
-            # 重命名列名
-            gender_table.columns = ['男性人数', '女性人数', '总人数', '男性比例(%)', '女性比例(%)']
-            # 显示表格
-            st.dataframe(gender_table.round(2), width='stretch', height=400)
-    
-    # 3. 各专业平均上课出勤率（左侧图，右侧表）
-    with st.container():
-        st.header('各专业平均上课出勤率')
-        
-        # 左右两列布局
-        attendance_cols = st.columns([2, 1])
-        
-        with attendance_cols[0]:
-            # 按专业分组计算平均出勤率
-            attendance_stats = df.groupby('专业')['上课出勤率'].mean().round(4)
-            # 转换为百分比格式
-            attendance_stats_percent = attendance_stats * 100
+            # 使用指标卡片展示 - 三列布局
+            metric_cols = st.columns(3)
             
-            # 使用Plotly创建柱状图，确保X轴文字水平显示
-            import plotly.express as px
+            with metric_cols[0]:
+                st.metric("专业人数", major_info['count'])
             
-            # 创建柱状图
-            fig = px.bar(
-                attendance_stats_percent,
-                x=attendance_stats_percent.index,
-                y=attendance_stats_percent.values,
-                labels={'x': '专业', 'y': '平均出勤率(%)'},
-                height=400
-            )
+            with metric_cols[1]:
+                st.metric("平均出勤率", f"{major_info['avg_attendance']:.2f}%")
             
-            # 设置图表样式，确保X轴文字水平显示
-            fig.update_layout(
-                xaxis_tickangle=0,  # X轴文字水平显示
-                margin=dict(t=50, b=50)
-            )
+            with metric_cols[2]:
+                st.metric("期末平均分", major_info['avg_final'])
             
-            # 显示图表
-            st.plotly_chart(fig, width='stretch')
+            # 显示专业详细数据表格：服务端排序、筛选和分页，只发送当前页的行
+            st.subheader("专业详细数据")
+            with tracing.span('dataframe:major_detail'):
+                render_paged_table(load_detail_table(current_version, selected_major), key='major_detail')
+
+    # 页面3：期末成绩预测
+    elif page == '期末成绩预测':
+        st.title('期末成绩预测')
         
-        with attendance_cols[1]:
-            # 准备出勤率表格数据
-            attendance_table = attendance_stats_percent.reset_index()
-            attendance_table.columns = ['专业', '平均出勤率(%)']
-            # 显示表格
-            st.dataframe(attendance_table.round(2), width='stretch', height=400, hide_index=True)
-    
-    # 4. 各专业期中期末成绩趋势（左侧图，右侧表）
-    with st.container():
-        st.header('各专业期中期末成绩趋势')
+        # 输入表单
+        st.write('请输入学生的相关信息，系统将为您预测期末考试分数。')
         
-        # 左右两列布局
-        comparison_cols = st.columns([2, 1])
+        with st.form(key='prediction_form'):
+            # 表单列布局
+            form_cols = st.columns(2)
+            
+            with form_cols[0]:
+                # 基本信息
+                gender = st.selectbox('性别', ['男', '女'], index=0)
+                major = st.selectbox('专业', ['工商管理', '人工智能', '财务管理', '电子商务', '大数据管理'], index=0)
+                study_hours = st.slider('每周学习时长（小时）', min_value=0.0, max_value=50.0, step=0.1, value=15.0)
+            
+            with form_cols[1]:
+                attendance = st.slider('上课出勤率', min_value=0.0, max_value=1.0, step=0.01, value=0.8)
+                midterm_score = st.slider('期中考试分数', min_value=0.0, max_value=100.0, step=0.1, value=70.0)
+                homework_completion = st.slider('作业完成率', min_value=0.0, max_value=1.0, step=0.01, value=0.85)
+            
+            # 提交按钮
+            submit_button = st.form_submit_button(label='📊 预测成绩')
         
-        with comparison_cols[0]:
-            # 使用Plotly创建折线图，确保X轴文字水平显示
-            import plotly.express as px
-            import plotly.graph_objects as go
+        # 预测结果
+        if submit_button:
+            st.header('预测结果')
             
-            # 创建图表
-            fig = go.Figure()
+            # 准备输入数据
+            input_data = {
+                '性别': 0 if gender == '男' else 1,
+                '每周学习时长（小时）': study_hours,
+                '上课出勤率': attendance,
+                '期中考试分数': midterm_score,
+                '作业完成率': homework_completion,
+                '专业_工商管理': 1 if major == '工商管理' else 0,
+                '专业_人工智能': 1 if major == '人工智能' else 0,
+                '专业_财务管理': 1 if major == '财务管理' else 0,
+                '专业_电子商务': 1 if major == '电子商务' else 0,
+                '专业_大数据管理': 1 if major == '大数据管理' else 0
+            }
             
-            # 添加期中考试分数折线（蓝色）
-            fig.add_trace(go.Scatter(
-                x=major_stats.index,
-                y=major_stats['期中考试平均分'],
-                name='期中考试分数',
-                mode='lines+markers',
-                line=dict(color='#1f77b4', width=2),
-                marker=dict(size=8),
-                yaxis='y1'
-            ))
+            # 转换为DataFrame
+            input_df = pd.DataFrame([input_data])
             
-            # 添加期末考试分数折线（红色）
-            fig.add_trace(go.Scatter(
-                x=major_stats.index,
-                y=major_stats['期末考试平均分'],
-                name='期末考试分数',
-                mode='lines+markers',
-                line=dict(color='#d62728', width=2),
-                marker=dict(size=8),
-                yaxis='y1'
-            ))
+            # 确保特征顺序一致
+            input_df = input_df[features]
             
-            # 添加每周学习时长折线（灰色）
-            fig.add_trace(go.Scatter(
-                x=major_stats.index,
-                y=major_stats['每周平均学时'],
-                name='每周学习时长',
-                mode='lines+markers',
-                line=dict(color='#7f7f7f', width=2),
-                marker=dict(size=8),
-                yaxis='y2'
-            ))
+            # 预测期末考试分数，相同的输入直接使用缓存结果；
+            # 配置了推理服务时由服务合并请求批量预测，否则在本进程内预测
+            with tracing.span('predict'):
+                predicted_score = prediction_cache.get_or_compute(
+                    input_df.to_numpy(dtype=float)[0],
+                    lambda row: float(inference_client.predict('student_score', row)[0])
+                )
+            predicted_score_rounded = round(predicted_score, 2)
             
-            # 设置图表布局
-            fig.update_layout(
-                title='各专业期中期末成绩趋势',
-                xaxis_tickangle=0,  # X轴文字水平显示
-                xaxis=dict(title='专业'),
-                yaxis=dict(
-                    title=dict(
-                        text='分数',
-                        font=dict(color='#1f77b4')
-                    ),
-                    tickfont=dict(color='#1f77b4')
-                ),
-                yaxis2=dict(
-                    title=dict(
-                        text='每周学习时长（小时）',
-                        font=dict(color='#7f7f7f')
-                    ),
-                    tickfont=dict(color='#7f7f7f'),
-                    anchor='free',
-                    overlaying='y',
-                    side='right',
-                    position=1.0
-                ),
-                legend=dict(
-                    orientation='h',
-                    yanchor='top',
-                    y=1.15,
-                    xanchor='left',
-                    x=0.01
-                ),
-                margin=dict(t=120, r=120),
-                height=400
-            )
+            # 显示预测分数
+            st.subheader(f'预测期末考试分数: {predicted_score_rounded}')
+            cache_stats = prediction_cache.stats()
+            st.caption(f"预测缓存：命中 {cache_stats['hits']} 次，未命中 {cache_stats['misses']} 次，"
+                       f"当前 {cache_stats['size']}/{cache_stats['maxsize']} 条")
             
-            # 显示图表
-            st.plotly_chart(fig, width='stretch')
-        
-        with comparison_cols[1]:
-            # 准备成绩对比表格数据
-            comparison_table = major_stats[['期中考试平均分', '期末考试平均分', '每周平均学时']].reset_index()
-            # 重命名列名
-            comparison_table.columns = ['专业', '期中考试分数', '期末考试分数', '每周学习时长']
-            # 保留4位小数
-            comparison_table = comparison_table.round(4)
-            # 显示表格
-            st.dataframe(comparison_table, width='stretch', height=400, hide_index=True)
-    
-    # 5. 大数据管理专业专项分析
-    with st.container():
-        st.header('大数据管理专业专项分析')
-        
-        # 筛选大数据管理专业数据
-        data_science_data = df[df['专业'] == '大数据管理']
-        
-        # 计算相关指标
-        data_science_avg_attendance = data_science_data['上课出勤率'].mean().round(4) * 100
-        data_science_avg_final = data_science_data['期末考试分数'].mean().round(2)
-        
-        # 统计人数
-        data_science_count = len(data_science_data)
-        
-        # 使用指标卡片展示 - 三列布局
-        metric_cols = st.columns(3)
-        
-        with metric_cols[0]:
-            st.metric("专业人数", data_science_count)
-        
-        with metric_cols[1]:
-            st.metric("平均出勤率", f"{data_science_avg_attendance:.2f}%")
-        
-        with metric_cols[2]:
-            st.metric("期末平均分", data_science_avg_final)
-        
-        # 显示专业详细数据表格
-        st.subheader("专业详细数据")
-        st.dataframe(data_science_data[['性别', '每周学习时长（小时）', '上课出勤率', '期中考试分数', '期末考试分数']], 
-                    width='stretch', height=300)
+            # 显示相应消息和图片
+            if predicted_score_rounded >= 60:
+                st.success('🎉 恭喜！预测成绩及格！')
+                # 图片居中显示
+                col1, col2, col3 = st.columns([1, 2, 1])
+                with col2:
+                    show_image('tongguo.jpg', 500)
+            else:
+                st.warning('⚠️ 预测成绩未及格，继续努力！')
+                # 图片居中显示
+                col1, col2, col3 = st.columns([1, 2, 1])
+                with col2:
+                    show_image('guake.jpg', 500)
 
-# 页面3：期末成绩预测
-elif page == '期末成绩预测':
-    st.title('期末成绩预测')
-    
-    # 输入表单
-    st.write('请输入学生的相关信息，系统将为您预测期末考试分数。')
-    
-    with st.form(key='prediction_form'):
-        # 表单列布局
-        form_cols = st.columns(2)
-        
-        with form_cols[0]:
-            # 基本信息
-            gender = st.selectbox('性别', ['男', '女'], index=0)
-            major = st.selectbox('专业', ['工商管理', '人工智能', '财务管理', '电子商务', '大数据管理'], index=0)
-            study_hours = st.slider('每周学习时长（小时）', min_value=0.0, max_value=50.0, step=0.1, value=15.0)
-        
-        with form_cols[1]:
-            attendance = st.slider('上课出勤率', min_value=0.0, max_value=1.0, step=0.01, value=0.8)
-            midterm_score = st.slider('期中考试分数', min_value=0.0, max_value=100.0, step=0.1, value=70.0)
-            homework_completion = st.slider('作业完成率', min_value=0.0, max_value=1.0, step=0.01, value=0.85)
-        
-        # 提交按钮
-        submit_button = st.form_submit_button(label='📊 预测成绩')
-    
-    # 预测结果
-    if submit_button:
-        st.header('预测结果')
-        
-        # 准备输入数据
-        input_data = {
-            '性别': 0 if gender == '男' else 1,
-            '每周学习时长（小时）': study_hours,
-            '上课出勤率': attendance,
-            '期中考试分数': midterm_score,
-            '作业完成率': homework_completion,
-            '专业_工商管理': 1 if major == '工商管理' else 0,
-            '专业_人工智能': 1 if major == '人工智能' else 0,
-            '专业_财务管理': 1 if major == '财务管理' else 0,
-            '专业_电子商务': 1 if major == '电子商务' else 0,
-            '专业_大数据管理': 1 if major == '大数据管理' else 0
-        }
-        
-        # 转换为DataFrame
-        input_df = pd.DataFrame([input_data])
-        
-        # 确保特征顺序一致
-        input_df = input_df[features]
-        
-        # 预测期末考试分数
-        predicted_score = model.predict(input_df)[0]
-        predicted_score_rounded = round(predicted_score, 2)
-        
-        # 显示预测分数
-        st.subheader(f'预测期末考试分数: {predicted_score_rounded}')
-        
-        # 显示相应消息和图片
-        if predicted_score_rounded >= 60:
-            st.success('🎉 恭喜！预测成绩及格！')
-            # 图片居中显示
-            col1, col2, col3 = st.columns([1, 2, 1])
-            with col2:
-                st.image('tongguo.jpg', width=500)
-        else:
-            st.warning('⚠️ 预测成绩未及格，继续努力！')
-            # 图片居中显示
-            col1, col2, col3 = st.columns([1, 2, 1])
-            with col2:
-                st.image('guake.jpg', width=500)
+
+        # 批量预测
+        st.header('批量成绩预测')
+        st.write('上传与 student_data_adjusted_rounded.csv 列相同的CSV文件，系统将批量预测所有学生的期末考试分数。')
+
+        uploaded_file = st.file_uploader('上传学生数据CSV', type='csv', key='batch_upload')
+
+        if uploaded_file is not None and st.button('📊 批量预测', key='batch_predict_btn'):
+            raw = uploaded_file.getvalue()
+            # 按换行数估算总行数（去掉表头），用于显示进度
+            total_rows = max(raw.count(b'\n') - 1, 1)
+
+            progress_bar = st.progress(0.0, text='正在批量预测...')
+            output = io.BytesIO()
+            # 写入BOM，方便用Excel直接打开中文CSV
+            output.write('\ufeff'.encode('utf-8'))
+            processed_rows = 0
+            start_time = time.perf_counter()
+
+            try:
+                for result in tracing.traced_iter('predict_batch_chunk', predict_in_chunks(engine, features, io.BytesIO(raw))):
+                    result.to_csv(output, header=processed_rows == 0, index=False, encoding='utf-8')
+                    processed_rows += len(result)
+                    elapsed = time.perf_counter() - start_time
+                    progress_bar.progress(
+                        min(processed_rows / total_rows, 1.0),
+                        text=f'已预测 {processed_rows:,} / {total_rows:,} 行，{processed_rows / max(elapsed, 1e-9):,.0f} 行/秒'
+                    )
+            except ValueError as e:
+                progress_bar.empty()
+                st.error(f'批量预测失败: {e}')
+            else:
+                elapsed = time.perf_counter() - start_time
+                # 结果保存在会话状态中，点击下载按钮后仍然可用
+                st.session_state.batch_result = {
+                    'data': output.getvalue(),
+                    'rows': processed_rows,
+                    'seconds': elapsed,
+                    'file_name': f'{os.path.splitext(uploaded_file.name)[0]}_预测结果.csv'
+                }
+
+        if 'batch_result' in st.session_state:
+            batch_result = st.session_state.batch_result
+
+            result_cols = st.columns(3)
+            with result_cols[0]:
+                st.metric('预测人数', f"{batch_result['rows']:,}")
+            with result_cols[1]:
+                st.metric('耗时', f"{batch_result['seconds']:.2f} 秒")
+            with result_cols[2]:
+                st.metric('吞吐量', f"{batch_result['rows'] / max(batch_result['seconds'], 1e-9):,.0f} 行/秒")
+
+            st.download_button(
+                '📥 下载预测结果',
+                data=batch_result['data'],
+                file_name=batch_result['file_name'],
+                mime='text/csv',
+                on_click='ignore'
+            )
+
+def main():
+    """主函数"""
+    # 开启 PERF_TRACE 时记录本次重跑各阶段的耗时；提前结束的重跑（st.stop、st.rerun、异常）也在 finally 中记录
+    tracing.begin_rerun('app.py')
+    try:
+        render()
+    finally:
+        tracing.end_rerun()
+    # 开启调试面板时在侧边栏显示本次重跑的耗时
+    tracing.debug_panel()
+
+if __name__ == "__main__":
+    main()
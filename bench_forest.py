@@ -0,0 +1,67 @@
+import argparse
+import time
+
+import joblib
+import numpy as np
+import pandas as pd
+
+from forest_engine import CompiledForest
+from score_model import encode_students
+
+
+def time_call(func, repeat):
+    """重复调用并返回平均耗时（秒）"""
+    start = time.perf_counter()
+    for _ in range(repeat):
+        func()
+    return (time.perf_counter() - start) / repeat
+
+
+def main():
+    parser = argparse.ArgumentParser(description='对比sklearn和展开后的随机森林推理引擎')
+    parser.add_argument('--model', default='score_prediction_model.pkl')
+    parser.add_argument('--features', default='features.pkl')
+    parser.add_argument('--data', default='student_data_adjusted_rounded.csv')
+    parser.add_argument('--repeat', type=int, default=200, help='单行预测的重复次数')
+    args = parser.parse_args()
+
+    model = joblib.load(args.model)
+    features = joblib.load(args.features)
+    X = encode_students(pd.read_csv(args.data), features)
+
+    start = time.perf_counter()
+    engine = CompiledForest(model)
+    print(f"引擎构建耗时: {time.perf_counter() - start:.3f} 秒，节点数: {len(engine.value):,}")
+
+    # 数值一致性检查
+    expected = model.predict(X)
+    actual = engine.predict(X)
+    if not np.array_equal(expected, actual):
+        raise SystemExit(f"预测结果不一致，最大误差: {np.abs(expected - actual).max()}")
+    print(f"数值一致性检查通过（{len(X):,} 行逐位相同）")
+
+    # 缺失值一致性检查：随机把约10%的特征置为NaN，少量行（同步遍历）和全部行（逐棵树遍历）都要与sklearn相同
+    rng = np.random.default_rng(0)
+    X_missing = X.mask(rng.random(X.shape) < 0.1)
+    for rows in (X_missing.iloc[:engine.lockstep_rows], X_missing):
+        expected = model.predict(rows)
+        actual = engine.predict(rows)
+        if not np.array_equal(expected, actual):
+            raise SystemExit(f"含缺失值的预测结果不一致（{len(rows):,} 行），最大误差: {np.abs(expected - actual).max()}")
+    print(f"缺失值一致性检查通过（{int(X_missing.isna().sum().sum()):,} 个NaN）")
+
+    # 单行预测：与 app.py 相同，使用单行DataFrame
+    single_row = X.iloc[:1]
+    sklearn_single = time_call(lambda: model.predict(single_row), args.repeat)
+    engine_single = time_call(lambda: engine.predict(single_row), args.repeat)
+    print(f"单行预测  sklearn: {sklearn_single * 1000:.3f} ms  引擎: {engine_single * 1000:.3f} ms  "
+          f"加速: {sklearn_single / engine_single:.1f}x")
+
+    # 批量预测
+    sklearn_batch = time_call(lambda: model.predict(X), 1)
+    engine_batch = time_call(lambda: engine.predict(X), 1)
+    print(f"批量预测  sklearn: {len(X) / sklearn_batch:,.0f} 行/秒  引擎: {len(X) / engine_batch:,.0f} 行/秒")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,178 @@
+import argparse
+import hashlib
+import io
+import multiprocessing
+import os
+import tempfile
+import threading
+import time
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from PIL import Image
+
+import media_cache
+
+
+class StandInHandler(BaseHTTPRequestHandler):
+    """本地替身服务器：按路径生成图片，支持 ETag 条件请求，并模拟远程站点的延迟"""
+    latency = 0.2
+    requests = Counter()
+    not_modified = Counter()
+
+    def do_GET(self):
+        time.sleep(self.latency)
+        self.requests[self.path] += 1
+        seed = int(hashlib.md5(self.path.encode('utf-8')).hexdigest()[:6], 16)
+        output = io.BytesIO()
+        Image.new('RGB', (200, 120), (seed >> 16, (seed >> 8) & 255, seed & 255)).save(output, 'JPEG')
+        body = output.getvalue()
+        etag = f'"{hashlib.sha1(body).hexdigest()}"'
+
+        if self.headers.get('If-None-Match') == etag:
+            self.not_modified[self.path] += 1
+            self.send_response(304)
+            self.send_header('ETag', etag)
+            self.end_headers()
+            return
+        self.send_response(200)
+        self.send_header('Content-Type', 'image/jpeg')
+        self.send_header('Content-Length', str(len(body)))
+        self.send_header('ETag', etag)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def start_stand_in(latency):
+    StandInHandler.latency = latency
+    server = ThreadingHTTPServer(('127.0.0.1', 0), StandInHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f'http://127.0.0.1:{server.server_address[1]}'
+
+
+def resolve_in_process(cache_dir, origin, urls):
+    """在子进程中使用共享的缓存目录（模拟多个Streamlit服务进程）"""
+    cache = media_cache.MediaCache(cache_dir=cache_dir, origin_override=origin)
+    for url in urls:
+        cache.resolve(url, cache.timeout)
+
+
+def check(condition, message):
+    print(f"{'通过' if condition else '失败'}  {message}")
+    if not condition:
+        raise SystemExit(1)
+
+
+def run_pages(cache):
+    """用 AppTest 渲染 sp.py 和 music.py，图片应从本地媒体缓存提供"""
+    from streamlit.testing.v1 import AppTest
+
+    media_cache._default_cache = cache
+    for script in ['sp.py', 'music.py']:
+        at = AppTest.from_file(script, default_timeout=60).run()
+        check(not at.exception, f"{script} 渲染无异常")
+        # 首次渲染使用远程地址，等待后台下载完成
+        time.sleep(StandInHandler.latency * 3)
+        start = time.perf_counter()
+        at.run()
+        elapsed = (time.perf_counter() - start) * 1000
+        urls = [img.url for image_list in at.get('imgs') for img in image_list.proto.imgs]
+        check(all(not url.startswith('http') for url in urls), f"{script} 的 {len(urls)} 张图片均由本地提供，重跑 {elapsed:.1f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='媒体缓存检查：对本地替身服务器验证去重、并发下载、ETag重新验证和容量淘汰')
+    parser.add_argument('--latency-ms', type=float, default=200, help='替身服务器每个请求的模拟延迟')
+    parser.add_argument('--pages', action='store_true', help='同时用 AppTest 渲染 sp.py 和 music.py')
+    args = parser.parse_args()
+
+    server, origin = start_stand_in(args.latency_ms / 1000)
+    urls = [f'https://images.example.com/photo-{i % 3}?w=100' for i in range(12)]
+
+    with tempfile.TemporaryDirectory() as cache_dir:
+        cache = media_cache.MediaCache(cache_dir=cache_dir, origin_override=origin)
+
+        # 默认不等待下载：立即返回远程地址，下载在后台进行
+        start = time.perf_counter()
+        resolved = cache.resolve_many(urls[:3])
+        check(time.perf_counter() - start < args.latency_ms / 1000 and all(resolved[url] == url for url in urls[:3]),
+              f"未缓存时立即返回远程地址（{(time.perf_counter() - start) * 1000:.3f} ms），不阻塞页面渲染")
+        cache.resolve_many(urls[:3], wait=cache.timeout)
+
+        StandInHandler.requests.clear()
+        cache = media_cache.MediaCache(cache_dir=os.path.join(cache_dir, 'cold'), origin_override=origin)
+        start = time.perf_counter()
+        resolved = cache.resolve_many(urls, wait=cache.timeout)
+        cold = time.perf_counter() - start
+        check(sum(StandInHandler.requests.values()) == 3, f"12个URL（3个不同）只请求3次，首次加载 {cold * 1000:.1f} ms")
+        check(cold < 2 * args.latency_ms / 1000, "不同URL并发下载（耗时小于两倍延迟）")
+        check(all(os.path.exists(path) for path in resolved.values()), "返回的都是本地文件")
+
+        start = time.perf_counter()
+        cache.resolve_many(urls)
+        warm = time.perf_counter() - start
+        check(sum(StandInHandler.requests.values()) == 3, f"再次加载不发请求，耗时 {warm * 1000:.3f} ms")
+
+        # 多个会话同时请求同一个新URL，只下载一次
+        new_url = 'https://images.example.com/shared-cover'
+        threads = [threading.Thread(target=cache.resolve, args=(new_url, cache.timeout)) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        check(StandInHandler.requests['/shared-cover'] == 1, "8个线程并发请求同一URL只下载1次")
+
+        # 过期后立即返回本地文件，后台用 ETag 重新验证
+        cache.max_age = 0
+        start = time.perf_counter()
+        path = cache.resolve(urls[0])
+        stale = time.perf_counter() - start
+        check(os.path.exists(path) and stale < args.latency_ms / 1000,
+              f"过期条目立即返回本地文件（{stale * 1000:.3f} ms），不等待重新验证")
+        time.sleep(args.latency_ms / 1000 * 3)
+        check(StandInHandler.not_modified['/photo-0?w=100'] == 1, "后台重新验证收到 304 Not Modified")
+        cache.max_age = media_cache.MAX_AGE
+
+    with tempfile.TemporaryDirectory() as cache_dir:
+        # 容量只够两个文件时，按最近使用淘汰
+        probe = media_cache.MediaCache(cache_dir=cache_dir, origin_override=origin)
+        size = os.path.getsize(probe.resolve('https://images.example.com/size-probe', probe.timeout))
+        bounded = media_cache.MediaCache(cache_dir=cache_dir, max_bytes=int(size * 2.5), origin_override=origin)
+        for i in range(5):
+            bounded.resolve(f'https://images.example.com/evict-{i}', bounded.timeout)
+        stats = bounded.stats()
+        files = [name for name in os.listdir(cache_dir) if name not in (media_cache.INDEX_NAME, media_cache.LOCK_NAME)]
+        check(stats['bytes'] <= bounded.max_bytes and len(files) == stats['entries'] == 2,
+              f"目录大小受限：保留 {stats['entries']} 个文件，共 {stats['bytes']} 字节")
+        check('https://images.example.com/evict-4' in bounded.entries, "保留最近使用的条目")
+
+        # 加入新文件后超过上限时淘汰旧文件，不删除刚下载的文件；超过上限的文件不缓存，返回远程地址
+        tight = media_cache.MediaCache(cache_dir=cache_dir, max_bytes=int(size * 1.5), origin_override=origin)
+        path = tight.resolve('https://images.example.com/evict-5', tight.timeout)
+        check(os.path.exists(path), "新下载的文件不被本次淘汰删除")
+        tiny = media_cache.MediaCache(cache_dir=cache_dir, max_bytes=size // 2, origin_override=origin)
+        large_url = 'https://images.example.com/too-large'
+        check(tiny.resolve(large_url, tiny.timeout) == large_url and large_url not in tiny.entries,
+              "超过缓存上限的文件不缓存，使用远程地址")
+
+    with tempfile.TemporaryDirectory() as cache_dir:
+        # 多个进程共享缓存目录：各自保存索引时合并，不互相覆盖条目
+        jobs = [(cache_dir, origin, [f'https://images.example.com/process-{p}-{i}' for i in range(5)]) for p in range(4)]
+        with multiprocessing.get_context('fork').Pool(4) as pool:
+            pool.starmap(resolve_in_process, jobs)
+        shared = media_cache.MediaCache(cache_dir=cache_dir)
+        files = [name for name in os.listdir(cache_dir) if name not in (media_cache.INDEX_NAME, media_cache.LOCK_NAME)]
+        check(len(shared.entries) == len(files) == 20, f"4个进程共享目录，索引保留全部 {len(shared.entries)} 个条目，没有孤立文件")
+
+    if args.pages:
+        with tempfile.TemporaryDirectory() as cache_dir:
+            run_pages(media_cache.MediaCache(cache_dir=cache_dir, origin_override=origin))
+
+    server.shutdown()
+
+
+if __name__ == '__main__':
+    main()
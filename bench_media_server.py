@@ -0,0 +1,160 @@
+import argparse
+import asyncio
+import hashlib
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.error
+import urllib.request
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def rss_mb(pid):
+    """进程的常驻内存（MB）"""
+    with open(f'/proc/{pid}/status') as f:
+        for line in f:
+            if line.startswith('VmRSS:'):
+                return int(line.split()[1]) / 1024
+    return 0.0
+
+
+def check(condition, message):
+    print(f"{'通过' if condition else '失败'}  {message}")
+    if not condition:
+        raise SystemExit(1)
+
+
+def request(url, headers=None, method='GET'):
+    try:
+        with urllib.request.urlopen(urllib.request.Request(url, headers=headers or {}, method=method)) as response:
+            return response.status, dict(response.headers), response.read()
+    except urllib.error.HTTPError as e:
+        return e.code, dict(e.headers), e.read()
+
+
+def check_ranges(base_url, data):
+    """Range请求的正确性"""
+    size = len(data)
+    status, _, body = request(base_url)
+    check(status == 200 and hashlib.sha256(body).digest() == hashlib.sha256(data).digest(), "完整GET返回整个文件")
+    status, headers, body = request(base_url, {'Range': 'bytes=100-199'})
+    check(status == 206 and body == data[100:200] and headers['Content-Range'] == f'bytes 100-199/{size}', "bytes=100-199 返回206和对应片段")
+    status, _, body = request(base_url, {'Range': f'bytes={size - 10}-'})
+    check(status == 206 and body == data[-10:], "开放结尾范围")
+    status, _, body = request(base_url, {'Range': 'bytes=-500'})
+    check(status == 206 and body == data[-500:], "后缀范围 bytes=-500")
+    status, headers, _ = request(base_url, {'Range': f'bytes={size}-'})
+    check(status == 416 and headers['Content-Range'] == f'bytes */{size}', "超出文件的范围返回416")
+    status, headers, body = request(base_url, method='HEAD')
+    check(status == 200 and int(headers['Content-Length']) == size and not body, "HEAD只返回头")
+    status, _, _ = request(base_url.rsplit('/media/', 1)[0] + '/media/../media_server.py')
+    check(status == 404, "拒绝media目录之外的路径")
+
+
+async def viewer(host, port, path, size, chunk_range):
+    """模拟一个观看者：按块发送Range请求直到读完整个文件（keep-alive连接）"""
+    reader, writer = await asyncio.open_connection(host, port)
+    received = 0
+    try:
+        for start in range(0, size, chunk_range):
+            end = min(start + chunk_range, size) - 1
+            writer.write(f'GET {path} HTTP/1.1\r\nHost: {host}\r\nRange: bytes={start}-{end}\r\n\r\n'.encode())
+            await writer.drain()
+            head = await reader.readuntil(b'\r\n\r\n')
+            length = int(next(line.split(':', 1)[1] for line in head.decode().split('\r\n')
+                              if line.lower().startswith('content-length')))
+            while length:
+                block = await reader.read(min(length, 262144))
+                if not block:
+                    raise ConnectionError('连接提前关闭')
+                length -= len(block)
+                received += len(block)
+    finally:
+        writer.close()
+    return received
+
+
+def load_test(host, port, path, size, viewers, chunk_range, pid):
+    """并发观看者流式读取整个文件，期间采样服务进程的内存"""
+    samples = []
+    done = threading.Event()
+
+    def sample():
+        while not done.is_set():
+            samples.append(rss_mb(pid))
+            time.sleep(0.02)
+
+    sampler = threading.Thread(target=sample)
+    sampler.start()
+    start = time.perf_counter()
+
+    async def run_all():
+        return await asyncio.gather(*(viewer(host, port, path, size, chunk_range) for _ in range(viewers)))
+
+    received = asyncio.run(run_all())
+    elapsed = time.perf_counter() - start
+    done.set()
+    sampler.join()
+    return sum(received), elapsed, max(samples)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='媒体服务负载测试：Range请求正确性，以及并发观看人数增加时服务进程的内存')
+    parser.add_argument('--size-mb', type=int, default=32, help='测试文件大小')
+    parser.add_argument('--viewers', nargs='*', type=int, default=[1, 8, 32, 64])
+    parser.add_argument('--max-streams', type=int, default=32)
+    parser.add_argument('--chunk-mb', type=float, default=4, help='每个Range请求的大小')
+    parser.add_argument('--max-growth-mb', type=float, default=20, help='允许的内存增长')
+    args = parser.parse_args()
+
+    host, port = '127.0.0.1', free_port()
+    with tempfile.TemporaryDirectory() as media_dir:
+        data = os.urandom(args.size_mb * 2 ** 20)
+        with open(os.path.join(media_dir, 'episode.mp4'), 'wb') as f:
+            f.write(data)
+
+        server = subprocess.Popen([sys.executable, 'media_server.py', '--host', host, '--port', str(port),
+                                   '--media-dir', media_dir, '--max-streams', str(args.max_streams)])
+        try:
+            for _ in range(100):
+                try:
+                    socket.create_connection((host, port), timeout=0.1).close()
+                    break
+                except OSError:
+                    time.sleep(0.05)
+
+            base_url = f'http://{host}:{port}/media/episode.mp4'
+            check_ranges(base_url, data)
+            del data
+
+            baseline = rss_mb(server.pid)
+            print(f"\n服务进程初始内存 {baseline:.1f} MB，文件 {args.size_mb} MB，最多 {args.max_streams} 个并发传输")
+            print(f"{'观看人数':>8} {'传输量(MB)':>12} {'耗时(s)':>8} {'吞吐(MB/s)':>12} {'峰值内存(MB)':>14}")
+            peaks = []
+            for viewers in args.viewers:
+                total, elapsed, peak = load_test(host, port, '/media/episode.mp4', args.size_mb * 2 ** 20, viewers,
+                                                 int(args.chunk_mb * 2 ** 20), server.pid)
+                check(total == viewers * args.size_mb * 2 ** 20, f"{viewers} 个观看者都收到完整文件")
+                peaks.append(peak)
+                print(f"{viewers:>8} {total / 2 ** 20:>12.0f} {elapsed:>8.2f} {total / 2 ** 20 / elapsed:>12.0f} {peak:>14.1f}")
+
+            _, _, body = request(f'http://{host}:{port}/stats')
+            print(f"服务统计: {body.decode()}")
+            check(max(peaks) - baseline < args.max_growth_mb,
+                  f"内存增长 {max(peaks) - baseline:.1f} MB，小于 {args.max_growth_mb} MB（不随观看人数增长）")
+        finally:
+            server.terminate()
+            server.wait()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,78 @@
+import argparse
+import os
+import statistics
+import tempfile
+import time
+
+import music_catalog
+
+
+def check(condition, message):
+    print(f"{'通过' if condition else '失败'}  {message}")
+    if not condition:
+        raise SystemExit(1)
+
+
+def timed(func, *args, repeat=20):
+    """多次调用，返回 (中位耗时ms, 最后一次的结果)"""
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func(*args)
+        times.append((time.perf_counter() - start) * 1000)
+    return statistics.median(times), result
+
+
+def main():
+    parser = argparse.ArgumentParser(description='音乐目录基准：大目录下的搜索、歌单分页和切歌耗时')
+    parser.add_argument('--tracks', type=int, default=100000, help='测试歌曲数')
+    parser.add_argument('--max-ms', type=float, default=50, help='单次查询允许的最大耗时')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        db_path = os.path.join(tmp_dir, 'music_catalog.db')
+        tracks = music_catalog.SEED_TRACKS + music_catalog.synthetic_tracks(args.tracks)
+        start = time.perf_counter()
+        music_catalog.build_catalog(db_path, tracks, [('测试歌单', list(range(len(tracks))))])
+        print(f"生成 {len(tracks)} 首歌曲的目录: {time.perf_counter() - start:.2f} s，"
+              f"{os.path.getsize(db_path) / 2 ** 20:.1f} MB\n")
+
+        catalog = music_catalog.MusicCatalog(db_path)
+        results = []
+        for query in ['晴', '余翊', '未来的', '晴朗天空', '周 晴朗', '回忆 8', '鲸鱼 9']:
+            ms, (rows, _) = timed(catalog.search, query)
+            terms = query.lower().split()
+            check(all(all(term in row['title'].lower() or term in row['artist'].lower() for term in terms) for row in rows),
+                  f"搜索 {query!r}: {len(rows)} 条，{ms:.2f} ms")
+            results.append(ms)
+
+        # 一两个字的词按子串匹配，不只是前缀；字母不区分大小写，与全文索引一致
+        for query, track_id in [('天空', 2), ('翊', 1), ('余翊', 1), ('鯨', 3), ('DY', 3), ('dy', 3), ('Dy 念', 3), ('朗天空', 2)]:
+            rows, _ = catalog.search(query)
+            check(track_id in [row['id'] for row in rows], f"搜索 {query!r} 找到 {tracks[track_id - 1]['title']}")
+        ms, (rows, _) = timed(catalog.search, '晴朗', 200)
+        check(len(rows) == music_catalog.PAGE_SIZE, f"搜索结果第200页: {ms:.2f} ms")
+        results.append(ms)
+
+        last_page = len(tracks) // music_catalog.PAGE_SIZE
+        ms, rows = timed(catalog.playlist_page, 1, last_page)
+        first = (last_page - 1) * music_catalog.PAGE_SIZE
+        check([row['position'] for row in rows] == list(range(first, first + music_catalog.PAGE_SIZE)),
+              f"歌单第 {last_page} 页: {ms:.2f} ms")
+        results.append(ms)
+        ms, queue = timed(catalog.playlist_track_ids, 1, repeat=3)
+        check(len(queue) == len(tracks), f"读取整个歌单的歌曲id（选择歌单时一次）: {ms:.1f} ms")
+
+        # 切歌：未预读时查询数据库，预读后直接命中进程内缓存
+        cold = music_catalog.MusicCatalog(db_path)
+        cold_ms, _ = timed(lambda i: cold.track(queue[i]), 0, repeat=1)
+        index = len(queue) // 2
+        cold.prefetch([queue[index + 1], queue[index - 1]])
+        warm_ms, track = timed(cold.track, queue[index + 1])
+        check(track['id'] == queue[index + 1], f"切歌读取元数据: 未预读 {cold_ms:.3f} ms，预读后 {warm_ms:.4f} ms")
+
+        check(max(results) < args.max_ms, f"最慢查询 {max(results):.2f} ms，小于 {args.max_ms} ms")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,79 @@
+import argparse
+import time
+import warnings
+
+import joblib
+import numpy as np
+import pandas as pd
+
+from penguin_data import load_penguins
+from penguin_model import INPUT_COLUMNS, MODEL_PATH, SCALED_MODELS, FastEncoder
+
+# 模型以DataFrame训练，传入数组时sklearn会给出特征名警告，与页面一样忽略
+warnings.filterwarnings('ignore')
+
+
+def legacy_encode(model_data, prediction_data):
+    """penguin_streamlit.py 原来的编码路径：DataFrame + LabelEncoder + 按列名选择 + scaler"""
+    label_encoders = model_data['label_encoders']
+    pred_df = pd.DataFrame([prediction_data])
+    pred_df['岛屿_编码'] = label_encoders['岛屿'].transform(pred_df['企鹅栖息的岛屿'])
+    pred_df['性别_编码'] = label_encoders['性别'].transform(pred_df['性别'])
+    X_pred = pred_df[model_data['feature_names']]
+    if model_data['model_name'] in SCALED_MODELS:
+        return model_data['scaler'].transform(X_pred)
+    return X_pred.to_numpy(dtype=np.float64)
+
+
+def fast_encode(encoder, prediction_data):
+    return encoder.encode(*(prediction_data[col] for col in INPUT_COLUMNS))
+
+
+def check_parity(model_data, samples):
+    """逐行比较新旧编码结果，不一致时退出"""
+    encoder = FastEncoder(model_data)
+    for prediction_data in samples:
+        expected = legacy_encode(model_data, prediction_data)
+        actual = fast_encode(encoder, prediction_data)
+        if not np.array_equal(np.asarray(expected, dtype=np.float64), actual):
+            raise SystemExit(f"编码结果不一致（{model_data['model_name']}）: {prediction_data}\n{expected}\n{actual}")
+
+
+def time_call(func, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        func()
+    return (time.perf_counter() - start) / repeat * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description='企鹅单行特征编码：一致性检查与延迟对比')
+    parser.add_argument('--model', default=MODEL_PATH)
+    parser.add_argument('--repeat', type=int, default=2000)
+    args = parser.parse_args()
+
+    model_data = joblib.load(args.model)
+    df, _ = load_penguins()
+    samples = df[INPUT_COLUMNS].dropna().to_dict('records')
+
+    # 当前模型和需要标准化的模型两种情况都检查
+    check_parity(model_data, samples)
+    check_parity({**model_data, 'model_name': SCALED_MODELS[0]}, samples)
+    print(f"一致性检查通过（{len(samples)} 行，未标准化与标准化两种路径）")
+
+    encoder = FastEncoder(model_data)
+    model = model_data['model']
+    sample = samples[0]
+
+    legacy_us = time_call(lambda: legacy_encode(model_data, sample), args.repeat)
+    fast_us = time_call(lambda: fast_encode(encoder, sample), args.repeat)
+    print(f"编码          原路径: {legacy_us:8.1f} us  快速路径: {fast_us:8.1f} us  加速: {legacy_us / fast_us:.1f}x")
+
+    repeat = max(args.repeat // 20, 10)
+    legacy_total = time_call(lambda: model.predict_proba(legacy_encode(model_data, sample)), repeat)
+    fast_total = time_call(lambda: model.predict_proba(fast_encode(encoder, sample)), repeat)
+    print(f"编码+预测概率  原路径: {legacy_total:8.1f} us  快速路径: {fast_total:8.1f} us")
+
+
+if __name__ == '__main__':
+    main()
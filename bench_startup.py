@@ -0,0 +1,92 @@
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+# 在全新的子进程中测量，避免模块缓存影响结果
+IMPORT_SNIPPET = """
+import time
+start = time.perf_counter()
+import runpy
+runpy.run_path({script!r}, run_name='__bench__')
+print(time.perf_counter() - start)
+"""
+
+RENDER_SNIPPET = """
+import time
+from streamlit.testing.v1 import AppTest
+start = time.perf_counter()
+at = AppTest.from_file({script!r}, default_timeout=120).run()
+elapsed = time.perf_counter() - start
+if at.exception:
+    raise SystemExit(at.exception[0].value)
+print(elapsed)
+"""
+
+
+def run_snippet(snippet, script):
+    """在子进程中执行测量代码，返回最后一行输出的秒数"""
+    result = subprocess.run(
+        [sys.executable, '-c', snippet.format(script=script)],
+        capture_output=True, text=True, cwd=os.path.dirname(os.path.abspath(script)) or '.',
+        env={**os.environ, 'PYTHONPATH': os.path.dirname(os.path.abspath(script))}
+    )
+    if result.returncode != 0:
+        raise RuntimeError(f"测量失败:\n{result.stderr}")
+    return float(result.stdout.strip().splitlines()[-1])
+
+
+def measure(script, repeat):
+    """测量模块加载时间（不执行 main）和首次渲染时间，各取中位数（毫秒）"""
+    import_times = [run_snippet(IMPORT_SNIPPET, script) for _ in range(repeat)]
+    render_times = [run_snippet(RENDER_SNIPPET, script) for _ in range(repeat)]
+    return {
+        'import_ms': statistics.median(import_times) * 1000,
+        'first_render_ms': statistics.median(render_times) * 1000
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='测量Streamlit页面的启动时间，超过基线阈值时返回失败')
+    parser.add_argument('--script', default='penguin_streamlit.py', help='要测量的Streamlit脚本')
+    parser.add_argument('--repeat', type=int, default=5, help='重复测量次数，取中位数')
+    parser.add_argument('--baseline', default='bench_startup.json', help='基线结果文件')
+    parser.add_argument('--threshold', type=float, default=0.2, help='允许的相对退化比例，默认20%%')
+    parser.add_argument('--save', action='store_true', help='把本次结果保存为基线')
+    args = parser.parse_args()
+
+    current = measure(args.script, args.repeat)
+    print(f"{args.script}  模块加载: {current['import_ms']:.1f} ms  首次渲染: {current['first_render_ms']:.1f} ms")
+
+    baselines = {}
+    if os.path.exists(args.baseline):
+        with open(args.baseline, encoding='utf-8') as f:
+            baselines = json.load(f)
+
+    if args.save:
+        baselines[args.script] = current
+        with open(args.baseline, 'w', encoding='utf-8') as f:
+            json.dump(baselines, f, ensure_ascii=False, indent=2)
+        print(f"已保存基线到 {args.baseline}")
+        return
+
+    baseline = baselines.get(args.script)
+    if baseline is None:
+        print("没有基线结果，使用 --save 保存后再比较")
+        return
+
+    failed = False
+    for key, value in current.items():
+        limit = baseline[key] * (1 + args.threshold)
+        status = '通过' if value <= limit else '退化'
+        failed = failed or value > limit
+        print(f"  {key}: {value:.1f} ms（基线 {baseline[key]:.1f} ms，上限 {limit:.1f} ms）{status}")
+
+    if failed:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
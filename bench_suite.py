@@ -0,0 +1,277 @@
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import warnings
+
+import numpy as np
+import pandas as pd
+
+warnings.filterwarnings('ignore')
+
+RESULTS_DIR = 'bench_results'
+GROUPS = ['data', 'predict', 'pages', 'fragments']
+
+# 每个脚本要测量的页面：(页面名, 侧边栏单选框取值, 需要点击的按钮标签)
+PAGES = {
+    'app.py': [
+        ('项目介绍', '项目介绍', None),
+        ('专业数据分析', '专业数据分析', None),
+        ('期末成绩预测', '期末成绩预测', '📊 预测成绩')
+    ],
+    'penguin_streamlit.py': [
+        ('企鹅分类预测', None, '进行预测')
+    ],
+    'yiliao.py': [
+        ('简介', '简介', None),
+        ('预测医疗费用', '预测医疗费用', '预测费用'),
+        ('批量定价', '批量定价', None)
+    ]
+}
+
+# 改用 st.fragment 的交互区域：脚本 -> (fragment名, 触发重跑的按钮标签)
+FRAGMENTS = {
+    'app.py': ('carousel', '下一张 ▶'),
+    'sp.py': ('episode_player', '第2集'),
+    'music.py': ('player', '⏭️ 下一首')
+}
+
+
+def summarize(times):
+    return {'median_ms': statistics.median(times), 'min_ms': min(times), 'repeat': len(times)}
+
+
+def measure(func, repeat, warmup=1):
+    """多次调用并统计耗时（毫秒）"""
+    for _ in range(warmup):
+        func()
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        times.append((time.perf_counter() - start) * 1000)
+    return summarize(times)
+
+
+def make_synthetic_students(df, factor, seed=0):
+    """按比例放大学生数据：有放回抽样并给数值列加少量噪声"""
+    rng = np.random.default_rng(seed)
+    scaled = df.sample(len(df) * factor, replace=True, random_state=seed).reset_index(drop=True)
+    scaled['学号'] = np.arange(len(scaled)) + 2023000001
+    for col, low, high in [('每周学习时长（小时）', 0, 50), ('期中考试分数', 0, 100), ('期末考试分数', 0, 100)]:
+        scaled[col] = (scaled[col] + rng.normal(0, 1, len(scaled))).clip(low, high).round(2)
+    return scaled
+
+
+def bench_data(results, scales, repeat, workdir):
+    """数据加载和专业数据分析统计，包括按比例放大的合成数据集"""
+    import insurance_model
+    import penguin_data
+    import student_store
+    from student_aggregates import DATA_PATH, build_aggregates
+
+    base = pd.read_csv(DATA_PATH)
+    for factor in scales:
+        if factor == 1:
+            csv_path = DATA_PATH
+        else:
+            csv_path = os.path.join(workdir, f'students_x{factor}.csv')
+            make_synthetic_students(base, factor).to_csv(csv_path, index=False)
+        arrow_path = os.path.join(workdir, f'students_x{factor}.arrow')
+        student_store.convert_to_arrow(csv_path, arrow_path)
+
+        label = f'x{factor}'
+        results[f'load_data/students_csv/{label}'] = measure(lambda: student_store.read_csv(csv_path), repeat)
+        results[f'load_data/students_arrow/{label}'] = measure(lambda: student_store.read_arrow(arrow_path), repeat)
+        df = student_store.read_arrow(arrow_path)
+        results[f'aggregate/专业数据分析/{label}'] = measure(lambda: build_aggregates(df), repeat)
+
+    results['load_data/penguins'] = measure(lambda: penguin_data.load_penguins(), repeat)
+    results['load_data/insurance'] = measure(lambda: pd.read_csv(insurance_model.DATA_PATH, encoding='gbk'), repeat)
+
+
+def bench_predict(results, repeat, batch_rows):
+    """各模型的单行和批量预测"""
+    import inference_client
+    import insurance_model
+    import model_registry
+    import penguin_data
+    import penguin_model
+    from score_model import encode_students
+    from student_aggregates import DATA_PATH
+
+    students = encode_students(pd.read_csv(DATA_PATH)).to_numpy(dtype=np.float64)
+    students = students[np.arange(batch_rows) % len(students)]
+    results['predict/student_score/single'] = measure(lambda: inference_client.predict_local('student_score', students[:1]), repeat * 10)
+    results['predict/student_score/batch'] = measure(lambda: inference_client.predict_local('student_score', students), max(repeat // 2, 1))
+
+    penguin_md = model_registry.load_or_publish('penguin')
+    encoder = penguin_model.FastEncoder(penguin_md)
+    penguins, _ = penguin_data.load_penguins()
+    penguins = penguins[penguin_model.INPUT_COLUMNS].dropna()
+    row = penguins.iloc[0]
+    results['predict/penguin/single'] = measure(
+        lambda: inference_client.predict_local('penguin', encoder.encode(*row)), repeat * 10)
+    penguin_batch = pd.concat([penguins] * max(batch_rows // len(penguins), 1), ignore_index=True)
+    results['predict/penguin/batch'] = measure(lambda: penguin_model.classify_frame(penguin_md, penguin_batch), repeat)
+
+    insurance_md = model_registry.load_or_publish('insurance')
+    results['predict/insurance/single'] = measure(
+        lambda: insurance_model.quote_charge(insurance_md, 30, '男性', 25.0, 0, '否', '东北部'), repeat * 100)
+    insurance = pd.read_csv(insurance_model.DATA_PATH, encoding='gbk')
+    insurance_batch = pd.concat([insurance] * max(batch_rows // len(insurance), 1), ignore_index=True)
+    results['predict/insurance/batch'] = measure(lambda: insurance_model.price_frame(insurance_md, insurance_batch), repeat)
+
+
+def bench_pages(results, repeat):
+    """用 AppTest 完整重跑每个页面（缓存已预热）"""
+    from streamlit.testing.v1 import AppTest
+
+    for script, pages in PAGES.items():
+        for page_name, radio_value, button_label in pages:
+            at = AppTest.from_file(script, default_timeout=120).run()
+            if radio_value is not None:
+                at.sidebar.radio[0].set_value(radio_value).run()
+
+            def rerun():
+                if button_label is not None:
+                    next(button for button in at.button if button.label == button_label).click()
+                at.run()
+                if at.exception:
+                    raise RuntimeError(f"{script} {page_name}: {at.exception[0].value}")
+
+            results[f'page/{script}/{page_name}'] = measure(rerun, repeat)
+
+
+def bench_fragments(results, repeat):
+    """点击按钮的重跑耗时：full 为整页重跑（改用 st.fragment 之前每次点击的代价），
+    fragment 为 fragment 函数本身的耗时（之后每次点击只重跑这一部分，由 tracing 在整页重跑中测得）"""
+    import tracing
+    from streamlit.testing.v1 import AppTest
+
+    enabled = tracing.ENABLED
+    tracing.ENABLED = True
+    try:
+        for script, (fragment, button_label) in FRAGMENTS.items():
+            at = AppTest.from_file(script, default_timeout=120).run()
+
+            def fragment_seconds():
+                return sum(total for (_, name), (_, total) in tracing.snapshot().items() if name == f'fragment:{fragment}')
+
+            full_times, fragment_times = [], []
+            for i in range(repeat + 1):
+                before = fragment_seconds()
+                start = time.perf_counter()
+                next(button for button in at.button if button.label == button_label).click()
+                at.run()
+                elapsed = time.perf_counter() - start
+                if at.exception:
+                    raise RuntimeError(f"{script} {fragment}: {at.exception[0].value}")
+                # 第一次作为预热
+                if i:
+                    full_times.append(elapsed * 1000)
+                    fragment_times.append((fragment_seconds() - before) * 1000)
+
+            results[f'rerun/{script}/full'] = summarize(full_times)
+            results[f'rerun/{script}/fragment:{fragment}'] = summarize(fragment_times)
+    finally:
+        tracing.ENABLED = enabled
+
+
+def git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return 'unknown'
+
+
+def run(args):
+    results = {}
+    with tempfile.TemporaryDirectory() as workdir:
+        if 'data' in args.groups:
+            bench_data(results, args.scales, args.repeat, workdir)
+        if 'predict' in args.groups:
+            bench_predict(results, args.repeat, args.batch_rows)
+        if 'pages' in args.groups:
+            bench_pages(results, args.repeat)
+        if 'fragments' in args.groups:
+            bench_fragments(results, args.repeat)
+
+    commit = git_commit()
+    report = {
+        'meta': {
+            'commit': commit,
+            'timestamp': time.strftime('%Y-%m-%d %H:%M:%S'),
+            'python': platform.python_version(),
+            'machine': platform.machine(),
+            'cpus': os.cpu_count()
+        },
+        'results': results
+    }
+    output = args.output or os.path.join(RESULTS_DIR, f'{commit}.json')
+    os.makedirs(os.path.dirname(output) or '.', exist_ok=True)
+    with open(output, 'w', encoding='utf-8') as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+
+    for name, result in results.items():
+        print(f"{name:<45} {result['median_ms']:>10.3f} ms")
+    print(f"结果已写入 {output}")
+
+
+def compare(args):
+    with open(args.base, encoding='utf-8') as f:
+        base = json.load(f)
+    with open(args.head, encoding='utf-8') as f:
+        head = json.load(f)
+
+    print(f"基准: {base['meta']['commit']}  对比: {head['meta']['commit']}")
+    regressions = []
+    for name in sorted(set(base['results']) | set(head['results'])):
+        if name not in base['results'] or name not in head['results']:
+            print(f"{name:<45} {'仅在一侧存在':>30}")
+            continue
+        before = base['results'][name]['median_ms']
+        after = head['results'][name]['median_ms']
+        ratio = after / before if before else float('inf')
+        flag = ''
+        if ratio > 1 + args.threshold:
+            flag = '退化'
+            regressions.append(name)
+        elif ratio < 1 - args.threshold:
+            flag = '提升'
+        print(f"{name:<45} {before:>10.3f} -> {after:>10.3f} ms  {ratio:>6.2f}x  {flag}")
+
+    if regressions:
+        print(f"{len(regressions)} 项超过 {args.threshold:.0%} 的退化阈值")
+        sys.exit(1)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='性能基准测试：数据加载、统计、预测和页面重跑')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    run_parser = subparsers.add_parser('run', help='运行基准测试并保存JSON结果')
+    run_parser.add_argument('--groups', nargs='*', default=GROUPS, choices=GROUPS)
+    run_parser.add_argument('--scales', nargs='*', type=int, default=[1, 10, 100], help='学生数据的放大倍数')
+    run_parser.add_argument('--repeat', type=int, default=5)
+    run_parser.add_argument('--batch-rows', type=int, default=50000, help='批量预测的行数')
+    run_parser.add_argument('--output', help=f'结果文件，默认 {RESULTS_DIR}/<commit>.json')
+    run_parser.set_defaults(func=run)
+
+    compare_parser = subparsers.add_parser('compare', help='比较两次基准测试结果')
+    compare_parser.add_argument('base', help='基准结果文件')
+    compare_parser.add_argument('head', help='对比结果文件')
+    compare_parser.add_argument('--threshold', type=float, default=0.1, help='视为退化的相对变化，默认10%%')
+    compare_parser.set_defaults(func=compare)
+
+    args = parser.parse_args()
+    args.func(args)
+
+
+if __name__ == '__main__':
+    main()
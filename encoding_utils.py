@@ -0,0 +1,23 @@
+# 中文CSV常见的编码，按判断顺序排列（GB2312是GBK的子集，无需单独尝试）
+CANDIDATE_ENCODINGS = ['utf-8', 'gbk']
+
+
+def sniff_encoding(prefix):
+    """根据文件开头的字节样本判断编码，只需读取一次样本，不需要反复解析整个文件"""
+    if prefix.startswith(b'\xef\xbb\xbf'):
+        return 'utf-8-sig'
+    for encoding in CANDIDATE_ENCODINGS:
+        try:
+            prefix.decode(encoding)
+            return encoding
+        except UnicodeDecodeError as e:
+            # 样本截断在多字节字符中间导致的错误不算
+            if e.start >= len(prefix) - 3:
+                return encoding
+    # latin-1 可以解码任意字节，作为最后的选择
+    return 'latin-1'
+
+
+def sniff_file_encoding(path, sample_size=65536):
+    with open(path, 'rb') as f:
+        return sniff_encoding(f.read(sample_size))
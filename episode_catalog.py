@@ -0,0 +1,195 @@
+# 剧集目录：剧集、剧集介绍和演职人员保存在SQLite数据库中（series / episodes / people / episode_cast 四张表），
+# 演职人员按 姓名+照片 去重只保存一份。页面每次重跑只查询当前页的剧集编号和当前剧集的详情。
+import argparse
+import os
+import sqlite3
+import threading
+
+DB_PATH = 'episode_catalog.db'
+PAGE_SIZE = 12
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS series (
+    id INTEGER PRIMARY KEY,
+    title TEXT NOT NULL,
+    cover TEXT
+);
+CREATE TABLE IF NOT EXISTS episodes (
+    id INTEGER PRIMARY KEY,
+    series_id INTEGER NOT NULL REFERENCES series(id),
+    number INTEGER NOT NULL,
+    label TEXT NOT NULL,
+    description TEXT,
+    url TEXT NOT NULL,
+    file TEXT,
+    cover TEXT,
+    UNIQUE (series_id, number)
+);
+CREATE TABLE IF NOT EXISTS people (
+    id INTEGER PRIMARY KEY,
+    name TEXT NOT NULL,
+    photo TEXT,
+    UNIQUE (name, photo)
+);
+CREATE TABLE IF NOT EXISTS episode_cast (
+    episode_id INTEGER NOT NULL REFERENCES episodes(id),
+    person_id INTEGER NOT NULL REFERENCES people(id),
+    role TEXT,
+    position INTEGER NOT NULL,
+    PRIMARY KEY (episode_id, position)
+);
+"""
+
+_PHOTO = "https://images.unsplash.com/photo-1534528741775-53994a69daeb?ixlib=rb-1.2.1&auto=format&fit=crop&w=100&q=80"
+_COVER = "https://images.unsplash.com/photo-1536440136628-849c177e76a1?ixlib=rb-1.2.1&auto=format&fit=crop&w=200&q=80"
+_CAST = [
+    {"name": "赵薇", "role": "小燕子", "photo": _PHOTO},
+    {"name": "林心如", "role": "紫薇", "photo": _PHOTO},
+    {"name": "苏有朋", "role": "五阿哥", "photo": _PHOTO}
+]
+
+# 初始目录数据（原 sp.py 中的剧集列表）
+SEED_SERIES = [
+    {
+        "title": "还珠格格第一部",
+        "cover": _COVER,
+        "episodes": [
+            {
+                "label": "第1集",
+                "url": "https://media.w3.org/2010/05/sintel/trailer.mp4",
+                "file": "sintel_trailer.mp4",
+                "description": "《还珠格格第一部》是一部经典的古装言情剧，讲述了乾隆皇帝的女儿紫薇到北京与失散多年的父亲相认的故事。剧中充满了爱情、友情和亲情的感人故事，深受观众喜爱。",
+                "cast": _CAST
+            },
+            {
+                "label": "第2集",
+                "url": "https://www.w3schools.com/html/mov_bbb.mp4",
+                "file": "mov_bbb.mp4",
+                "description": "在这一集中，小燕子和紫薇继续她们的冒险，遇到了更多的挑战和机遇。她们的友谊面临考验，同时也收获了新的朋友和支持者。",
+                "cast": _CAST
+            },
+            {
+                "label": "第3集",
+                "url": "https://media.w3.org/2010/05/bunny/trailer.mp4",
+                "file": "bunny_trailer.mp4",
+                "description": "剧情进一步发展，小燕子和紫薇的身份之谜逐渐揭开，她们面临着来自宫廷的种种挑战。在朋友的帮助下，她们勇敢地面对困难，展现了坚强的意志和智慧。",
+                "cast": _CAST
+            }
+        ]
+    }
+]
+
+
+def synthetic_series(episode_count):
+    """生成包含大量剧集的测试剧集，循环使用初始数据中的视频和演职人员"""
+    seed = SEED_SERIES[0]['episodes']
+    return [{
+        "title": f"测试剧集（{episode_count}集）",
+        "cover": _COVER,
+        "episodes": [
+            {**seed[i % len(seed)], "label": f"第{i + 1}集", "description": f"测试剧集第{i + 1}集。"}
+            for i in range(episode_count)
+        ]
+    }]
+
+
+def build_catalog(db_path=DB_PATH, series_list=SEED_SERIES):
+    """把嵌套的剧集数据写入数据库，演职人员去重保存"""
+    tmp_path = f'{db_path}.{os.getpid()}.tmp'
+    if os.path.exists(tmp_path):
+        os.remove(tmp_path)
+    conn = sqlite3.connect(tmp_path)
+    try:
+        conn.executescript(SCHEMA)
+        people = {}
+        for series in series_list:
+            series_id = conn.execute('INSERT INTO series (title, cover) VALUES (?, ?)',
+                                     (series['title'], series.get('cover'))).lastrowid
+            for number, episode in enumerate(series['episodes'], start=1):
+                episode_id = conn.execute(
+                    'INSERT INTO episodes (series_id, number, label, description, url, file, cover) VALUES (?, ?, ?, ?, ?, ?, ?)',
+                    (series_id, number, episode['label'], episode.get('description'), episode['url'],
+                     episode.get('file'), episode.get('cover', series.get('cover')))
+                ).lastrowid
+                for position, person in enumerate(episode.get('cast', [])):
+                    key = (person['name'], person.get('photo'))
+                    if key not in people:
+                        people[key] = conn.execute('INSERT INTO people (name, photo) VALUES (?, ?)', key).lastrowid
+                    conn.execute('INSERT INTO episode_cast (episode_id, person_id, role, position) VALUES (?, ?, ?, ?)',
+                                 (episode_id, people[key], person.get('role'), position))
+        conn.commit()
+    finally:
+        conn.close()
+    os.replace(tmp_path, db_path)
+
+
+class EpisodeCatalog:
+    """只读访问剧集目录，每个线程使用自己的连接"""
+
+    def __init__(self, db_path=DB_PATH):
+        if not os.path.exists(db_path):
+            build_catalog(db_path)
+        self.db_path = db_path
+        self._local = threading.local()
+
+    def _conn(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(f'file:{self.db_path}?mode=ro', uri=True)
+            conn.row_factory = sqlite3.Row
+            self._local.conn = conn
+        return conn
+
+    def series(self):
+        return [dict(row) for row in self._conn().execute('SELECT id, title FROM series ORDER BY id')]
+
+    def episode_count(self, series_id):
+        return self._conn().execute('SELECT COUNT(*) FROM episodes WHERE series_id = ?', (series_id,)).fetchone()[0]
+
+    def episode_page(self, series_id, page=1, page_size=PAGE_SIZE):
+        """一页剧集的编号和标题（不包含介绍和演职人员）"""
+        rows = self._conn().execute(
+            'SELECT id, number, label FROM episodes WHERE series_id = ? AND number > ? ORDER BY number LIMIT ?',
+            (series_id, (page - 1) * page_size, page_size)
+        )
+        return [dict(row) for row in rows]
+
+    def episode(self, episode_id):
+        """单个剧集的详情和演职人员"""
+        row = self._conn().execute(
+            'SELECT e.id, e.series_id, e.number, e.label, e.description, e.url, e.file, e.cover, s.title '
+            'FROM episodes e JOIN series s ON s.id = e.series_id WHERE e.id = ?',
+            (episode_id,)
+        ).fetchone()
+        if row is None:
+            raise KeyError(episode_id)
+        episode = dict(row)
+        episode['cast'] = [dict(person) for person in self._conn().execute(
+            'SELECT p.name, p.photo, c.role FROM episode_cast c JOIN people p ON p.id = c.person_id '
+            'WHERE c.episode_id = ? ORDER BY c.position',
+            (episode_id,)
+        )]
+        return episode
+
+    def first_episode_id(self, series_id):
+        row = self._conn().execute('SELECT id FROM episodes WHERE series_id = ? ORDER BY number LIMIT 1', (series_id,)).fetchone()
+        return row[0] if row else None
+
+
+def main():
+    parser = argparse.ArgumentParser(description='生成剧集目录数据库')
+    parser.add_argument('--db', default=DB_PATH)
+    parser.add_argument('--synthetic-episodes', type=int, default=0, help='额外生成一个包含指定集数的测试剧集')
+    args = parser.parse_args()
+
+    series_list = SEED_SERIES + (synthetic_series(args.synthetic_episodes) if args.synthetic_episodes else [])
+    build_catalog(args.db, series_list)
+    conn = sqlite3.connect(args.db)
+    counts = {table: conn.execute(f'SELECT COUNT(*) FROM {table}').fetchone()[0]
+              for table in ['series', 'episodes', 'people', 'episode_cast']}
+    conn.close()
+    print(f"已生成 {args.db}: " + '，'.join(f'{table} {count} 行' for table, count in counts.items()))
+
+
+if __name__ == '__main__':
+    main()
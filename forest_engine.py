@@ -0,0 +1,104 @@
+import numpy as np
+
+
+class CompiledForest:
+    """把训练好的随机森林回归模型展开为连续的NumPy数组，用向量化遍历代替sklearn的逐次调用"""
+
+    def __init__(self, model, chunk_size=65536, lockstep_rows=256):
+        trees = [estimator.tree_ for estimator in model.estimators_]
+        if any(tree.n_outputs != 1 for tree in trees):
+            raise ValueError("只支持单输出的回归森林")
+
+        node_counts = np.array([tree.node_count for tree in trees])
+        # 每棵树的根节点在合并数组中的位置
+        self.roots = np.concatenate([[0], np.cumsum(node_counts)[:-1]]).astype(np.int64)
+
+        features, thresholds, missing_lefts, lefts, rights, values = [], [], [], [], [], []
+        for root, tree in zip(self.roots, trees):
+            nodes = np.arange(tree.node_count)
+            is_leaf = tree.children_left == -1
+            # 叶子节点的左右子节点都指向自身，多余的遍历步骤停留在叶子上
+            lefts.append(np.where(is_leaf, nodes, tree.children_left) + root)
+            rights.append(np.where(is_leaf, nodes, tree.children_right) + root)
+            features.append(np.where(is_leaf, 0, tree.feature))
+            thresholds.append(tree.threshold)
+            # 特征缺失（NaN）时按训练时学到的方向走，与sklearn一致
+            missing_lefts.append(tree.missing_go_to_left.astype(bool))
+            values.append(tree.value[:, 0, 0])
+
+        self.feature = np.ascontiguousarray(np.concatenate(features), dtype=np.int32)
+        self.threshold = np.ascontiguousarray(np.concatenate(thresholds), dtype=np.float64)
+        self.missing_left = np.ascontiguousarray(np.concatenate(missing_lefts), dtype=bool)
+        self.left = np.ascontiguousarray(np.concatenate(lefts), dtype=np.int64)
+        self.right = np.ascontiguousarray(np.concatenate(rights), dtype=np.int64)
+        self.value = np.ascontiguousarray(np.concatenate(values), dtype=np.float64)
+        self.is_leaf = self.left == np.arange(len(self.left))
+
+        self.max_depth = max(tree.max_depth for tree in trees)
+        self.n_features = model.n_features_in_
+        # 分块大小限制大批量预测的临时内存；行数不超过 lockstep_rows 时所有树同步遍历
+        self.chunk_size = chunk_size
+        self.lockstep_rows = lockstep_rows
+
+    def __setstate__(self, state):
+        # 注册表中早先发布的引擎没有保存缺失值方向，无法与sklearn保持一致，需要重新发布
+        if 'missing_left' not in state:
+            raise ValueError("随机森林引擎缺少缺失值方向，请运行 python model_registry.py publish student_score 重新发布")
+        self.__dict__.update(state)
+
+    def _predict_lockstep(self, X):
+        """少量行：所有树同步遍历，每一步是一次覆盖全部树的向量化操作"""
+        rows = np.arange(len(X))[:, None]
+        nodes = np.broadcast_to(self.roots, (len(X), len(self.roots)))
+        for _ in range(self.max_depth):
+            x = X[rows, self.feature[nodes]]
+            go_left = np.where(np.isnan(x), self.missing_left[nodes], x <= self.threshold[nodes])
+            nodes = np.where(go_left, self.left[nodes], self.right[nodes])
+        return self.value[nodes]
+
+    def _predict_per_tree(self, X):
+        """大批量：逐棵树遍历，只保留尚未到达叶子的行，避免在叶子上空转"""
+        n_rows = len(X)
+        flat_X = X.ravel()
+        row_offsets = np.arange(n_rows) * X.shape[1]
+        leaf_values = np.empty((n_rows, len(self.roots)))
+        for i, root in enumerate(self.roots):
+            nodes = np.full(n_rows, root)
+            active = np.arange(n_rows)
+            while active.size:
+                current = nodes[active]
+                x = flat_X[row_offsets[active] + self.feature[current]]
+                go_left = np.where(np.isnan(x), self.missing_left[current], x <= self.threshold[current])
+                current = np.where(go_left, self.left[current], self.right[current])
+                nodes[active] = current
+                active = active[~self.is_leaf[current]]
+            leaf_values[:, i] = self.value[nodes]
+        return leaf_values
+
+    def _predict_chunk(self, X):
+        if len(X) <= self.lockstep_rows:
+            leaf_values = self._predict_lockstep(X)
+        else:
+            leaf_values = self._predict_per_tree(X)
+
+        # 与sklearn一致：逐棵树按顺序累加后再取平均，保证结果逐位相同
+        total = np.zeros(len(X))
+        for i in range(leaf_values.shape[1]):
+            total += leaf_values[:, i]
+        return total / leaf_values.shape[1]
+
+    def predict(self, X):
+        """预测一行或多行特征，输入可以是DataFrame、二维数组或单行一维数组"""
+        # sklearn的决策树在float32精度下比较特征和阈值
+        X = np.ascontiguousarray(X, dtype=np.float32)
+        if X.ndim == 1:
+            X = X[None, :]
+        if X.shape[1] != self.n_features:
+            raise ValueError(f"特征数量应为 {self.n_features}，实际为 {X.shape[1]}")
+
+        if len(X) <= self.chunk_size:
+            return self._predict_chunk(X)
+        return np.concatenate([
+            self._predict_chunk(X[start:start + self.chunk_size])
+            for start in range(0, len(X), self.chunk_size)
+        ])
@@ -0,0 +1,153 @@
+# 图片资源管道：按页面实际显示的宽度预先生成压缩后的图片，保存在以内容哈希命名的缓存目录中，
+# 生成后的字节保存在进程内的LRU缓存里。st.image 只对 JPEG/PNG/GIF 原样发送，其他格式（包括WebP）
+# 每次渲染都会重新编码，因此不透明的图片生成JPEG，带透明通道的图片生成调色板PNG；
+# 宽度不超过显示宽度、格式一致时 st.image 不再在每次渲染时缩放和重新编码。
+import argparse
+import hashlib
+import io
+import os
+import threading
+from collections import OrderedDict
+
+CACHE_DIR = '.image_cache'
+JPEG_QUALITY = 80
+WEBP_QUALITY = 80
+# 进程内缓存的最大字节数
+MAX_CACHE_BYTES = 32 * 2 ** 20
+
+# 各页面显示的本地图片及显示宽度（像素）
+ASSETS = [
+    ('1.jpg', 960),
+    ('2.jpg', 960),
+    ('3.jpg', 960),
+    ('tongguo.jpg', 500),
+    ('guake.jpg', 500),
+    ('阿德利企鹅.png', 300),
+    ('巴布亚企鹅.png', 300),
+    ('帽带企鹅.png', 300)
+]
+
+FORMATS = {'jpeg': 'JPEG', 'png': 'PNG', 'webp': 'WEBP'}
+
+_hashes = {}
+_variants = OrderedDict()
+_variant_bytes = 0
+_lock = threading.Lock()
+
+
+def content_hash(path):
+    """文件内容的SHA-256（前16位），按修改时间和大小缓存，文件不变时不重复计算"""
+    stat = os.stat(path)
+    key = (path, stat.st_mtime_ns, stat.st_size)
+    digest = _hashes.get(key)
+    if digest is None:
+        with open(path, 'rb') as f:
+            digest = hashlib.sha256(f.read()).hexdigest()[:16]
+        _hashes[key] = digest
+    return digest
+
+
+def _has_alpha(image):
+    return image.mode in ('RGBA', 'LA', 'PA') and image.getchannel('A').getextrema()[0] < 255
+
+
+def _encode(image, fmt):
+    """把图片编码为指定格式的字节"""
+    from PIL import Image
+
+    output = io.BytesIO()
+    if fmt == 'jpeg':
+        image.convert('L' if image.mode == 'L' else 'RGB').save(output, 'JPEG', quality=JPEG_QUALITY, optimize=True, progressive=True)
+    elif fmt == 'png':
+        # 透明图片量化为256色调色板，体积约为原PNG的五分之一
+        image.convert('RGBA').quantize(256, method=Image.Quantize.FASTOCTREE).save(output, 'PNG', optimize=True)
+    elif fmt == 'webp':
+        image.save(output, 'WEBP', quality=WEBP_QUALITY, method=6)
+    else:
+        raise ValueError(f"不支持的图片格式: {fmt}，可选 {', '.join(FORMATS)}")
+    return output.getvalue()
+
+
+def build_variant(path, width, fmt=None):
+    """生成图片在指定显示宽度下的版本（不放大），已存在时直接返回缓存文件路径"""
+    from PIL import Image
+
+    variant_dir = os.path.join(CACHE_DIR, content_hash(path))
+    stem = os.path.splitext(os.path.basename(path))[0]
+    if fmt is not None:
+        candidates = [fmt]
+    else:
+        candidates = ['jpeg', 'png']
+    for candidate in candidates:
+        existing = os.path.join(variant_dir, f'{stem}-{width}w.{candidate}')
+        if os.path.exists(existing):
+            return existing
+
+    with Image.open(path) as image:
+        image.load()
+        source_format = image.format
+        # 不指定格式时按是否透明自动选择JPEG或PNG
+        fmt = fmt or ('png' if _has_alpha(image) else 'jpeg')
+        if image.width > width:
+            image = image.resize((width, round(image.height * width / image.width)), Image.LANCZOS)
+            data = _encode(image, fmt)
+        elif source_format == FORMATS[fmt]:
+            # 原图不超过显示宽度且格式相同，直接使用原文件
+            with open(path, 'rb') as f:
+                data = f.read()
+        else:
+            data = _encode(image, fmt)
+
+    os.makedirs(variant_dir, exist_ok=True)
+    variant_path = os.path.join(variant_dir, f'{stem}-{width}w.{fmt}')
+    tmp_path = f'{variant_path}.{os.getpid()}.tmp'
+    with open(tmp_path, 'wb') as f:
+        f.write(data)
+    os.replace(tmp_path, variant_path)
+    return variant_path
+
+
+def load_variant(path, width, fmt=None):
+    """返回图片在指定显示宽度下的字节，优先从进程内LRU缓存读取"""
+    global _variant_bytes
+    key = (path, content_hash(path), width, fmt)
+    with _lock:
+        data = _variants.get(key)
+        if data is not None:
+            _variants.move_to_end(key)
+            return data
+
+    with open(build_variant(path, width, fmt), 'rb') as f:
+        data = f.read()
+
+    with _lock:
+        if key not in _variants:
+            _variants[key] = data
+            _variant_bytes += len(data)
+            while _variant_bytes > MAX_CACHE_BYTES and len(_variants) > 1:
+                _, evicted = _variants.popitem(last=False)
+                _variant_bytes -= len(evicted)
+    return data
+
+
+def show_image(path, width, display_width=None, **kwargs):
+    """用 st.image 显示图片的显示尺寸版本；display_width 默认与 width 相同，也可以是 'stretch' 等"""
+    import streamlit as st
+
+    st.image(load_variant(path, width), width=display_width or width, **kwargs)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='预先生成页面图片的显示尺寸版本')
+    parser.add_argument('--format', choices=list(FORMATS), help='输出格式，默认不透明图片为JPEG、透明图片为PNG')
+    args = parser.parse_args()
+
+    for path, width in ASSETS:
+        variant_path = build_variant(path, width, args.format)
+        before = os.path.getsize(path)
+        after = os.path.getsize(variant_path)
+        print(f"{path:<16} {before / 1024:>8.1f} KB -> {after / 1024:>7.1f} KB  {variant_path}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,87 @@
+import json
+import os
+import threading
+import urllib.request
+
+import numpy as np
+
+import model_registry
+
+# 推理服务地址，例如 http://127.0.0.1:8600；未设置或服务不可用时在本进程内直接预测
+SERVER_URL = os.environ.get('INFERENCE_SERVER_URL', '')
+TIMEOUT = float(os.environ.get('INFERENCE_SERVER_TIMEOUT', 2.0))
+
+
+def _student_score_predictor(version):
+    """输入编码后的学生特征，输出预测的期末考试分数"""
+    return model_registry.load('student_score', version)['engine'].predict
+
+
+def _penguin_predictor(version):
+    """输入 FastEncoder 编码（需要时已标准化）的特征，输出各类别概率，列顺序与 model.classes_ 一致"""
+    return model_registry.load('penguin', version)['model'].predict_proba
+
+
+def _insurance_predictor(version):
+    """输入编码后的被保险人特征，输出应用下限后的医疗费用"""
+    from insurance_model import MIN_CHARGE
+    model_data = model_registry.load('insurance', version)
+    return lambda X: np.maximum(MIN_CHARGE, X @ model_data['coef'] + model_data['intercept'])
+
+
+PREDICTOR_FACTORIES = {
+    'student_score': _student_score_predictor,
+    'penguin': _penguin_predictor,
+    'insurance': _insurance_predictor
+}
+
+# 各模型输入的特征列数，推理服务据此拒绝列数不符的请求
+FEATURE_COUNTS = {
+    'student_score': lambda: model_registry.load_or_publish('student_score')['engine'].n_features,
+    'penguin': lambda: model_registry.load_or_publish('penguin')['model'].n_features_in_,
+    'insurance': lambda: len(model_registry.load_or_publish('insurance')['coef'])
+}
+
+_predictors = {}
+_lock = threading.Lock()
+
+
+def get_predictor(name):
+    """返回本进程内最新版本模型的批量预测函数，首次使用时加载；注册表发布新版本后改用新版本"""
+    version = model_registry.current_version(name)
+    with _lock:
+        cached = _predictors.get(name)
+        if cached is None or cached[0] != version:
+            _predictors[name] = (version, PREDICTOR_FACTORIES[name](version))
+        return _predictors[name][1]
+
+
+def feature_count(name):
+    return int(FEATURE_COUNTS[name]())
+
+
+def predict_local(name, X):
+    return np.asarray(get_predictor(name)(np.asarray(X, dtype=np.float64)))
+
+
+def predict_remote(name, X, server_url=None, timeout=TIMEOUT):
+    """通过推理服务预测，服务会把并发请求合并成小批量"""
+    request = urllib.request.Request(
+        f"{(server_url or SERVER_URL).rstrip('/')}/predict/{name}",
+        data=json.dumps({'rows': np.asarray(X, dtype=np.float64).tolist()}).encode('utf-8'),
+        headers={'Content-Type': 'application/json'},
+        method='POST'
+    )
+    with urllib.request.urlopen(request, timeout=timeout) as response:
+        return np.asarray(json.load(response)['predictions'])
+
+
+def predict(name, X):
+    """预测一行或多行已编码的特征；配置了推理服务时优先调用服务，失败则回退到本进程内预测"""
+    X = np.atleast_2d(np.asarray(X, dtype=np.float64))
+    if SERVER_URL:
+        try:
+            return predict_remote(name, X)
+        except (OSError, ValueError, KeyError) as e:
+            print(f"推理服务不可用，改为本地预测: {e}")
+    return predict_local(name, X)
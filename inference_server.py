@@ -0,0 +1,167 @@
+import argparse
+import asyncio
+import functools
+import json
+import time
+
+import numpy as np
+import tornado.web
+
+from inference_client import PREDICTOR_FACTORIES, feature_count, get_predictor, predict_local
+
+
+class MicroBatcher:
+    """把并发到达的预测请求合并为小批量：凑满 max_batch_size 行或等待 max_wait 秒后执行一次预测"""
+
+    def __init__(self, predict, n_features, max_batch_size=256, max_wait=0.005):
+        self.predict = predict
+        self.n_features = n_features
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait
+        self.queue = asyncio.Queue()
+        self.requests = 0
+        self.batches = 0
+        self.rows = 0
+
+    async def submit(self, X):
+        future = asyncio.get_running_loop().create_future()
+        await self.queue.put((X, future))
+        return await future
+
+    async def _collect(self):
+        """取出第一个请求后，在等待时间内继续收集请求，直到凑满一个批次"""
+        loop = asyncio.get_running_loop()
+        batch = [await self.queue.get()]
+        rows = len(batch[0][0])
+        deadline = loop.time() + self.max_wait
+        while rows < self.max_batch_size:
+            timeout = deadline - loop.time()
+            if timeout <= 0:
+                break
+            try:
+                item = await asyncio.wait_for(self.queue.get(), timeout)
+            except asyncio.TimeoutError:
+                break
+            batch.append(item)
+            rows += len(item[0])
+        return batch
+
+    async def run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = await self._collect()
+            try:
+                X = np.concatenate([item[0] for item in batch])
+                # 预测在线程池中执行，不阻塞事件循环接收新的请求
+                predictions = await loop.run_in_executor(None, self.predict, X)
+            except Exception as e:
+                # 只让这一批的请求失败，批处理循环继续处理后面的请求
+                for _, future in batch:
+                    if not future.done():
+                        future.set_exception(e)
+                continue
+
+            self.requests += len(batch)
+            self.batches += 1
+            self.rows += len(X)
+            offset = 0
+            for rows, future in batch:
+                if not future.done():
+                    future.set_result(predictions[offset:offset + len(rows)])
+                offset += len(rows)
+
+    def stats(self):
+        return {
+            'requests': self.requests,
+            'batches': self.batches,
+            'rows': self.rows,
+            'avg_batch_rows': self.rows / self.batches if self.batches else 0.0
+        }
+
+
+class PredictHandler(tornado.web.RequestHandler):
+    def initialize(self, batchers):
+        self.batchers = batchers
+
+    async def post(self, name):
+        if name not in self.batchers:
+            raise tornado.web.HTTPError(404, f'未知模型: {name}')
+        try:
+            X = np.atleast_2d(np.asarray(json.loads(self.request.body)['rows'], dtype=np.float64))
+        except (ValueError, KeyError, TypeError) as e:
+            raise tornado.web.HTTPError(400, f'请求格式错误: {e}')
+        # 形状不符的请求在进入批次前拒绝，否则会让同一批次中的其他请求一起失败
+        n_features = self.batchers[name].n_features
+        if X.ndim != 2 or X.shape[1] != n_features:
+            raise tornado.web.HTTPError(400, f'请求格式错误: 需要 (行数, {n_features}) 的二维数组，收到 {X.shape}')
+
+        start = time.perf_counter()
+        try:
+            predictions = await self.batchers[name].submit(X)
+        except ValueError as e:
+            raise tornado.web.HTTPError(400, str(e))
+        self.write({
+            'predictions': np.asarray(predictions).tolist(),
+            'latency_ms': (time.perf_counter() - start) * 1000
+        })
+
+
+class StatsHandler(tornado.web.RequestHandler):
+    def initialize(self, batchers):
+        self.batchers = batchers
+
+    def get(self):
+        self.write({name: batcher.stats() for name, batcher in self.batchers.items()})
+
+
+def start_batcher(name, batcher, tasks):
+    """启动批处理任务；任务异常退出时记录错误并重新启动，保证该模型的请求不会一直挂起"""
+    task = asyncio.create_task(batcher.run(), name=f'batcher:{name}')
+    tasks.append(task)
+
+    def on_done(task):
+        tasks.remove(task)
+        if task.cancelled():
+            return
+        error = task.exception()
+        if error is not None:
+            print(f"模型 {name} 的批处理任务异常退出，重新启动: {error!r}")
+            start_batcher(name, batcher, tasks)
+
+    task.add_done_callback(on_done)
+
+
+async def serve(host, port, models, max_batch_size, max_wait):
+    batchers = {}
+    # 保存任务的引用，避免被事件循环回收
+    tasks = []
+    for name in models:
+        # 启动时加载模型，避免第一个请求承担加载耗时；每个批次通过 predict_local 使用注册表中的最新版本
+        get_predictor(name)
+        batchers[name] = MicroBatcher(functools.partial(predict_local, name), feature_count(name), max_batch_size, max_wait)
+        start_batcher(name, batchers[name], tasks)
+
+    app = tornado.web.Application([
+        (r'/predict/(\w+)', PredictHandler, {'batchers': batchers}),
+        (r'/stats', StatsHandler, {'batchers': batchers})
+    ])
+    app.listen(port, address=host)
+    print(f"推理服务已启动: http://{host}:{port}（模型: {', '.join(models)}，"
+          f"最大批量 {max_batch_size} 行，最长等待 {max_wait * 1000:.1f} ms）")
+    await asyncio.Event().wait()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='本地推理服务：合并并发请求为小批量预测')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8600)
+    parser.add_argument('--models', nargs='*', default=list(PREDICTOR_FACTORIES), choices=list(PREDICTOR_FACTORIES))
+    parser.add_argument('--max-batch-size', type=int, default=256, help='每个批次的最大行数')
+    parser.add_argument('--max-wait-ms', type=float, default=5.0, help='凑批次的最长等待时间（毫秒）')
+    args = parser.parse_args()
+
+    asyncio.run(serve(args.host, args.port, args.models, args.max_batch_size, args.max_wait_ms / 1000))
+
+
+if __name__ == '__main__':
+    main()
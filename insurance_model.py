@@ -0,0 +1,200 @@
+import os
+
+import joblib
+import numpy as np
+import pandas as pd
+from sklearn.linear_model import LinearRegression
+from sklearn.preprocessing import LabelEncoder
+
+DATA_PATH = '（医疗费用预测数据）insurance-chinese.csv'
+MODEL_PATH = 'insurance_model.pkl'
+
+FEATURES = ['年龄', '性别', 'BMI', '子女数量', '是否吸烟', '区域']
+CATEGORY_COLUMNS = ['性别', '是否吸烟', '区域']
+TARGET = '医疗费用'
+
+# 预测结果的下限（数据集中医疗费用的5%分位数）
+MIN_CHARGE = 1757.75
+
+PRICE_COLUMN = '预测医疗费用'
+
+# 报价表覆盖的离散取值范围（与定价表单一致），BMI为连续值，按线性系数解析计算
+QUOTE_AGES = range(0, 121)
+QUOTE_CHILDREN = range(0, 11)
+
+
+def train_model(data_path=DATA_PATH):
+    """读取医疗费用数据，训练编码器和线性回归模型"""
+    # 使用GBK编码读取CSV文件
+    data = pd.read_csv(data_path, encoding='gbk')
+
+    # 对分类变量进行编码
+    label_encoders = {}
+    for col in CATEGORY_COLUMNS:
+        label_encoders[col] = LabelEncoder()
+        data[col] = label_encoders[col].fit_transform(data[col])
+
+    model = LinearRegression()
+    model.fit(data[FEATURES], data[TARGET])
+
+    return {
+        'model': model,
+        'label_encoders': label_encoders,
+        'feature_names': FEATURES,
+        # 预先展开的系数和类别编码表，预测时只需字典查找和一次点积
+        'coef': np.asarray(model.coef_, dtype=np.float64),
+        'intercept': float(model.intercept_),
+        'codes': {
+            col: {label: code for code, label in enumerate(encoder.classes_)}
+            for col, encoder in label_encoders.items()
+        }
+    }
+
+
+def export_model(data_path=DATA_PATH, model_path=MODEL_PATH):
+    """训练并保存模型文件"""
+    model_data = train_model(data_path)
+    model_data['quote_table'] = build_quote_table(model_data)
+    verify_quote_table(model_data)
+    joblib.dump(model_data, model_path)
+    return model_data
+
+
+def load_model(model_path=MODEL_PATH, data_path=DATA_PATH):
+    """加载已保存的模型，模型文件不存在时重新训练并保存"""
+    if os.path.exists(model_path):
+        model_data = joblib.load(model_path)
+        # 兼容没有报价表的旧模型文件
+        if 'quote_table' not in model_data:
+            model_data['quote_table'] = build_quote_table(model_data)
+        return model_data
+    return export_model(data_path, model_path)
+
+
+def predict_charge(model_data, age, sex, bmi, children, smoker, region):
+    """预测单个被保险人的年度医疗费用"""
+    codes = model_data['codes']
+    x = np.array([
+        age,
+        codes['性别'][sex],
+        bmi,
+        children,
+        codes['是否吸烟'][smoker],
+        codes['区域'][region]
+    ], dtype=np.float64)
+    prediction = model_data['intercept'] + float(x @ model_data['coef'])
+    # 确保预测结果不为负数且不低于合理最小值
+    return max(MIN_CHARGE, prediction)
+
+
+def build_quote_table(model_data):
+    """预先计算所有离散取值组合在BMI为0时的费用，维度顺序为 年龄、性别、子女数量、是否吸烟、区域"""
+    coef = dict(zip(FEATURES, model_data['coef']))
+    codes = model_data['codes']
+
+    ages = np.arange(QUOTE_AGES.start, QUOTE_AGES.stop, dtype=np.float64)
+    children = np.arange(QUOTE_CHILDREN.start, QUOTE_CHILDREN.stop, dtype=np.float64)
+    # 利用广播一次性得到整张表
+    base = (
+        model_data['intercept']
+        + coef['年龄'] * ages[:, None, None, None, None]
+        + coef['性别'] * np.arange(len(codes['性别']))[None, :, None, None, None]
+        + coef['子女数量'] * children[None, None, :, None, None]
+        + coef['是否吸烟'] * np.arange(len(codes['是否吸烟']))[None, None, None, :, None]
+        + coef['区域'] * np.arange(len(codes['区域']))[None, None, None, None, :]
+    )
+    return {'base': base, 'bmi_coef': float(coef['BMI'])}
+
+
+def verify_quote_table(model_data, bmi_values=(15.0, 25.0, 40.0), tolerance=1e-6):
+    """用sklearn模型对整张报价表逐项核对，不一致时抛出异常"""
+    codes = model_data['codes']
+    grid = np.array(np.meshgrid(
+        np.arange(QUOTE_AGES.start, QUOTE_AGES.stop),
+        np.arange(len(codes['性别'])),
+        np.arange(QUOTE_CHILDREN.start, QUOTE_CHILDREN.stop),
+        np.arange(len(codes['是否吸烟'])),
+        np.arange(len(codes['区域'])),
+        indexing='ij'
+    )).reshape(5, -1).T
+
+    table = model_data['quote_table']
+    for bmi in bmi_values:
+        X = pd.DataFrame({
+            '年龄': grid[:, 0],
+            '性别': grid[:, 1],
+            'BMI': bmi,
+            '子女数量': grid[:, 2],
+            '是否吸烟': grid[:, 3],
+            '区域': grid[:, 4]
+        })[FEATURES]
+        expected = np.maximum(MIN_CHARGE, model_data['model'].predict(X))
+        actual = np.maximum(MIN_CHARGE, table['base'].reshape(-1) + table['bmi_coef'] * bmi)
+        error = np.abs(expected - actual).max()
+        if error > tolerance:
+            raise ValueError(f"报价表与模型不一致（BMI={bmi}，最大误差 {error}）")
+
+
+def quote_charge(model_data, age, sex, bmi, children, smoker, region):
+    """查报价表得到年度医疗费用，超出表范围时按线性系数计算"""
+    if age not in QUOTE_AGES or children not in QUOTE_CHILDREN:
+        return predict_charge(model_data, age, sex, bmi, children, smoker, region)
+
+    codes = model_data['codes']
+    table = model_data['quote_table']
+    base = table['base'][
+        age - QUOTE_AGES.start,
+        codes['性别'][sex],
+        children - QUOTE_CHILDREN.start,
+        codes['是否吸烟'][smoker],
+        codes['区域'][region]
+    ]
+    return max(MIN_CHARGE, float(base) + table['bmi_coef'] * bmi)
+
+
+def encode_frame(model_data, df):
+    """把被保险人数据批量编码为特征矩阵"""
+    missing = [col for col in FEATURES if col not in df.columns]
+    if missing:
+        raise ValueError(f"缺少必要的列: {', '.join(missing)}")
+
+    X = np.empty((len(df), len(FEATURES)), dtype=np.float64)
+    for j, col in enumerate(FEATURES):
+        if col in CATEGORY_COLUMNS:
+            classes = model_data['label_encoders'][col].classes_
+            # 按训练时的类别顺序取编码，未知取值的编码为-1
+            codes = pd.Categorical(df[col], categories=classes).codes
+            if (codes < 0).any():
+                unknown = df[col][codes < 0].unique()
+                raise ValueError(f"{col} 存在无法识别的取值: {', '.join(map(str, unknown[:5]))}")
+            X[:, j] = codes
+        else:
+            # 空值和非数字文本会使预测费用为NaN并跳过下限，直接拒绝；行号从数据第1行开始计，分块读取时沿用整个文件的行号
+            values = pd.to_numeric(df[col], errors='coerce')
+            bad_rows = df.index[values.isna()]
+            if len(bad_rows):
+                rows = ', '.join(str(i + 1) for i in bad_rows[:5])
+                more = f" 等 {len(bad_rows)} 行" if len(bad_rows) > 5 else ""
+                raise ValueError(f"{col} 存在缺失或非数字的值: 第 {rows} 行{more}")
+            X[:, j] = values
+    return X
+
+
+def price_frame(model_data, df):
+    """批量预测医疗费用，一次矩阵乘法后统一应用下限"""
+    X = encode_frame(model_data, df)
+    return np.maximum(MIN_CHARGE, X @ model_data['coef'] + model_data['intercept'])
+
+
+def price_in_chunks(model_data, source, encoding='utf-8', chunksize=100000):
+    """分块读取被保险人CSV并定价，每块产出一个带预测费用列的DataFrame，内存占用与文件大小无关"""
+    for chunk in pd.read_csv(source, encoding=encoding, chunksize=chunksize):
+        chunk[PRICE_COLUMN] = price_frame(model_data, chunk).round(2)
+        yield chunk
+
+
+if __name__ == '__main__':
+    import model_registry
+
+    version = model_registry.publish('insurance', export_model())
+    print(f"医疗费用预测模型训练完成并保存到 {MODEL_PATH}，已发布到模型注册表: insurance@{version}")
@@ -0,0 +1,330 @@
+# 远程媒体缓存：页面中的远程封面和演职人员照片只下载一次，保存在大小受限的本地目录中（按最近使用淘汰），
+# 之后由Streamlit从本地文件提供，页面加载不再依赖第三方站点的延迟。
+# 未缓存的URL先原样返回由浏览器加载，下载在后台线程的asyncio事件循环中并发执行，页面渲染不等待远程站点；
+# 同一URL的并发请求共享一次下载；
+# 超过 MAX_AGE 的条目先继续使用本地文件，同时在后台用 ETag/Last-Modified 重新验证。
+# 多个进程（多个Streamlit应用或服务进程）可以共享同一个缓存目录：保存索引时在文件锁内重新读取
+# index.json，与本进程的条目合并后再按总大小淘汰和写回，不会覆盖其他进程的条目。
+import asyncio
+import contextlib
+import hashlib
+import json
+import os
+import threading
+import time
+from urllib.parse import urlsplit, urlunsplit
+
+try:
+    import fcntl
+except ImportError:
+    # Windows 没有 fcntl，使用 msvcrt 的文件锁
+    fcntl = None
+    import msvcrt
+
+CACHE_DIR = os.environ.get('MEDIA_CACHE_DIR', '.media_cache')
+MAX_BYTES = int(float(os.environ.get('MEDIA_CACHE_MAX_MB', 256)) * 2 ** 20)
+MAX_AGE = float(os.environ.get('MEDIA_CACHE_MAX_AGE', 86400))
+TIMEOUT = float(os.environ.get('MEDIA_CACHE_TIMEOUT', 10))
+# 页面渲染时等待未缓存URL下载的最长时间（秒）；默认不等待，先使用远程地址，下载在后台完成后的重跑改用本地文件
+WAIT = float(os.environ.get('MEDIA_CACHE_WAIT', 0))
+# 下载失败的URL在这段时间（秒）内不再重试，直接使用远程地址
+FAILURE_TTL = 300
+# 把远程URL的协议和主机替换为该地址，例如 http://127.0.0.1:8800，用于本地替身服务器测试
+ORIGIN_OVERRIDE = os.environ.get('MEDIA_ORIGIN_OVERRIDE', '')
+
+INDEX_NAME = 'index.json'
+LOCK_NAME = 'index.lock'
+EXTENSIONS = {
+    'image/jpeg': '.jpg',
+    'image/png': '.png',
+    'image/webp': '.webp',
+    'image/gif': '.gif',
+    'audio/mpeg': '.mp3',
+    'video/mp4': '.mp4'
+}
+
+
+class MediaCache:
+    def __init__(self, cache_dir=CACHE_DIR, max_bytes=MAX_BYTES, max_age=MAX_AGE,
+                 timeout=TIMEOUT, origin_override=ORIGIN_OVERRIDE, wait=WAIT):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.max_age = max_age
+        self.timeout = timeout
+        self.wait = wait
+        self.origin_override = origin_override
+        self.entries = self._load_index()
+        self.requests = 0
+        self.not_modified = 0
+        self.errors = 0
+        self._failures = {}
+        self._lock = threading.Lock()
+        # 正在进行的下载，只在事件循环线程中访问
+        self._inflight = {}
+        self._loop = None
+
+    def _index_path(self):
+        return os.path.join(self.cache_dir, INDEX_NAME)
+
+    def _load_index(self):
+        try:
+            with open(self._index_path(), encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    @contextlib.contextmanager
+    def _index_lock(self):
+        """跨进程的索引文件锁"""
+        os.makedirs(self.cache_dir, exist_ok=True)
+        with open(os.path.join(self.cache_dir, LOCK_NAME), 'a+b') as f:
+            if fcntl is not None:
+                fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+            else:
+                f.seek(0)
+                msvcrt.locking(f.fileno(), msvcrt.LK_LOCK, 1)
+            try:
+                yield
+            finally:
+                if fcntl is not None:
+                    fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+                else:
+                    f.seek(0)
+                    msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+
+    def _merge(self, disk_entries):
+        """合并磁盘上的索引和本进程的条目：同一URL取较新下载的一份，最近访问时间取两者中较晚的；
+        文件已被删除（被某个进程淘汰）的条目丢弃"""
+        merged = dict(disk_entries)
+        for url, entry in self.entries.items():
+            other = merged.get(url)
+            if other is None or entry['fetched_at'] >= other['fetched_at']:
+                merged[url] = dict(entry)
+            if other is not None:
+                merged[url]['last_access'] = max(entry['last_access'], other['last_access'])
+        return {url: entry for url, entry in merged.items() if os.path.exists(self._entry_path(entry))}
+
+    def _save_index(self, keep=None):
+        """在文件锁内与其他进程写入的索引合并，按总大小淘汰后写回（调用时持有 self._lock）"""
+        with self._index_lock():
+            self.entries = self._merge(self._load_index())
+            self._evict(keep)
+            tmp_path = f'{self._index_path()}.{os.getpid()}.tmp'
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(self.entries, f, ensure_ascii=False)
+            os.replace(tmp_path, self._index_path())
+
+    def _entry_path(self, entry):
+        return os.path.join(self.cache_dir, entry['file'])
+
+    def _source_url(self, url):
+        if not self.origin_override:
+            return url
+        override = urlsplit(self.origin_override)
+        parts = urlsplit(url)
+        return urlunsplit((override.scheme, override.netloc, parts.path, parts.query, parts.fragment))
+
+    def _ensure_loop(self):
+        """在后台守护线程中运行事件循环（每个缓存对象一次）"""
+        with self._lock:
+            if self._loop is None:
+                self._loop = asyncio.new_event_loop()
+                threading.Thread(target=self._loop.run_forever, daemon=True).start()
+        return self._loop
+
+    def _evict(self, keep=None):
+        """总大小超过上限时，按最近访问时间从旧到新删除；keep 为刚下载、即将返回给调用者的URL，不删除"""
+        total = sum(entry['size'] for entry in self.entries.values())
+        for url, entry in sorted(self.entries.items(), key=lambda item: item[1]['last_access']):
+            if total <= self.max_bytes:
+                break
+            if url == keep:
+                continue
+            try:
+                os.remove(self._entry_path(entry))
+            except FileNotFoundError:
+                pass
+            total -= entry['size']
+            del self.entries[url]
+
+    async def _download(self, url):
+        from tornado.httpclient import AsyncHTTPClient, HTTPRequest
+
+        with self._lock:
+            entry = self.entries.get(url)
+        headers = {}
+        if entry is not None and os.path.exists(self._entry_path(entry)):
+            if entry.get('etag'):
+                headers['If-None-Match'] = entry['etag']
+            if entry.get('last_modified'):
+                headers['If-Modified-Since'] = entry['last_modified']
+        else:
+            entry = None
+
+        self.requests += 1
+        try:
+            response = await AsyncHTTPClient().fetch(
+                HTTPRequest(self._source_url(url), headers=headers, request_timeout=self.timeout, follow_redirects=True),
+                raise_error=False
+            )
+        except OSError as e:
+            response, error = None, e
+        else:
+            error = response.error
+        now = time.time()
+
+        if response is not None and response.code == 304 and entry is not None:
+            self.not_modified += 1
+            with self._lock:
+                # 保存索引时条目会与磁盘上的索引合并后替换，这里修改当前的条目
+                entry = self.entries.setdefault(url, entry)
+                entry['fetched_at'] = now
+                self._save_index(keep=url)
+            return self._entry_path(entry)
+
+        if response is None or response.code != 200:
+            self.errors += 1
+            with self._lock:
+                self._failures[url] = now
+                if url in self.entries:
+                    # 重新验证失败时继续使用本地文件，过 MAX_AGE 后再重试
+                    self.entries[url]['fetched_at'] = now
+            raise OSError(f"下载失败 {url}: {error}")
+
+        if len(response.body) > self.max_bytes:
+            # 单个文件超过缓存上限时不缓存，使用远程地址
+            with self._lock:
+                self._failures[url] = now
+            raise OSError(f"文件大小 {len(response.body)} 字节超过缓存上限，不缓存 {url}")
+
+        content_type = response.headers.get('Content-Type', '').split(';')[0].strip()
+        file_name = hashlib.sha256(url.encode('utf-8')).hexdigest()[:32] + EXTENSIONS.get(content_type, '')
+        path = os.path.join(self.cache_dir, file_name)
+        os.makedirs(self.cache_dir, exist_ok=True)
+        tmp_path = f'{path}.{os.getpid()}.tmp'
+        with open(tmp_path, 'wb') as f:
+            f.write(response.body)
+        os.replace(tmp_path, path)
+
+        with self._lock:
+            old_entry = self.entries.get(url)
+            if old_entry is not None and old_entry['file'] != file_name:
+                try:
+                    os.remove(self._entry_path(old_entry))
+                except FileNotFoundError:
+                    pass
+            self.entries[url] = {
+                'file': file_name,
+                'size': len(response.body),
+                'content_type': content_type,
+                'etag': response.headers.get('ETag'),
+                'last_modified': response.headers.get('Last-Modified'),
+                'fetched_at': now,
+                'last_access': now
+            }
+            self._save_index(keep=url)
+        return path
+
+    async def fetch(self, url):
+        """下载一个URL，返回本地文件路径；同一URL正在下载时等待同一次下载的结果"""
+        task = self._inflight.get(url)
+        if task is None:
+            task = asyncio.ensure_future(self._download(url))
+            self._inflight[url] = task
+            task.add_done_callback(lambda _: self._inflight.pop(url, None))
+        return await asyncio.shield(task)
+
+    async def fetch_all(self, urls):
+        """并发下载多个URL，返回 {url: 本地路径或异常}"""
+        urls = list(dict.fromkeys(urls))
+        results = await asyncio.gather(*(self.fetch(url) for url in urls), return_exceptions=True)
+        return dict(zip(urls, results))
+
+    def resolve_many(self, urls, wait=None):
+        """返回 {url: 本地文件路径}：已缓存的直接返回（过期的在后台重新验证）；未缓存的在后台并发下载一次，
+        最多等待 wait 秒（默认 self.wait），没有及时完成或下载失败时返回原URL，由浏览器直接加载"""
+        wait = self.wait if wait is None else wait
+        now = time.time()
+        resolved, missing, stale = {}, [], []
+        with self._lock:
+            for url in dict.fromkeys(urls):
+                entry = self.entries.get(url)
+                if entry is not None and os.path.exists(self._entry_path(entry)):
+                    entry['last_access'] = now
+                    resolved[url] = self._entry_path(entry)
+                    if now - entry['fetched_at'] > self.max_age:
+                        stale.append(url)
+                elif now - self._failures.get(url, 0) < FAILURE_TTL:
+                    resolved[url] = url
+                else:
+                    missing.append(url)
+
+        if stale:
+            asyncio.run_coroutine_threadsafe(self.fetch_all(stale), self._ensure_loop())
+        if missing:
+            # 下载不随等待超时取消，完成后写入缓存供之后的重跑使用
+            future = asyncio.run_coroutine_threadsafe(self.fetch_all(missing), self._ensure_loop())
+            fetched = {}
+            if wait > 0:
+                try:
+                    fetched = future.result(wait)
+                except TimeoutError:
+                    pass
+            for url in missing:
+                result = fetched.get(url)
+                if isinstance(result, str):
+                    resolved[url] = result
+                else:
+                    if result is not None:
+                        print(f"媒体缓存未命中，使用远程地址: {result}")
+                    resolved[url] = url
+        return resolved
+
+    def resolve(self, url, wait=None):
+        return self.resolve_many([url], wait)[url]
+
+    def prefetch(self, urls):
+        """在后台下载尚未缓存的URL，不等待结果（例如下一首歌的封面）"""
+        now = time.time()
+        with self._lock:
+            missing = [url for url in dict.fromkeys(urls)
+                       if not (url in self.entries and os.path.exists(self._entry_path(self.entries[url])))
+                       and now - self._failures.get(url, 0) >= FAILURE_TTL]
+        if missing:
+            asyncio.run_coroutine_threadsafe(self.fetch_all(missing), self._ensure_loop())
+
+    def stats(self):
+        with self._lock:
+            return {
+                'entries': len(self.entries),
+                'bytes': sum(entry['size'] for entry in self.entries.values()),
+                'max_bytes': self.max_bytes,
+                'requests': self.requests,
+                'not_modified': self.not_modified,
+                'errors': self.errors
+            }
+
+
+_default_cache = None
+_default_lock = threading.Lock()
+
+
+def get_cache():
+    """进程内共享的默认缓存"""
+    global _default_cache
+    with _default_lock:
+        if _default_cache is None:
+            _default_cache = MediaCache()
+        return _default_cache
+
+
+def resolve_many(urls, wait=None):
+    return get_cache().resolve_many(urls, wait)
+
+
+def resolve(url, wait=None):
+    return get_cache().resolve(url, wait)
+
+
+def prefetch(urls):
+    get_cache().prefetch(urls)
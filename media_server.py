@@ -0,0 +1,189 @@
+# 本地媒体服务：以HTTP Range请求流式提供 media/ 目录下的视频和音频文件。
+# 文件内容通过 loop.sendfile（os.sendfile）从页缓存直接发送到套接字，不读入Python内存；
+# 同时进行的传输数受 --max-streams 限制，超过时排队等待，因此内存占用不随观看人数增长。
+import argparse
+import asyncio
+import email.utils
+import mimetypes
+import os
+from urllib.parse import quote, unquote, urlsplit
+
+MEDIA_DIR = 'media'
+# 媒体服务地址，例如 http://127.0.0.1:8700；未设置或本地没有对应文件时页面使用原来的远程地址
+SERVER_URL = os.environ.get('MEDIA_SERVER_URL', '')
+
+MAX_HEADER_BYTES = 16384
+
+
+def stream_url(file_name, fallback, media_dir=MEDIA_DIR, server_url=None):
+    """返回播放器使用的地址：配置了媒体服务且本地有该文件时指向媒体服务，否则返回 fallback"""
+    server_url = server_url if server_url is not None else SERVER_URL
+    if server_url and file_name and os.path.isfile(os.path.join(media_dir, file_name)):
+        return f"{server_url.rstrip('/')}/media/{quote(file_name)}"
+    return fallback
+
+
+def parse_range(header, size):
+    """解析单个 bytes 范围，返回 (起始, 结束)（含结束位置）；没有Range头时返回None，范围无效时抛出ValueError"""
+    if not header:
+        return None
+    unit, _, spec = header.partition('=')
+    if unit.strip() != 'bytes' or ',' in spec:
+        raise ValueError(header)
+    start, _, end = spec.strip().partition('-')
+    if start:
+        start = int(start)
+        end = min(int(end), size - 1) if end else size - 1
+    elif end:
+        # bytes=-N：最后N个字节
+        start, end = max(size - int(end), 0), size - 1
+    else:
+        raise ValueError(header)
+    if start > end or start >= size:
+        raise ValueError(header)
+    return start, end
+
+
+class MediaServer:
+    def __init__(self, media_dir=MEDIA_DIR, max_streams=32, queue_timeout=30.0):
+        self.media_dir = os.path.realpath(media_dir)
+        self.max_streams = max_streams
+        self.queue_timeout = queue_timeout
+        self.streams = asyncio.Semaphore(max_streams)
+        self.active = 0
+        self.peak_active = 0
+        self.requests = 0
+        self.bytes_sent = 0
+
+    def _resolve(self, path):
+        """把请求路径映射为 media 目录下的文件，拒绝目录之外的路径"""
+        if not path.startswith('/media/'):
+            return None
+        file_path = os.path.realpath(os.path.join(self.media_dir, unquote(path[len('/media/'):])))
+        if not file_path.startswith(self.media_dir + os.sep) or not os.path.isfile(file_path):
+            return None
+        return file_path
+
+    async def _write_head(self, writer, status, headers):
+        lines = [f'HTTP/1.1 {status}']
+        lines += [f'{name}: {value}' for name, value in headers.items()]
+        writer.write(('\r\n'.join(lines) + '\r\n\r\n').encode('latin-1'))
+        await writer.drain()
+
+    async def _error(self, writer, status, extra=None):
+        body = status.encode('utf-8')
+        await self._write_head(writer, status, {'Content-Type': 'text/plain', 'Content-Length': len(body), **(extra or {})})
+        writer.write(body)
+        await writer.drain()
+
+    async def _stats(self, writer):
+        body = (f'{{"active": {self.active}, "peak_active": {self.peak_active}, "max_streams": {self.max_streams}, '
+                f'"requests": {self.requests}, "bytes_sent": {self.bytes_sent}}}').encode('utf-8')
+        await self._write_head(writer, '200 OK', {'Content-Type': 'application/json', 'Content-Length': len(body)})
+        writer.write(body)
+        await writer.drain()
+
+    async def _send_file(self, writer, method, file_path, range_header):
+        size = os.path.getsize(file_path)
+        headers = {
+            'Content-Type': mimetypes.guess_type(file_path)[0] or 'application/octet-stream',
+            'Accept-Ranges': 'bytes',
+            'Last-Modified': email.utils.formatdate(os.path.getmtime(file_path), usegmt=True),
+            'Cache-Control': 'public, max-age=3600'
+        }
+        try:
+            byte_range = parse_range(range_header, size)
+        except ValueError:
+            await self._error(writer, '416 Range Not Satisfiable', {'Content-Range': f'bytes */{size}'})
+            return
+        if byte_range is None:
+            status, start, count = '200 OK', 0, size
+        else:
+            start, end = byte_range
+            status, count = '206 Partial Content', end - start + 1
+            headers['Content-Range'] = f'bytes {start}-{end}/{size}'
+        headers['Content-Length'] = count
+
+        await self._write_head(writer, status, headers)
+        if method == 'HEAD' or count == 0:
+            return
+
+        # 限制同时进行的传输数，超过时排队等待
+        try:
+            await asyncio.wait_for(self.streams.acquire(), self.queue_timeout)
+        except asyncio.TimeoutError:
+            writer.transport.abort()
+            return
+        self.active += 1
+        self.peak_active = max(self.peak_active, self.active)
+        try:
+            with open(file_path, 'rb') as f:
+                # 由内核直接从文件发送到套接字，不支持时回退为分块读写
+                sent = await asyncio.get_running_loop().sendfile(writer.transport, f, start, count)
+            self.bytes_sent += sent
+        finally:
+            self.active -= 1
+            self.streams.release()
+
+    async def handle(self, reader, writer):
+        """处理一个连接上的请求（支持keep-alive）"""
+        try:
+            while True:
+                try:
+                    head = await reader.readuntil(b'\r\n\r\n')
+                except (asyncio.IncompleteReadError, asyncio.LimitOverrunError):
+                    break
+                lines = head.decode('latin-1').split('\r\n')
+                try:
+                    method, target, version = lines[0].split(' ', 2)
+                except ValueError:
+                    await self._error(writer, '400 Bad Request')
+                    break
+                headers = {}
+                for line in lines[1:]:
+                    name, _, value = line.partition(':')
+                    if name:
+                        headers[name.strip().lower()] = value.strip()
+
+                self.requests += 1
+                path = urlsplit(target).path
+                if method not in ('GET', 'HEAD'):
+                    await self._error(writer, '405 Method Not Allowed', {'Allow': 'GET, HEAD'})
+                elif path == '/stats':
+                    await self._stats(writer)
+                else:
+                    file_path = self._resolve(path)
+                    if file_path is None:
+                        await self._error(writer, '404 Not Found')
+                    else:
+                        await self._send_file(writer, method, file_path, headers.get('range'))
+
+                if headers.get('connection', '').lower() == 'close' or version == 'HTTP/1.0':
+                    break
+        except (ConnectionError, OSError):
+            pass
+        finally:
+            writer.close()
+
+
+async def serve(host, port, media_dir, max_streams):
+    media_server = MediaServer(media_dir, max_streams)
+    server = await asyncio.start_server(media_server.handle, host, port, limit=MAX_HEADER_BYTES)
+    print(f"媒体服务已启动: http://{host}:{port}/media/<文件名>（目录 {media_dir}，最多 {max_streams} 个并发传输）")
+    async with server:
+        await server.serve_forever()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='本地媒体服务：支持Range请求的视频和音频流式传输')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8700)
+    parser.add_argument('--media-dir', default=MEDIA_DIR)
+    parser.add_argument('--max-streams', type=int, default=32, help='同时进行的最大传输数，超过时排队')
+    args = parser.parse_args()
+
+    asyncio.run(serve(args.host, args.port, args.media_dir, args.max_streams))
+
+
+if __name__ == '__main__':
+    main()
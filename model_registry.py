@@ -0,0 +1,180 @@
+# 模型注册表：模型按 名称/版本 保存为不压缩的joblib文件，加载时使用 mmap_mode='r'，
+# 文件中的NumPy数组以只读内存映射方式打开，多个服务进程通过系统页缓存共享同一份数据。
+# 模型在第一次使用时才加载，每个进程内只加载一次。
+import argparse
+import datetime
+import os
+import shutil
+import tempfile
+import threading
+import time
+import uuid
+
+import joblib
+
+REGISTRY_DIR = 'model_registry'
+ARTIFACT_NAME = 'model.joblib'
+LATEST_NAME = 'LATEST'
+
+_loaded = {}
+_stats = {}
+_lock = threading.Lock()
+_publish_lock = threading.Lock()
+
+
+def build_student_score():
+    """成绩预测：展开后的随机森林引擎（纯NumPy数组，可以完整内存映射）"""
+    from forest_engine import CompiledForest
+    return {
+        'engine': CompiledForest(joblib.load('score_prediction_model.pkl')),
+        'features': joblib.load('features.pkl')
+    }
+
+
+def build_penguin():
+    return joblib.load('penguin_model.pkl')
+
+
+def build_insurance():
+    import insurance_model
+    return insurance_model.load_model()
+
+
+# 各模型的构建方法，注册表中没有时据此发布第一个版本
+BUILDERS = {
+    'student_score': build_student_score,
+    'penguin': build_penguin,
+    'insurance': build_insurance
+}
+
+
+def _model_dir(name):
+    return os.path.join(REGISTRY_DIR, name)
+
+
+def _current_rss_mb():
+    """当前进程的常驻内存（MB）"""
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE') / 2 ** 20
+    except (OSError, ValueError):
+        import resource
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def latest_version(name):
+    """返回模型的最新版本号，没有发布过时返回None"""
+    try:
+        with open(os.path.join(_model_dir(name), LATEST_NAME), encoding='utf-8') as f:
+            return f.read().strip()
+    except FileNotFoundError:
+        return None
+
+
+def list_versions(name):
+    try:
+        # 以 . 开头的是正在写入的临时目录
+        return sorted(entry for entry in os.listdir(_model_dir(name))
+                      if not entry.startswith('.') and os.path.isdir(os.path.join(_model_dir(name), entry)))
+    except FileNotFoundError:
+        return []
+
+
+def new_version():
+    """按时间排序的版本号，带微秒和随机后缀，同一秒内多次发布（包括多个进程同时发布）也不会重复"""
+    return f"{datetime.datetime.now().strftime('%Y%m%d-%H%M%S-%f')}-{uuid.uuid4().hex[:6]}"
+
+
+def publish(name, obj, version=None):
+    """发布模型的新版本并设为最新版本，返回版本号"""
+    version = version or new_version()
+    version_dir = os.path.join(_model_dir(name), version)
+    os.makedirs(_model_dir(name), exist_ok=True)
+
+    # 先写入临时目录再整体改名，版本目录出现时文件已经完整；不压缩保存，数组才能在加载时直接内存映射
+    tmp_dir = tempfile.mkdtemp(prefix=f'.{version}.', dir=_model_dir(name))
+    try:
+        joblib.dump(obj, os.path.join(tmp_dir, ARTIFACT_NAME), compress=0)
+        # mkdtemp 创建的目录只有所有者可读，改为普通目录的权限
+        os.chmod(tmp_dir, 0o755)
+        os.replace(tmp_dir, version_dir)
+    except BaseException:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+        raise
+
+    latest_tmp = os.path.join(_model_dir(name), f'{LATEST_NAME}.{os.getpid()}.tmp')
+    with open(latest_tmp, 'w', encoding='utf-8') as f:
+        f.write(version)
+    os.replace(latest_tmp, os.path.join(_model_dir(name), LATEST_NAME))
+    return version
+
+
+def load(name, version=None):
+    """按名称和版本加载模型（默认最新版本），同一进程内只加载一次"""
+    version = version or latest_version(name)
+    if version is None:
+        raise FileNotFoundError(f"模型 {name} 尚未发布")
+
+    key = (name, version)
+    with _lock:
+        if key not in _loaded:
+            path = os.path.join(_model_dir(name), version, ARTIFACT_NAME)
+            rss_before = _current_rss_mb()
+            start = time.perf_counter()
+            _loaded[key] = joblib.load(path, mmap_mode='r')
+            _stats[key] = {
+                'name': name,
+                'version': version,
+                'load_seconds': time.perf_counter() - start,
+                'rss_mb': _current_rss_mb() - rss_before,
+                'file_mb': os.path.getsize(path) / 2 ** 20
+            }
+            print(f"已加载模型 {name}@{version}：耗时 {_stats[key]['load_seconds'] * 1000:.1f} ms，"
+                  f"常驻内存增加 {_stats[key]['rss_mb']:.1f} MB（文件 {_stats[key]['file_mb']:.1f} MB）")
+        return _loaded[key]
+
+
+def current_version(name):
+    """返回模型的最新版本号；注册表中还没有该模型时，先用 BUILDERS 中的构建方法发布第一个版本。
+    页面和缓存以此作为缓存键，发布新版本后自动改用新模型"""
+    version = latest_version(name)
+    if version is None:
+        # 同一进程内的并发首次使用只发布一次；多个进程同时发布时各自得到不同的版本号，LATEST 指向最后完成的一个
+        with _publish_lock:
+            version = latest_version(name)
+            if version is None:
+                version = publish(name, BUILDERS[name]())
+    return version
+
+
+def load_or_publish(name, version=None):
+    """加载模型（默认最新版本），注册表中还没有该模型时先发布第一个版本"""
+    return load(name, version or current_version(name))
+
+
+def stats():
+    """当前进程已加载模型的加载耗时和内存统计"""
+    with _lock:
+        return list(_stats.values())
+
+
+def main():
+    parser = argparse.ArgumentParser(description='模型注册表')
+    parser.add_argument('command', choices=['publish', 'list'], help='publish：从现有模型文件发布新版本；list：列出版本并测量加载耗时和内存')
+    parser.add_argument('names', nargs='*', default=list(BUILDERS), help='模型名称，默认全部')
+    args = parser.parse_args()
+
+    for name in args.names:
+        if args.command == 'publish':
+            print(f"已发布 {name}@{publish(name, BUILDERS[name]())}")
+        else:
+            versions = list_versions(name)
+            if not versions:
+                print(f"{name}: 尚未发布")
+                continue
+            load(name)
+            print(f"{name}: 版本 {', '.join(versions)}（最新 {latest_version(name)}）")
+
+
+if __name__ == '__main__':
+    main()
@@ -1,68 +1,163 @@
 # 导入Streamlit库，用于创建Web应用界面
 import streamlit as st
 
+import media_cache
+import media_server
+import tracing
+from music_catalog import MAX_QUEUE, PAGE_SIZE, MusicCatalog
+
 # 设置页面配置
 st.set_page_config(page_title="简易音乐播放器", page_icon="🎵")
 
-# 创建歌曲列表，存储歌曲链接和相关信息
-songs = [
-    {
-        "title": "给未来的自己",
-        "artist": "余翊",
-        "url": "https://music.163.com/song/media/outer/url?id=3327521028.mp3",
-        "cover": "https://images.unsplash.com/photo-1511671782779-c97d3d27a1d4?ixlib=rb-1.2.1&auto=format&fit=crop&w=200&q=80"
-    },
-    {
-        "title": "晴朗天空",
-        "artist": "郑润泽",
-        "url": "https://music.163.com/song/media/outer/url?id=3322357952.mp3",
-        "cover": "https://images.unsplash.com/photo-1470225620780-dba8ba36b745?ixlib=rb-1.2.1&auto=format&fit=crop&w=200&q=80"
-    },
-    {
-        "title": "念",
-        "artist": "藤竹京 / DY / 鯨",
-        "url": "https://music.163.com/song/media/outer/url?id=3327960270.mp3",
-        "cover": "https://images.unsplash.com/photo-1493225457124-a3eb161ffa5f?ixlib=rb-1.2.1&auto=format&fit=crop&w=200&q=80"
-    }
-]
-
-# 初始化会话状态
-if 'current_song_index' not in st.session_state:
+# 音乐目录：歌曲和歌单保存在SQLite数据库中（标题和歌手建有全文索引），每次重跑只查询当前歌曲和当前一页
+@st.cache_resource
+def load_catalog():
+    return MusicCatalog()
+
+catalog = load_catalog()
+playlists = catalog.playlists()
+playlist_names = {playlist['id']: playlist['name'] for playlist in playlists}
+
+# 初始化会话状态：播放列表只保存歌曲id，切歌只移动下标
+if 'playlist_id' not in st.session_state:
+    st.session_state.playlist_id = playlists[0]['id']
+if 'queue' not in st.session_state:
+    st.session_state.queue = catalog.playlist_track_ids(st.session_state.playlist_id)
+    st.session_state.queue_name = playlist_names[st.session_state.playlist_id]
+    st.session_state.queue_source = ('playlist', st.session_state.playlist_id)
     st.session_state.current_song_index = 0
+if 'music_page' not in st.session_state:
+    st.session_state.music_page = 1
+
+# 切换歌曲（按钮回调，在重跑前更新当前歌曲）
+def change_song(step):
+    st.session_state.current_song_index = (st.session_state.current_song_index + step) % len(st.session_state.queue)
+
+def change_page(step):
+    st.session_state.music_page += step
+
+def reset_page():
+    st.session_state.music_page = 1
+
+def play_from_playlist(position):
+    playlist_id = st.session_state.playlist_id
+    if st.session_state.queue_source != ('playlist', playlist_id):
+        st.session_state.queue = catalog.playlist_track_ids(playlist_id)
+        st.session_state.queue_name = playlist_names[playlist_id]
+        st.session_state.queue_source = ('playlist', playlist_id)
+    st.session_state.current_song_index = position
 
-# 获取当前播放的歌曲
-current_song = songs[st.session_state.current_song_index]
+def play_from_search(query, track_id, offset):
+    # 搜索结果（最多 MAX_QUEUE 首，至少包含当前页）作为播放列表
+    if st.session_state.queue_source != ('search', query) or track_id not in st.session_state.queue:
+        st.session_state.queue = catalog.search_ids(query, max(MAX_QUEUE, offset + PAGE_SIZE))
+        st.session_state.queue_name = f"搜索：{query}"
+        st.session_state.queue_source = ('search', query)
+    st.session_state.current_song_index = st.session_state.queue.index(track_id)
 
-# 设置页面标题和说明
-st.title("简易音乐播放器")
+# 播放器区域：点击切歌按钮时只重跑这一部分，不重新执行整个页面脚本
+@st.fragment
+def player():
+    with tracing.fragment_span('music.py', 'player'):
+        queue = st.session_state.queue
+        index = st.session_state.current_song_index
+        # 获取当前播放的歌曲（下一首的元数据已在上次渲染后预先读取）
+        with tracing.span('catalog'):
+            current_song = catalog.track(queue[index])
+        
+        # 创建两列布局，左侧显示专辑封面，右侧显示歌曲信息
+        col1, col2 = st.columns([1, 2])
+        
+        with col1:
+            # 显示专辑封面（从本地媒体缓存提供）
+            with tracing.span('media_cache'):
+                cover = media_cache.resolve(current_song["cover"])
+            st.image(cover, width=200, caption="专辑封面")
+        
+        with col2:
+            # 显示歌曲信息
+            st.subheader(f"{current_song['title']}")
+            st.write(f"**歌手:** {current_song['artist']}")
+            st.caption(f"{st.session_state.queue_name} · 第 {index + 1} / {len(queue)} 首")
+        
+        
+        # 音频播放器：media/ 目录中有该歌曲且配置了媒体服务时，由媒体服务按Range请求流式传输
+        st.audio(media_server.stream_url(current_song["file"], current_song["url"]), format="audio/mp3", autoplay=True)
+        
+        # 导航按钮
+        col_prev, col_next = st.columns(2)
+        
+        with col_prev:
+            st.button("⏮️ 上一首", use_container_width=True, on_click=change_song, args=(-1,))
+        
+        with col_next:
+            st.button("⏭️ 下一首", use_container_width=True, on_click=change_song, args=(1,))
+        
+        # 预先读取上一首和下一首的元数据，并在后台下载封面，切歌时不再等待
+        with tracing.span('prefetch'):
+            neighbours = [queue[(index + 1) % len(queue)], queue[(index - 1) % len(queue)]]
+            catalog.prefetch(neighbours)
+            media_cache.prefetch([catalog.track(track_id)["cover"] for track_id in neighbours])
 
+def track_row(track, label, on_click, args):
+    col_info, col_play = st.columns([5, 1])
+    with col_info:
+        st.write(f"**{track['title']}** — {track['artist']}")
+    with col_play:
+        st.button("▶", key=label, on_click=on_click, args=args)
 
-# 创建两列布局，左侧显示专辑封面，右侧显示歌曲信息
-col1, col2 = st.columns([1, 2])
+# 歌单与搜索：按页显示，每页 PAGE_SIZE 首；输入搜索词时显示搜索结果
+def browser():
+    st.markdown("### 🎶 歌单与搜索")
+    playlist_id = st.selectbox("选择歌单", list(playlist_names), format_func=playlist_names.get,
+                               key="playlist_id", on_change=reset_page)
+    query = st.text_input("搜索歌曲或歌手", key="music_query", on_change=reset_page).strip()
+    page = st.session_state.music_page
+    with tracing.span('catalog_page'):
+        if query:
+            tracks, has_next = catalog.search(query, page)
+            page_label = f"第 {page} 页"
+        else:
+            page_count = max(1, -(-catalog.playlist_length(playlist_id) // PAGE_SIZE))
+            tracks, has_next = catalog.playlist_page(playlist_id, page), page < page_count
+            page_label = f"第 {page} / {page_count} 页"
 
-with col1:
-    # 显示专辑封面
-    st.image(current_song["cover"], width=200, caption="专辑封面")
+    if not tracks:
+        st.info("没有找到相关歌曲")
+    offset = (page - 1) * PAGE_SIZE
+    for track in tracks:
+        if query:
+            track_row(track, f"play_search_{track['id']}", play_from_search, (query, track['id'], offset))
+        else:
+            track_row(track, f"play_{track['position']}", play_from_playlist, (track['position'],))
 
-with col2:
-    # 显示歌曲信息
-    st.subheader(f"{current_song['title']}")
-    st.write(f"**歌手:** {current_song['artist']}")
+    if page > 1 or has_next:
+        col_prev, col_page, col_next = st.columns([1, 2, 1])
+        with col_prev:
+            st.button("◀", key="music_prev_page", disabled=page <= 1, on_click=change_page, args=(-1,))
+        with col_page:
+            st.caption(page_label)
+        with col_next:
+            st.button("▶", key="music_next_page", disabled=not has_next, on_click=change_page, args=(1,))
 
+def render():
+    """页面内容"""
+    # 设置页面标题和说明
+    st.title("简易音乐播放器")
 
-# 音频播放器
-st.audio(current_song["url"], format="audio/mp3", autoplay=True)
 
-# 导航按钮
-col_prev, col_next = st.columns(2)
+    player()
 
-with col_prev:
-    if st.button("⏮️ 上一首", use_container_width=True):
-        st.session_state.current_song_index = (st.session_state.current_song_index - 1) % len(songs)
-        st.rerun()
+    browser()
 
-with col_next:
-    if st.button("⏭️ 下一首", use_container_width=True):
-        st.session_state.current_song_index = (st.session_state.current_song_index + 1) % len(songs)
-        st.rerun()
+def main():
+    """主函数"""
+    # 开启 PERF_TRACE 时记录本次重跑的耗时；提前结束的重跑（st.stop、st.rerun、异常）也在 finally 中记录
+    tracing.begin_rerun('music.py')
+    try:
+        render()
+    finally:
+        tracing.end_rerun()
 
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,254 @@
+# 音乐目录：歌曲和歌单保存在SQLite数据库中，标题和歌手建有FTS5全文索引（trigram分词，支持中文子串搜索），
+# trigram无法索引的一两个字的词按子串（LIKE）匹配。歌单按位置分页查询，页面只保存当前歌单的歌曲id列表，
+# 上一首/下一首只需移动下标；歌曲元数据保存在进程内LRU中，切歌前预先读取下一首。
+import argparse
+import os
+import random
+import sqlite3
+import threading
+from collections import OrderedDict
+
+DB_PATH = 'music_catalog.db'
+PAGE_SIZE = 10
+# 搜索结果作为播放列表时最多保留的歌曲数
+MAX_QUEUE = 1000
+# 进程内缓存的歌曲元数据条数
+TRACK_CACHE_SIZE = 4096
+# trigram分词最少需要3个字符，更短的词按子串匹配
+MIN_FTS_CHARS = 3
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS tracks (
+    id INTEGER PRIMARY KEY,
+    title TEXT NOT NULL,
+    artist TEXT NOT NULL,
+    url TEXT NOT NULL,
+    file TEXT,
+    cover TEXT
+);
+CREATE VIRTUAL TABLE IF NOT EXISTS tracks_fts USING fts5 (
+    title, artist, content='tracks', content_rowid='id', tokenize='trigram'
+);
+CREATE TABLE IF NOT EXISTS playlists (
+    id INTEGER PRIMARY KEY,
+    name TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS playlist_tracks (
+    playlist_id INTEGER NOT NULL REFERENCES playlists(id),
+    position INTEGER NOT NULL,
+    track_id INTEGER NOT NULL REFERENCES tracks(id),
+    PRIMARY KEY (playlist_id, position)
+) WITHOUT ROWID;
+"""
+
+# 初始目录数据（原 music.py 中的歌曲列表）
+SEED_TRACKS = [
+    {
+        "title": "给未来的自己",
+        "artist": "余翊",
+        "url": "https://music.163.com/song/media/outer/url?id=3327521028.mp3",
+        "file": "3327521028.mp3",
+        "cover": "https://images.unsplash.com/photo-1511671782779-c97d3d27a1d4?ixlib=rb-1.2.1&auto=format&fit=crop&w=200&q=80"
+    },
+    {
+        "title": "晴朗天空",
+        "artist": "郑润泽",
+        "url": "https://music.163.com/song/media/outer/url?id=3322357952.mp3",
+        "file": "3322357952.mp3",
+        "cover": "https://images.unsplash.com/photo-1470225620780-dba8ba36b745?ixlib=rb-1.2.1&auto=format&fit=crop&w=200&q=80"
+    },
+    {
+        "title": "念",
+        "artist": "藤竹京 / DY / 鯨",
+        "url": "https://music.163.com/song/media/outer/url?id=3327960270.mp3",
+        "file": "3327960270.mp3",
+        "cover": "https://images.unsplash.com/photo-1493225457124-a3eb161ffa5f?ixlib=rb-1.2.1&auto=format&fit=crop&w=200&q=80"
+    }
+]
+SEED_PLAYLISTS = [("推荐歌单", list(range(len(SEED_TRACKS))))]
+
+_WORDS = ['晴朗', '天空', '未来', '自己', '夜空', '海边', '星光', '远方', '回忆', '青春', '微风', '故乡',
+          '月亮', '时光', '梦想', '雨后', '花开', '追光', '夏天', '告白', '旅行', '城市', '灯火', '山川']
+_SURNAMES = ['余', '郑', '林', '陈', '周', '王', '李', '张', '刘', '赵', '孙', '吴']
+_GIVEN = ['翊', '润泽', '京', '一', '晨', '宇', '星', '然', '思', '乐', '安', '远', '宁', '阳']
+
+
+def synthetic_tracks(count, seed=0):
+    """生成用于测试的大量歌曲，音频和封面循环使用初始数据"""
+    rng = random.Random(seed)
+    tracks = []
+    for i in range(count):
+        base = SEED_TRACKS[i % len(SEED_TRACKS)]
+        tracks.append({
+            **base,
+            "title": ''.join(rng.sample(_WORDS, rng.randint(1, 3))) + f" {i + 1}",
+            "artist": rng.choice(_SURNAMES) + rng.choice(_GIVEN)
+        })
+    return tracks
+
+
+def build_catalog(db_path=DB_PATH, tracks=SEED_TRACKS, playlists=SEED_PLAYLISTS):
+    """写入歌曲、歌单和全文索引；playlists 为 [(歌单名, 歌曲在 tracks 中的下标列表)]"""
+    tmp_path = f'{db_path}.{os.getpid()}.tmp'
+    if os.path.exists(tmp_path):
+        os.remove(tmp_path)
+    conn = sqlite3.connect(tmp_path)
+    try:
+        conn.executescript(SCHEMA)
+        conn.executemany(
+            'INSERT INTO tracks (id, title, artist, url, file, cover) VALUES (?, ?, ?, ?, ?, ?)',
+            ((i + 1, track['title'], track['artist'], track['url'], track.get('file'), track.get('cover'))
+             for i, track in enumerate(tracks))
+        )
+        conn.execute("INSERT INTO tracks_fts (tracks_fts) VALUES ('rebuild')")
+        for name, indices in playlists:
+            playlist_id = conn.execute('INSERT INTO playlists (name) VALUES (?)', (name,)).lastrowid
+            conn.executemany('INSERT INTO playlist_tracks (playlist_id, position, track_id) VALUES (?, ?, ?)',
+                             ((playlist_id, position, index + 1) for position, index in enumerate(indices)))
+        conn.commit()
+    finally:
+        conn.close()
+    os.replace(tmp_path, db_path)
+
+
+def _fts_query(query):
+    """把用户输入转换为FTS5查询：每个词作为一个短语，词之间为AND"""
+    return ' '.join('"' + term.replace('"', '""') + '"' for term in query.split())
+
+
+class MusicCatalog:
+    """只读访问音乐目录，每个线程使用自己的连接，歌曲元数据在进程内共享LRU缓存"""
+
+    def __init__(self, db_path=DB_PATH, cache_size=TRACK_CACHE_SIZE):
+        if not os.path.exists(db_path):
+            build_catalog(db_path)
+        self.db_path = db_path
+        self.cache_size = cache_size
+        self._local = threading.local()
+        self._tracks = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _conn(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(f'file:{self.db_path}?mode=ro', uri=True)
+            conn.row_factory = sqlite3.Row
+            self._local.conn = conn
+        return conn
+
+    def _remember(self, track):
+        with self._lock:
+            self._tracks[track['id']] = track
+            self._tracks.move_to_end(track['id'])
+            while len(self._tracks) > self.cache_size:
+                self._tracks.popitem(last=False)
+
+    def track(self, track_id):
+        """单首歌曲的元数据（先查进程内缓存）"""
+        with self._lock:
+            track = self._tracks.get(track_id)
+            if track is not None:
+                self._tracks.move_to_end(track_id)
+                return track
+        row = self._conn().execute('SELECT * FROM tracks WHERE id = ?', (track_id,)).fetchone()
+        if row is None:
+            raise KeyError(track_id)
+        track = dict(row)
+        self._remember(track)
+        return track
+
+    def prefetch(self, track_ids):
+        """预先把歌曲元数据读入缓存，切歌时不再查询数据库"""
+        with self._lock:
+            missing = [track_id for track_id in track_ids if track_id not in self._tracks]
+        if missing:
+            rows = self._conn().execute(
+                f"SELECT * FROM tracks WHERE id IN ({','.join('?' * len(missing))})", missing
+            )
+            for row in rows:
+                self._remember(dict(row))
+
+    def track_count(self):
+        return self._conn().execute('SELECT COUNT(*) FROM tracks').fetchone()[0]
+
+    def playlists(self):
+        return [dict(row) for row in self._conn().execute('SELECT id, name FROM playlists ORDER BY id')]
+
+    def playlist_length(self, playlist_id):
+        return self._conn().execute('SELECT COUNT(*) FROM playlist_tracks WHERE playlist_id = ?',
+                                    (playlist_id,)).fetchone()[0]
+
+    def playlist_track_ids(self, playlist_id):
+        """歌单中按顺序排列的歌曲id（作为播放列表保存在会话状态中）"""
+        return [row[0] for row in self._conn().execute(
+            'SELECT track_id FROM playlist_tracks WHERE playlist_id = ? ORDER BY position', (playlist_id,)
+        )]
+
+    def playlist_page(self, playlist_id, page=1, page_size=PAGE_SIZE):
+        """歌单的一页歌曲（按位置范围查询主键，不使用OFFSET扫描）"""
+        start = (page - 1) * page_size
+        rows = self._conn().execute(
+            'SELECT p.position, t.id, t.title, t.artist FROM playlist_tracks p JOIN tracks t ON t.id = p.track_id '
+            'WHERE p.playlist_id = ? AND p.position >= ? AND p.position < ? ORDER BY p.position',
+            (playlist_id, start, start + page_size)
+        )
+        return [dict(row) for row in rows]
+
+    def _search_sql(self, query):
+        # 3个字符以上的词走全文索引，短词作为子串条件在全文索引缩小后的结果上过滤；
+        # 全部是短词时按id顺序扫描歌曲表，凑满一页即停止。
+        # 两种匹配都不区分ASCII字母大小写（trigram默认不区分大小写，LIKE对ASCII字母不区分大小写）
+        terms = query.split()
+        long_terms = [term for term in terms if len(term) >= MIN_FTS_CHARS]
+        short_terms = [term for term in terms if len(term) < MIN_FTS_CHARS]
+        if long_terms:
+            sql = ('SELECT t.id, t.title, t.artist FROM tracks_fts f JOIN tracks t ON t.id = f.rowid '
+                   'WHERE tracks_fts MATCH ?')
+            params = [_fts_query(' '.join(long_terms))]
+        else:
+            sql = 'SELECT t.id, t.title, t.artist FROM tracks t WHERE 1'
+            params = []
+        for term in short_terms:
+            sql += " AND (t.title LIKE ? ESCAPE '\\' OR t.artist LIKE ? ESCAPE '\\')"
+            pattern = '%' + term.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_') + '%'
+            params += [pattern, pattern]
+        return sql + ' ORDER BY t.id', params
+
+    def search(self, query, page=1, page_size=PAGE_SIZE):
+        """按标题和歌手搜索，返回 (这一页的歌曲, 是否还有下一页)"""
+        if not query.split():
+            return [], False
+        sql, params = self._search_sql(query)
+        rows = self._conn().execute(f'{sql} LIMIT ? OFFSET ?', (*params, page_size + 1, (page - 1) * page_size))
+        rows = [dict(row) for row in rows]
+        return rows[:page_size], len(rows) > page_size
+
+    def search_ids(self, query, limit=MAX_QUEUE):
+        """搜索结果的歌曲id（最多 limit 首），用作播放列表"""
+        if not query.split():
+            return []
+        sql, params = self._search_sql(query)
+        return [row[0] for row in self._conn().execute(f'{sql} LIMIT ?', (*params, limit))]
+
+
+def main():
+    parser = argparse.ArgumentParser(description='生成音乐目录数据库')
+    parser.add_argument('--db', default=DB_PATH)
+    parser.add_argument('--synthetic-tracks', type=int, default=0, help='额外生成指定数量的测试歌曲及包含它们的歌单')
+    args = parser.parse_args()
+
+    tracks, playlists = list(SEED_TRACKS), list(SEED_PLAYLISTS)
+    if args.synthetic_tracks:
+        tracks += synthetic_tracks(args.synthetic_tracks)
+        playlists.append((f"测试歌单（{args.synthetic_tracks}首）", list(range(len(SEED_TRACKS), len(tracks)))))
+    build_catalog(args.db, tracks, playlists)
+    conn = sqlite3.connect(args.db)
+    counts = {table: conn.execute(f'SELECT COUNT(*) FROM {table}').fetchone()[0]
+              for table in ['tracks', 'playlists', 'playlist_tracks']}
+    conn.close()
+    print(f"已生成 {args.db}（{os.path.getsize(args.db) / 2 ** 20:.1f} MB）: "
+          + '，'.join(f'{table} {count} 行' for table, count in counts.items()))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,94 @@
+import math
+
+import numpy as np
+import pandas as pd
+
+PAGE_SIZES = [20, 50, 100]
+
+
+class PagedTable:
+    """服务端分页、排序和筛选的表格：每列的排序顺序预先计算一次，每次重跑只取出当前页的行"""
+
+    def __init__(self, df):
+        self.df = df.reset_index(drop=True)
+        self.columns = list(self.df.columns)
+        self.numeric_columns = [col for col in self.columns if pd.api.types.is_numeric_dtype(self.df[col])]
+        self.category_columns = [col for col in self.columns if col not in self.numeric_columns]
+        self.values = {col: self.df[col].to_numpy() for col in self.columns}
+        # 每列的升序行号；降序时倒序使用
+        self.orders = {col: np.argsort(self.values[col], kind='stable') for col in self.columns}
+        self.ranges = {col: (float(self.values[col].min()), float(self.values[col].max()))
+                       for col in self.numeric_columns} if len(self.df) else {}
+        self.categories = {col: sorted(self.df[col].dropna().unique().tolist()) for col in self.category_columns}
+
+    def __len__(self):
+        return len(self.df)
+
+    def filter_mask(self, filters):
+        """filters: {列名: (最小值, 最大值)} 或 {列名: [允许的取值]}，返回行掩码，没有筛选条件时返回None"""
+        mask = None
+        for col, condition in (filters or {}).items():
+            values = self.values[col]
+            if col in self.numeric_columns:
+                low, high = condition
+                if (low, high) == self.ranges.get(col):
+                    continue
+                col_mask = (values >= low) & (values <= high)
+            else:
+                if set(condition) >= set(self.categories[col]):
+                    continue
+                col_mask = np.isin(values, list(condition))
+            mask = col_mask if mask is None else mask & col_mask
+        return mask
+
+    def row_order(self, sort_by=None, ascending=True, filters=None):
+        """按排序和筛选条件返回行号数组，排序使用预先计算的顺序，不在每次重跑时重新排序"""
+        if sort_by is None:
+            order = np.arange(len(self.df))
+        else:
+            order = self.orders[sort_by]
+            if not ascending:
+                order = order[::-1]
+        mask = self.filter_mask(filters)
+        if mask is not None:
+            order = order[mask[order]]
+        return order
+
+    def page(self, order, page=1, page_size=50):
+        """按 row_order 返回的行号取出第 page 页的行"""
+        start = (page - 1) * page_size
+        return self.df.take(order[start:start + page_size])
+
+
+def render_paged_table(table, key, page_size=50):
+    """显示分页表格：排序、筛选和翻页都在服务端完成，只把当前页的行发送到浏览器"""
+    import streamlit as st
+
+    control_cols = st.columns([2, 1, 1])
+    with control_cols[0]:
+        sort_by = st.selectbox('排序列', ['（原始顺序）'] + table.columns, key=f'{key}_sort_by')
+    with control_cols[1]:
+        ascending = st.radio('顺序', ['升序', '降序'], horizontal=True, key=f'{key}_order') == '升序'
+    with control_cols[2]:
+        page_size = st.selectbox('每页行数', PAGE_SIZES, index=PAGE_SIZES.index(page_size)
+                                 if page_size in PAGE_SIZES else 0, key=f'{key}_page_size')
+
+    filters = {}
+    with st.expander('筛选'):
+        for col in table.category_columns:
+            filters[col] = st.multiselect(col, table.categories[col], default=table.categories[col], key=f'{key}_filter_{col}')
+        for col in table.numeric_columns:
+            low, high = table.ranges[col]
+            if low < high:
+                filters[col] = st.slider(col, min_value=low, max_value=high, value=(low, high), key=f'{key}_filter_{col}')
+
+    sort_column = None if sort_by == '（原始顺序）' else sort_by
+    order = table.row_order(sort_column, ascending, filters)
+    page_count = max(math.ceil(len(order) / page_size), 1)
+    # 筛选后页数变少时，把页码限制在有效范围内
+    page_key = f'{key}_page'
+    st.session_state[page_key] = min(st.session_state.get(page_key, 1), page_count)
+    page = st.number_input('页码', min_value=1, max_value=page_count, step=1, key=page_key)
+
+    st.dataframe(table.page(order, page, page_size), width='stretch', hide_index=True)
+    st.caption(f'第 {page} / {page_count} 页，共 {len(order):,} 行（全部 {len(table):,} 行）')
@@ -0,0 +1,49 @@
+import hashlib
+import os
+
+import pandas as pd
+
+from encoding_utils import sniff_file_encoding
+
+DATA_PATH = '（企鹅识别数据）penguins-chinese.csv'
+CACHE_DIR = '.data_cache'
+
+
+def file_hash(path, block_size=1 << 20):
+    """计算文件内容的SHA-1，作为缓存的版本号"""
+    digest = hashlib.sha1()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(block_size), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def cache_path_for(path, digest):
+    stem = os.path.splitext(os.path.basename(path))[0]
+    return os.path.join(CACHE_DIR, f'{stem}-{digest[:16]}.feather')
+
+
+def load_penguins(path=DATA_PATH):
+    """加载企鹅数据，返回 (DataFrame, 加载方式)
+
+    同一版本的文件只解析一次CSV：首次加载时从样本判断编码，
+    解析后写入列式缓存，之后直接读取缓存。
+    """
+    digest = file_hash(path)
+    cache_path = cache_path_for(path, digest)
+
+    if os.path.exists(cache_path):
+        return pd.read_feather(cache_path), 'cache'
+
+    encoding = sniff_file_encoding(path)
+    df = pd.read_csv(path, encoding=encoding)
+
+    try:
+        os.makedirs(CACHE_DIR, exist_ok=True)
+        tmp_path = cache_path + '.tmp'
+        df.to_feather(tmp_path)
+        os.replace(tmp_path, cache_path)
+    except OSError as e:
+        print(f"无法写入数据缓存: {e}")
+
+    return df, f'csv:{encoding}'
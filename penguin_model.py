@@ -0,0 +1,110 @@
+import numpy as np
+import pandas as pd
+
+MODEL_PATH = 'penguin_model.pkl'
+
+# 批量分类文件需要的列（与训练数据列名一致）
+INPUT_COLUMNS = ['企鹅栖息的岛屿', '喙的长度', '喙的深度', '翅膀的长度', '身体质量', '性别', '观测年份']
+NUMERIC_COLUMNS = ['喙的长度', '喙的深度', '翅膀的长度', '身体质量', '观测年份']
+
+# 需要先标准化特征的模型
+SCALED_MODELS = ['SVM', 'KNN', 'Logistic Regression']
+
+SPECIES_COLUMN = '预测种类'
+CONFIDENCE_COLUMN = '置信度'
+
+
+def encode_batch(model_data, df):
+    """把企鹅测量数据批量编码为特征矩阵，返回 (特征矩阵, 有效行掩码)
+
+    缺失值或无法识别的岛屿/性别所在的行标记为无效，不参与预测。
+    """
+    missing = [col for col in INPUT_COLUMNS if col not in df.columns]
+    if missing:
+        raise ValueError(f"缺少必要的列: {', '.join(missing)}")
+
+    label_encoders = model_data['label_encoders']
+    columns = {col: df[col].to_numpy(dtype=np.float64) for col in NUMERIC_COLUMNS}
+    # 按训练时的类别顺序取编码，未知取值和缺失值的编码为-1
+    columns['岛屿_编码'] = pd.Categorical(df['企鹅栖息的岛屿'], categories=label_encoders['岛屿'].classes_).codes
+    columns['性别_编码'] = pd.Categorical(df['性别'], categories=label_encoders['性别'].classes_).codes
+
+    X = np.column_stack([columns[name] for name in model_data['feature_names']]).astype(np.float64)
+    valid = (columns['岛屿_编码'] >= 0) & (columns['性别_编码'] >= 0) & ~np.isnan(X).any(axis=1)
+    return X, valid
+
+
+def predict_proba_matrix(model_data, X):
+    """对编码后的特征矩阵执行一次 predict_proba，需要时先标准化"""
+    X = pd.DataFrame(X, columns=model_data['feature_names'])
+    if model_data['model_name'] in SCALED_MODELS:
+        X = model_data['scaler'].transform(X)
+    return model_data['model'].predict_proba(X)
+
+
+def classify_frame(model_data, df):
+    """批量分类，返回带预测种类、置信度和各类别概率列的DataFrame"""
+    species_names = model_data['label_encoders']['种类'].classes_
+    species_by_column = species_names[model_data['model'].classes_]
+
+    X, valid = encode_batch(model_data, df)
+    probabilities = np.full((len(df), len(species_by_column)), np.nan)
+    if valid.any():
+        probabilities[valid] = predict_proba_matrix(model_data, X[valid])
+
+    result = df.copy()
+    best = np.argmax(np.nan_to_num(probabilities), axis=1)
+    result[SPECIES_COLUMN] = np.where(valid, species_by_column[best], None)
+    result[CONFIDENCE_COLUMN] = np.where(valid, probabilities[np.arange(len(df)), best], np.nan)
+    for i, species in enumerate(species_by_column):
+        result[f'概率_{species}'] = probabilities[:, i]
+    return result
+
+
+def classify_in_chunks(model_data, source, encoding='utf-8', chunksize=50000):
+    """分块读取企鹅测量CSV并批量分类，每块产出一个结果DataFrame"""
+    for chunk in pd.read_csv(source, encoding=encoding, chunksize=chunksize):
+        yield classify_frame(model_data, chunk)
+
+
+class FastEncoder:
+    """由模型文件预先构建的单行编码器
+
+    岛屿和性别通过字典查找取编码，特征按固定位置写入一行NumPy数组，
+    标准化直接使用 scaler 的均值和标准差数组，不再构建DataFrame。
+    """
+
+    def __init__(self, model_data):
+        label_encoders = model_data['label_encoders']
+        self.island_codes = {label: code for code, label in enumerate(label_encoders['岛屿'].classes_)}
+        self.sex_codes = {label: code for code, label in enumerate(label_encoders['性别'].classes_)}
+
+        positions = {name: i for i, name in enumerate(model_data['feature_names'])}
+        self.n_features = len(positions)
+        self.bill_length_pos = positions['喙的长度']
+        self.bill_depth_pos = positions['喙的深度']
+        self.flipper_length_pos = positions['翅膀的长度']
+        self.body_mass_pos = positions['身体质量']
+        self.island_pos = positions['岛屿_编码']
+        self.sex_pos = positions['性别_编码']
+        self.year_pos = positions['观测年份']
+
+        self.scaled = model_data['model_name'] in SCALED_MODELS
+        if self.scaled:
+            scaler = model_data['scaler']
+            self.mean = np.asarray(scaler.mean_, dtype=np.float64)
+            self.scale = np.asarray(scaler.scale_, dtype=np.float64)
+
+    def encode(self, island, bill_length, bill_depth, flipper_length, body_mass, sex, year):
+        """编码一只企鹅的测量数据，返回形状为 (1, 特征数) 的数组，未知的岛屿或性别抛出 KeyError"""
+        row = np.empty((1, self.n_features), dtype=np.float64)
+        row[0, self.bill_length_pos] = bill_length
+        row[0, self.bill_depth_pos] = bill_depth
+        row[0, self.flipper_length_pos] = flipper_length
+        row[0, self.body_mass_pos] = body_mass
+        row[0, self.island_pos] = self.island_codes[island]
+        row[0, self.sex_pos] = self.sex_codes[sex]
+        row[0, self.year_pos] = year
+        if self.scaled:
+            row = (row - self.mean) / self.scale
+        return row
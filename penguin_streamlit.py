@@ -1,15 +1,17 @@
 import streamlit as st
 import pandas as pd
-import numpy as np
-import matplotlib.pyplot as plt
-import seaborn as sns
-import joblib
-import plotly.express as px
-import plotly.graph_objects as go
-from plotly.subplots import make_subplots
+import time
 import warnings
 warnings.filterwarnings('ignore')
 
+import inference_client
+import model_registry
+import tracing
+from encoding_utils import sniff_encoding
+from image_assets import show_image
+from penguin_data import load_penguins
+from penguin_model import SPECIES_COLUMN, FastEncoder, classify_in_chunks
+
 # 设置页面配置
 st.set_page_config(
     page_title="企鹅分类识别系统", 
@@ -18,31 +20,17 @@ st.set_page_config(
     initial_sidebar_state="expanded"
 )
 
-# 设置中文字体
-plt.rcParams['font.sans-serif'] = ['SimHei', 'DejaVu Sans', 'Arial']
-plt.rcParams['axes.unicode_minus'] = False
-
 @st.cache_data
 def load_data():
     """加载企鹅数据"""
     try:
-        encodings = ['utf-8', 'gbk', 'gb2312', 'latin-1']
-        df = None
-        
-        for encoding in encodings:
-            try:
-                df = pd.read_csv('（企鹅识别数据）penguins-chinese.csv', encoding=encoding)
-                print(f"成功使用 {encoding} 编码加载数据")
-                break
-            except:
-                continue
-                
-        if df is None:
-            st.error("无法解码数据文件")
-            return None
-            
+        df, source = load_penguins()
+        if source == 'cache':
+            print("从缓存加载企鹅数据")
+        else:
+            print(f"成功使用 {source.split(':', 1)[1]} 编码加载数据")
         return df
-    except Exception as e:
+    except (OSError, ValueError) as e:
         st.error(f"加载数据失败: {e}")
         return None
 
@@ -50,14 +38,29 @@ def load_data():
 def load_model():
     """加载训练好的模型"""
     try:
-        model_data = joblib.load('penguin_model.pkl')
+        model_data = model_registry.load_or_publish('penguin')
         return model_data
     except Exception as e:
         st.error(f"加载模型失败: {e}")
         return None
 
+@st.cache_resource
+def load_encoder(_model_data):
+    """根据模型文件构建单行特征编码器"""
+    return FastEncoder(_model_data)
+
 def main():
     """主函数"""
+    # 开启 PERF_TRACE 时记录本次重跑各阶段的耗时
+    tracing.begin_rerun('penguin_streamlit.py', '企鹅分类预测')
+    try:
+        render()
+    finally:
+        tracing.end_rerun()
+    tracing.debug_panel()
+
+def render():
+    """渲染页面"""
     
     # 标题和介绍
     st.title("企鹅分类识别系统")
@@ -77,8 +80,10 @@ def main():
         """)
     
     # 加载数据
-    df = load_data()
-    model_data = load_model()
+    with tracing.span('load_data'):
+        df = load_data()
+    with tracing.span('load_model'):
+        model_data = load_model()
     
     st.header("企鹅分类预测")
     
@@ -151,42 +156,21 @@ def main():
         predict_btn = st.button("进行预测", type="primary", width="stretch")
             
     if predict_btn:
-        # 准备预测数据
-        prediction_data = {
-            '企鹅栖息的岛屿': island,
-            '喙的长度': bill_length,
-            '喙的深度': bill_depth,
-            '翅膀的长度': flipper_length,
-            '身体质量': body_mass,
-            '性别': gender,
-            '观测年份': year
-        }
-        
         try:
             # 进行预测
             model = model_data['model']
-            scaler = model_data['scaler']
             label_encoders = model_data['label_encoders']
-            feature_names = model_data['feature_names']
             
-            # 预处理数据
-            pred_df = pd.DataFrame([prediction_data])
+            # 预处理数据：直接编码为一行特征数组，需要标准化的模型已完成标准化
+            with tracing.span('encode'):
+                X_pred = load_encoder(model_data).encode(
+                    island, bill_length, bill_depth, flipper_length, body_mass, gender, year
+                )
             
-            # 编码分类变量
-            pred_df['岛屿_编码'] = label_encoders['岛屿'].transform(pred_df['企鹅栖息的岛屿'])
-            pred_df['性别_编码'] = label_encoders['性别'].transform(pred_df['性别'])
-            
-            # 选择特征
-            X_pred = pred_df[feature_names]
-            
-            # 预测
-            if model_data['model_name'] in ['SVM', 'KNN', 'Logistic Regression']:
-                X_pred_scaled = scaler.transform(X_pred)
-                prediction = model.predict(X_pred_scaled)[0]
-                probabilities = model.predict_proba(X_pred_scaled)[0]
-            else:
-                prediction = model.predict(X_pred)[0]
-                probabilities = model.predict_proba(X_pred)[0]
+            # 预测：配置了推理服务时由服务合并请求批量预测，否则在本进程内预测
+            with tracing.span('predict'):
+                probabilities = inference_client.predict('penguin', X_pred)[0]
+            prediction = model.classes_[probabilities.argmax()]
             
             # 解码预测结果
             species_names = label_encoders['种类'].classes_
@@ -207,17 +191,21 @@ def main():
                 '概率': probabilities
             }).sort_values('概率', ascending=False)
             
-            # 创建柱状图
-            fig = px.bar(
-                prob_df, 
-                x='企鹅种类', 
-                y='概率',
-                color='概率',
-                color_continuous_scale='Blues',
-                title="各类别预测概率"
-            )
-            fig.update_layout(showlegend=False)
-            st.plotly_chart(fig, use_container_width=True)
+            # 创建柱状图（plotly只在首次预测时导入，加快启动）
+            import plotly.express as px
+            
+            with tracing.span('figure:probabilities'):
+                fig = px.bar(
+                    prob_df, 
+                    x='企鹅种类', 
+                    y='概率',
+                    color='概率',
+                    color_continuous_scale='Blues',
+                    title="各类别预测概率"
+                )
+                fig.update_layout(showlegend=False)
+            with tracing.span('plotly_chart:probabilities'):
+                st.plotly_chart(fig, use_container_width=True)
             
             # 企鹅图片展示
             st.subheader("企鹅图片")
@@ -229,10 +217,74 @@ def main():
             }
             
             if predicted_species in penguin_images:
-                st.image(penguin_images[predicted_species], width=300)
+                show_image(penguin_images[predicted_species], 300)
             
         except Exception as e:
             st.error(f"预测失败: {e}")
+    
+    # 批量分类
+    st.header("批量分类")
+    st.markdown("上传包含 企鹅栖息的岛屿、喙的长度、喙的深度、翅膀的长度、身体质量、性别、观测年份 列的CSV文件，系统将批量识别企鹅种类。")
+    
+    uploaded_file = st.file_uploader("上传企鹅测量数据", type="csv")
+    
+    if uploaded_file is not None and st.button("批量分类", width="stretch"):
+        # 根据文件开头判断编码
+        encoding = sniff_encoding(uploaded_file.read(65536))
+        uploaded_file.seek(0)
+        
+        progress_bar = st.progress(0.0, text="正在分类...")
+        results = []
+        classified_rows = 0
+        start_time = time.perf_counter()
+        
+        try:
+            for chunk_result in tracing.traced_iter('classify_batch_chunk', classify_in_chunks(model_data, uploaded_file, encoding=encoding)):
+                results.append(chunk_result)
+                classified_rows += len(chunk_result)
+                elapsed = time.perf_counter() - start_time
+                progress_bar.progress(
+                    min(uploaded_file.tell() / max(uploaded_file.size, 1), 1.0),
+                    text=f"已分类 {classified_rows:,} 条，{classified_rows / max(elapsed, 1e-9):,.0f} 条/秒"
+                )
+        except (ValueError, UnicodeDecodeError) as e:
+            progress_bar.empty()
+            st.error(f"批量分类失败: {e}")
+        else:
+            elapsed = time.perf_counter() - start_time
+            progress_bar.progress(1.0, text=f"已分类 {classified_rows:,} 条")
+            result_df = pd.concat(results, ignore_index=True) if results else pd.DataFrame()
+            # 结果保存在会话状态中，点击下载按钮后仍然可用
+            st.session_state.penguin_batch = {
+                'data': result_df.to_csv(index=False).encode('utf-8-sig'),
+                'counts': result_df[SPECIES_COLUMN].fillna('无法识别').value_counts() if results else pd.Series(dtype=int),
+                'rows': classified_rows,
+                'seconds': elapsed,
+                'file_name': f"{uploaded_file.name.rsplit('.', 1)[0]}_分类结果.csv"
+            }
+    
+    if 'penguin_batch' in st.session_state:
+        batch = st.session_state.penguin_batch
+        
+        metric_cols = st.columns(3)
+        with metric_cols[0]:
+            st.metric("分类数量", f"{batch['rows']:,}")
+        with metric_cols[1]:
+            st.metric("耗时", f"{batch['seconds']:.2f} 秒")
+        with metric_cols[2]:
+            st.metric("吞吐量", f"{batch['rows'] / max(batch['seconds'], 1e-9):,.0f} 条/秒")
+        
+        st.subheader("各种类数量")
+        with tracing.span('dataframe:batch_counts'):
+            st.dataframe(batch['counts'].rename_axis('企鹅种类').reset_index(name='数量'), hide_index=True)
+        
+        st.download_button(
+            "📥 下载分类结果",
+            data=batch['data'],
+            file_name=batch['file_name'],
+            mime="text/csv",
+            on_click="ignore"
+        )
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -0,0 +1,67 @@
+import threading
+import time
+from collections import OrderedDict
+
+
+class PredictionCache:
+    """线程安全的LRU预测缓存，条目超过存活时间后失效"""
+
+    def __init__(self, maxsize=4096, ttl=3600):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def make_key(row):
+        """用编码后的特征向量作为缓存键"""
+        return tuple(float(value) for value in row)
+
+    def get(self, key):
+        """命中时返回缓存值并刷新LRU顺序，否则返回None"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                value, stored_at = entry
+                if self.ttl is None or time.monotonic() - stored_at < self.ttl:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return value
+                del self._entries[key]
+            self.misses += 1
+            return None
+
+    def put(self, key, value):
+        with self._lock:
+            self._entries[key] = (value, time.monotonic())
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def get_or_compute(self, row, compute):
+        """按特征向量查询缓存，未命中时调用 compute(row) 并写入缓存"""
+        key = self.make_key(row)
+        value = self.get(key)
+        if value is None:
+            value = compute(row)
+            self.put(key, value)
+        return value
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def stats(self):
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                'size': len(self._entries),
+                'maxsize': self.maxsize,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': self.hits / total if total else 0.0
+            }
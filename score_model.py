@@ -0,0 +1,52 @@
+import pandas as pd
+
+# 与 train_model.py 保持一致的编码方案
+GENDER_CODES = {'男': 0, '女': 1}
+MAJORS = ['人工智能', '大数据管理', '工商管理', '电子商务', '财务管理']
+NUMERIC_COLUMNS = ['每周学习时长（小时）', '上课出勤率', '期中考试分数', '作业完成率']
+RAW_COLUMNS = ['性别', '专业'] + NUMERIC_COLUMNS
+
+# 模型特征顺序（与 features.pkl 相同）
+FEATURES = ['性别'] + NUMERIC_COLUMNS + [f'专业_{major}' for major in MAJORS]
+
+PREDICTION_COLUMN = '预测期末考试分数'
+
+
+def encode_students(df, features=FEATURES):
+    """将原始学生数据编码为模型特征矩阵"""
+    missing = [col for col in RAW_COLUMNS if col not in df.columns]
+    if missing:
+        raise ValueError(f"缺少必要的列: {', '.join(missing)}")
+
+    unknown_genders = set(df['性别'].unique()) - set(GENDER_CODES)
+    if unknown_genders:
+        raise ValueError(f"无法识别的性别取值: {', '.join(map(str, unknown_genders))}")
+    unknown_majors = set(df['专业'].unique()) - set(MAJORS)
+    if unknown_majors:
+        raise ValueError(f"无法识别的专业: {', '.join(map(str, unknown_majors))}")
+
+    encoded = pd.DataFrame(index=df.index)
+    encoded['性别'] = df['性别'].map(GENDER_CODES)
+    for col in NUMERIC_COLUMNS:
+        # 空值和非数字文本转为NaN后拒绝，行号从数据第1行（表头之后）开始计，分块读取时沿用整个文件的行号
+        values = pd.to_numeric(df[col], errors='coerce')
+        bad_rows = df.index[values.isna()]
+        if len(bad_rows):
+            rows = ', '.join(str(i + 1) for i in bad_rows[:5])
+            more = f" 等 {len(bad_rows)} 行" if len(bad_rows) > 5 else ""
+            raise ValueError(f"{col} 存在缺失或非数字的值: 第 {rows} 行{more}")
+        encoded[col] = values
+    # 独热编码使用固定的专业列表，避免某个批次缺少专业时列不齐
+    for major in MAJORS:
+        encoded[f'专业_{major}'] = (df['专业'] == major).astype(int)
+
+    return encoded[features]
+
+
+def predict_in_chunks(model, features, source, chunksize=10000):
+    """分块读取学生CSV并逐块批量预测，每块产出一个带预测列的DataFrame"""
+    for chunk in pd.read_csv(source, chunksize=chunksize):
+        X = encode_students(chunk, features)
+        result = chunk.copy()
+        result[PREDICTION_COLUMN] = model.predict(X).round(2)
+        yield result
@@ -1,5 +1,10 @@
 import streamlit as st
 
+import media_cache
+import media_server
+import tracing
+from episode_catalog import PAGE_SIZE, EpisodeCatalog
+
 # 设置页面配置
 st.set_page_config(page_title="视频网站", page_icon="🎬", layout="wide")
 
@@ -95,95 +100,124 @@ st.markdown("""
 </style>
 """, unsafe_allow_html=True)
 
-# 创建视频数据列表
-videos = [
-    {
-        "id": 1,
-        "title": "还珠格格第一部",
-        "episode": "第1集",
-        "url": "https://media.w3.org/2010/05/sintel/trailer.mp4",
-        "cover": "https://images.unsplash.com/photo-1536440136628-849c177e76a1?ixlib=rb-1.2.1&auto=format&fit=crop&w=200&q=80",
-        "description": "《还珠格格第一部》是一部经典的古装言情剧，讲述了乾隆皇帝的女儿紫薇到北京与失散多年的父亲相认的故事。剧中充满了爱情、友情和亲情的感人故事，深受观众喜爱。",
-        "cast": [
-            {"name": "赵薇", "role": "小燕子", "photo": "https://images.unsplash.com/photo-1534528741775-53994a69daeb?ixlib=rb-1.2.1&auto=format&fit=crop&w=100&q=80"},
-            {"name": "林心如", "role": "紫薇", "photo": "https://images.unsplash.com/photo-1534528741775-53994a69daeb?ixlib=rb-1.2.1&auto=format&fit=crop&w=100&q=80"},
-            {"name": "苏有朋", "role": "五阿哥", "photo": "https://images.unsplash.com/photo-1534528741775-53994a69daeb?ixlib=rb-1.2.1&auto=format&fit=crop&w=100&q=80"}
-        ]
-    },
-    {
-        "id": 2,
-        "title": "还珠格格第一部",
-        "episode": "第2集",
-        "url": "https://www.w3schools.com/html/mov_bbb.mp4",
-        "cover": "https://images.unsplash.com/photo-1536440136628-849c177e76a1?ixlib=rb-1.2.1&auto=format&fit=crop&w=200&q=80",
-        "description": "在这一集中，小燕子和紫薇继续她们的冒险，遇到了更多的挑战和机遇。她们的友谊面临考验，同时也收获了新的朋友和支持者。",
-        "cast": [
-            {"name": "赵薇", "role": "小燕子", "photo": "https://images.unsplash.com/photo-1534528741775-53994a69daeb?ixlib=rb-1.2.1&auto=format&fit=crop&w=100&q=80"},
-            {"name": "林心如", "role": "紫薇", "photo": "https://images.unsplash.com/photo-1534528741775-53994a69daeb?ixlib=rb-1.2.1&auto=format&fit=crop&w=100&q=80"},
-            {"name": "苏有朋", "role": "五阿哥", "photo": "https://images.unsplash.com/photo-1534528741775-53994a69daeb?ixlib=rb-1.2.1&auto=format&fit=crop&w=100&q=80"}
-        ]
-    },
-    {
-        "id": 3,
-        "title": "还珠格格第一部",
-        "episode": "第3集",
-        "url": "https://media.w3.org/2010/05/bunny/trailer.mp4",
-        "cover": "https://images.unsplash.com/photo-1536440136628-849c177e76a1?ixlib=rb-1.2.1&auto=format&fit=crop&w=200&q=80",
-        "description": "剧情进一步发展，小燕子和紫薇的身份之谜逐渐揭开，她们面临着来自宫廷的种种挑战。在朋友的帮助下，她们勇敢地面对困难，展现了坚强的意志和智慧。",
-        "cast": [
-            {"name": "赵薇", "role": "小燕子", "photo": "https://images.unsplash.com/photo-1534528741775-53994a69daeb?ixlib=rb-1.2.1&auto=format&fit=crop&w=100&q=80"},
-            {"name": "林心如", "role": "紫薇", "photo": "https://images.unsplash.com/photo-1534528741775-53994a69daeb?ixlib=rb-1.2.1&auto=format&fit=crop&w=100&q=80"},
-            {"name": "苏有朋", "role": "五阿哥", "photo": "https://images.unsplash.com/photo-1534528741775-53994a69daeb?ixlib=rb-1.2.1&auto=format&fit=crop&w=100&q=80"}
-        ]
-    }
-]
+# 剧集目录：剧集和演职人员保存在SQLite数据库中，每次重跑只查询当前页的集数和当前剧集的详情
+@st.cache_resource
+def load_catalog():
+    return EpisodeCatalog()
+
+catalog = load_catalog()
+GRID_COLUMNS = 3
 
 # 初始化会话状态
-if 'current_video_index' not in st.session_state:
-    st.session_state.current_video_index = 0
+series_list = catalog.series()
+if 'current_series_id' not in st.session_state:
+    st.session_state.current_series_id = series_list[0]['id']
+if 'current_episode_id' not in st.session_state:
+    st.session_state.current_episode_id = catalog.first_episode_id(st.session_state.current_series_id)
+if 'episode_page' not in st.session_state:
+    st.session_state.episode_page = 1
 
-# 获取当前视频
-current_video = videos[st.session_state.current_video_index]
+def select_episode(episode_id):
+    st.session_state.current_episode_id = episode_id
 
-# 页面标题
-st.title("📺 视频网站")
+def change_page(step):
+    st.session_state.episode_page += step
 
-# 主内容区域
-col1, col2 = st.columns([2, 1])
+def select_series():
+    # 切换剧集后回到第一页和第一集
+    st.session_state.episode_page = 1
+    st.session_state.current_episode_id = catalog.first_episode_id(st.session_state.current_series_id)
 
-with col1:
-    # 视频标题
-    st.subheader(f"{current_video['title']} - {current_video['episode']}")
-    
-    # 视频播放器
-    st.video(current_video['url'])
-    
-    # 剧集介绍
-    st.markdown("### 📖 剧集介绍")
-    st.write(current_video['description'])
+# 播放区域：点击集数按钮时只重跑这一部分，不重新执行整个页面脚本
+@st.fragment
+def episode_player():
+    with tracing.fragment_span('sp.py', 'episode_player'):
+        # 获取当前视频（只查询这一集的详情和演职人员）
+        with tracing.span('catalog'):
+            current_video = catalog.episode(st.session_state.current_episode_id)
+            series_id = current_video['series_id']
+            page_count = max(1, -(-catalog.episode_count(series_id) // PAGE_SIZE))
+            st.session_state.episode_page = min(max(st.session_state.episode_page, 1), page_count)
+            page_episodes = catalog.episode_page(series_id, st.session_state.episode_page)
+        # 封面和演职人员照片从本地媒体缓存提供，相同的URL只下载一次
+        with tracing.span('media_cache'):
+            local_media = media_cache.resolve_many(
+                [current_video['cover']] + [person['photo'] for person in current_video['cast']]
+            )
+        
+        # 主内容区域
+        col1, col2 = st.columns([2, 1])
+        
+        with col1:
+            # 视频标题
+            st.subheader(f"{current_video['title']} - {current_video['label']}")
+            
+            # 视频播放器：media/ 目录中有该剧集且配置了媒体服务时，由媒体服务按Range请求流式传输
+            st.video(media_server.stream_url(current_video['file'], current_video['url']))
+            
+            # 剧集介绍
+            st.markdown("### 📖 剧集介绍")
+            st.write(current_video['description'])
+        
+        with col2:
+            # 视频封面
+            st.image(local_media[current_video['cover']], caption="剧集封面")
+            
+            # 集数选择：分页显示，每页 PAGE_SIZE 集
+            st.markdown("### 🎯 选择集数")
+            grid = st.columns(GRID_COLUMNS)
+            for i, episode in enumerate(page_episodes):
+                with grid[i % GRID_COLUMNS]:
+                    st.button(episode['label'], key=f"episode_{episode['id']}", use_container_width=True,
+                              type="primary" if episode['id'] == current_video['id'] else "secondary",
+                              on_click=select_episode, args=(episode['id'],))
+            if page_count > 1:
+                col_prev, col_page, col_next = st.columns([1, 2, 1])
+                with col_prev:
+                    st.button("◀", key="episode_prev_page", disabled=st.session_state.episode_page <= 1,
+                              on_click=change_page, args=(-1,))
+                with col_page:
+                    st.caption(f"第 {st.session_state.episode_page} / {page_count} 页")
+                with col_next:
+                    st.button("▶", key="episode_next_page", disabled=st.session_state.episode_page >= page_count,
+                              on_click=change_page, args=(1,))
+            
+            # 演职人员
+            st.markdown("### 👥 演职人员")
+            for person in current_video['cast']:
+                col_pic, col_info = st.columns([1, 2])
+                with col_pic:
+                    st.image(local_media[person['photo']], width=80)
+                with col_info:
+                    st.write(f"**{person['name']}**")
+                    st.write(f"角色：{person['role']}")
+                st.write("---")
 
-with col2:
-    # 视频封面
-    st.image(current_video['cover'], caption="剧集封面")
-    
-    # 集数选择
-    st.markdown("### 🎯 选择集数")
-    for i, video in enumerate(videos):
-        if st.button(f"第{i+1}集", key=f"episode_{i}", use_container_width=True):
-            st.session_state.current_video_index = i
-            st.rerun()
-    
-    # 演职人员
-    st.markdown("### 👥 演职人员")
-    for person in current_video['cast']:
-        col_pic, col_info = st.columns([1, 2])
-        with col_pic:
-            st.image(person['photo'], width=80)
-        with col_info:
-            st.write(f"**{person['name']}**")
-            st.write(f"角色：{person['role']}")
-        st.write("---")
-
-# 页脚
-st.markdown("---")
-st.markdown("© 2025 视频网站 | 设计与开发：Streamlit")
+def render():
+    """页面内容"""
+    # 页面标题
+    st.title("📺 视频网站")
+
+    # 目录中有多部剧时可以切换
+    if len(series_list) > 1:
+        series_titles = {series['id']: series['title'] for series in series_list}
+        st.selectbox("选择剧集", list(series_titles), format_func=series_titles.get,
+                     key="current_series_id", on_change=select_series)
+
+    episode_player()
+
+    # 页脚
+    st.markdown("---")
+    st.markdown("© 2025 视频网站 | 设计与开发：Streamlit")
+
+def main():
+    """主函数"""
+    # 开启 PERF_TRACE 时记录本次重跑的耗时；提前结束的重跑（st.stop、st.rerun、异常）也在 finally 中记录
+    tracing.begin_rerun('sp.py')
+    try:
+        render()
+    finally:
+        tracing.end_rerun()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+import os
+
+import numpy as np
+
+DATA_PATH = 'student_data_adjusted_rounded.csv'
+
+# 专项分析默认选中的专业及详细数据表格展示的列
+FOCUS_MAJOR = '大数据管理'
+DETAIL_COLUMNS = ['性别', '每周学习时长（小时）', '上课出勤率', '期中考试分数', '期末考试分数']
+
+
+def data_version(path=DATA_PATH):
+    """以文件修改时间和大小作为数据版本号，文件变化时版本随之变化"""
+    stat = os.stat(path)
+    return f'{stat.st_mtime_ns}-{stat.st_size}'
+
+
+def build_major_index(df):
+    """按专业排序一次并记录每个专业的行范围，任一专业的数据都是排序后数据的连续切片；
+    同时计算各专业的人数、平均出勤率和期末平均分"""
+    order = np.argsort(df['专业'].to_numpy(), kind='stable')
+    sorted_df = df.take(order).reset_index(drop=True)
+    majors = sorted_df['专业'].to_numpy()
+    names, starts, counts = np.unique(majors, return_index=True, return_counts=True)
+
+    means = sorted_df.groupby('专业', observed=True)[['上课出勤率', '期末考试分数']].mean().astype('float64')
+    index = {}
+    for name, start, count in zip(names, starts, counts):
+        index[name] = {
+            'start': int(start),
+            'stop': int(start + count),
+            'count': int(count),
+            'avg_attendance': round(float(means.at[name, '上课出勤率']), 4) * 100,
+            'avg_final': round(float(means.at[name, '期末考试分数']), 2)
+        }
+    return {'detail': sorted_df[DETAIL_COLUMNS], 'majors': index}
+
+
+def major_slice(major_index, major):
+    """返回某个专业的详细数据（排序后数据的切片视图，不扫描全部行）"""
+    entry = major_index['majors'][major]
+    return major_index['detail'].iloc[entry['start']:entry['stop']]
+
+
+def build_aggregates(df):
+    """一次性计算专业数据分析页面需要的全部统计结果"""
+    # 数值列可能以float32存储，统计结果统一转为float64后再取整
+    # 各专业每周平均学时、期中考试平均分和期末考试平均分
+    major_stats = df.groupby('专业', observed=True).agg({
+        '每周学习时长（小时）': 'mean',
+        '期中考试分数': 'mean',
+        '期末考试分数': 'mean'
+    }).astype('float64').round(2)
+    major_stats.columns = ['每周平均学时', '期中考试平均分', '期末考试平均分']
+
+    # 各专业男女人数及比例，男在前，女在后
+    gender_counts = df.groupby(['专业', '性别'], observed=True).size().unstack(fill_value=0)
+    gender_counts = gender_counts[['男', '女']]
+    gender_ratio = gender_counts.div(gender_counts.sum(axis=1), axis=0)
+    gender_ratio_long = gender_ratio.reset_index().melt(id_vars=['专业'], var_name='性别', value_name='比例')
+
+    gender_table = gender_counts.copy()
+    gender_table['总人数'] = gender_table['男'] + gender_table['女']
+    gender_table['男性比例(%)'] = (gender_table['男'] / gender_table['总人数']).round(4) * 100
+    gender_table['女性比例(%)'] = (gender_table['女'] / gender_table['总人数']).round(4) * 100
+    gender_table.columns = ['男性人数', '女性人数', '总人数', '男性比例(%)', '女性比例(%)']
+
+    # 各专业平均上课出勤率（百分比）
+    attendance_stats_percent = df.groupby('专业', observed=True)['上课出勤率'].mean().astype('float64').round(4) * 100
+    attendance_table = attendance_stats_percent.reset_index()
+    attendance_table.columns = ['专业', '平均出勤率(%)']
+
+    # 各专业期中期末成绩对比
+    comparison_table = major_stats[['期中考试平均分', '期末考试平均分', '每周平均学时']].reset_index()
+    comparison_table.columns = ['专业', '期中考试分数', '期末考试分数', '每周学习时长']
+
+    return {
+        'major_stats': major_stats,
+        'gender_ratio_long': gender_ratio_long,
+        'gender_table': gender_table.round(2),
+        'attendance_stats_percent': attendance_stats_percent,
+        'attendance_table': attendance_table.round(2),
+        'comparison_table': comparison_table.round(4),
+        'major_index': build_major_index(df)
+    }
@@ -0,0 +1,73 @@
+import os
+import sys
+
+import pandas as pd
+import pyarrow as pa
+
+from student_aggregates import DATA_PATH
+
+# 列式存储副本：Arrow IPC 文件格式（不压缩），可以直接内存映射读取
+ARROW_PATH = os.path.splitext(DATA_PATH)[0] + '.arrow'
+
+# 类别列和数值列的紧凑类型
+CATEGORY_COLUMNS = ['性别', '专业']
+FLOAT_COLUMNS = ['每周学习时长（小时）', '上课出勤率', '期中考试分数', '作业完成率', '期末考试分数']
+CSV_DTYPES = {
+    '学号': 'int64',
+    **{col: 'category' for col in CATEGORY_COLUMNS},
+    **{col: 'float32' for col in FLOAT_COLUMNS}
+}
+
+
+def read_csv(csv_path=DATA_PATH):
+    """读取CSV，并直接使用紧凑类型"""
+    return pd.read_csv(csv_path, dtype=CSV_DTYPES)
+
+
+def is_fresh(arrow_path=ARROW_PATH, csv_path=DATA_PATH):
+    """列式副本存在且不早于CSV时才可使用"""
+    return os.path.exists(arrow_path) and os.path.getmtime(arrow_path) >= os.path.getmtime(csv_path)
+
+
+def convert_to_arrow(csv_path=DATA_PATH, arrow_path=ARROW_PATH):
+    """把学生CSV转换为Arrow IPC文件，类别列存为字典编码，数值列存为float32"""
+    table = pa.Table.from_pandas(read_csv(csv_path), preserve_index=False)
+    # 先写临时文件再替换，避免其他进程读到写了一半的文件
+    tmp_path = arrow_path + '.tmp'
+    with pa.OSFile(tmp_path, 'wb') as sink:
+        with pa.ipc.new_file(sink, table.schema) as writer:
+            writer.write_table(table)
+    os.replace(tmp_path, arrow_path)
+    return arrow_path
+
+
+def read_arrow(arrow_path=ARROW_PATH):
+    """内存映射读取Arrow IPC文件"""
+    with pa.memory_map(arrow_path, 'r') as source:
+        table = pa.ipc.open_file(source).read_all()
+    # split_blocks 避免把各列合并成大块，数值列可以直接引用映射的内存
+    return table.to_pandas(split_blocks=True)
+
+
+def load_students(csv_path=DATA_PATH, arrow_path=ARROW_PATH, convert=True):
+    """优先读取列式副本；副本缺失或过期时重新转换，转换失败则回退到CSV"""
+    if not is_fresh(arrow_path, csv_path) and convert:
+        try:
+            convert_to_arrow(csv_path, arrow_path)
+        except OSError as e:
+            print(f"无法生成列式数据文件，使用CSV: {e}")
+
+    if is_fresh(arrow_path, csv_path):
+        try:
+            return read_arrow(arrow_path)
+        except (OSError, pa.ArrowInvalid) as e:
+            print(f"读取列式数据文件失败，使用CSV: {e}")
+
+    return read_csv(csv_path)
+
+
+if __name__ == '__main__':
+    csv_path = sys.argv[1] if len(sys.argv) > 1 else DATA_PATH
+    arrow_path = os.path.splitext(csv_path)[0] + '.arrow'
+    convert_to_arrow(csv_path, arrow_path)
+    print(f"已生成列式数据文件: {arrow_path}")
@@ -0,0 +1,233 @@
+import os
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# 通过环境变量开启：PERF_TRACE=1 记录耗时；PERF_TRACE_FILE 指定Prometheus文本文件路径，
+# PERF_TRACE_PORT 指定本地指标端口（/metrics）；PERF_TRACE_PANEL=1 或页面地址带 ?debug=1 时显示调试面板
+ENABLED = os.environ.get('PERF_TRACE', '').lower() in ('1', 'true', 'yes')
+METRICS_FILE = os.environ.get('PERF_TRACE_FILE', '')
+METRICS_PORT = int(os.environ.get('PERF_TRACE_PORT', 0) or 0)
+PANEL_ENABLED = os.environ.get('PERF_TRACE_PANEL', '').lower() in ('1', 'true', 'yes')
+
+# 直方图桶的上界（秒）
+BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+_histograms = {}
+_lock = threading.Lock()
+_local = threading.local()
+_server = None
+
+
+class _NoopSpan:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NOOP = _NoopSpan()
+
+
+class _Span:
+    __slots__ = ('name', 'start')
+
+    def __init__(self, name):
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        spans = getattr(_local, 'spans', None)
+        if spans is not None:
+            spans.append((self.name, time.perf_counter() - self.start))
+        return False
+
+
+class _FragmentRun:
+    __slots__ = ('script', 'name')
+
+    def __init__(self, script, name):
+        self.script = script
+        self.name = name
+
+    def __enter__(self):
+        begin_rerun(self.script, f'fragment:{self.name}')
+        return self
+
+    def __exit__(self, *exc):
+        end_rerun()
+        return False
+
+
+class _Histogram:
+    __slots__ = ('counts', 'total', 'count')
+
+    def __init__(self):
+        self.counts = [0] * len(BUCKETS)
+        self.total = 0.0
+        self.count = 0
+
+    def observe(self, seconds):
+        for i, bound in enumerate(BUCKETS):
+            if seconds <= bound:
+                self.counts[i] += 1
+        self.total += seconds
+        self.count += 1
+
+
+def span(name):
+    """计时一段代码：with tracing.span('load_data'): ...；未开启时返回空操作对象"""
+    if not ENABLED:
+        return _NOOP
+    return _Span(name)
+
+
+def fragment_span(script, name):
+    """在 st.fragment 函数中使用：整页重跑时计为其中的一段 fragment:<name>；
+    只重跑该 fragment 时单独计为页面 <script>/fragment:<name> 的一次重跑"""
+    if not ENABLED:
+        return _NOOP
+    if getattr(_local, 'spans', None) is not None:
+        return _Span(f'fragment:{name}')
+    return _FragmentRun(script, name)
+
+
+def traced_iter(name, iterable):
+    """逐个产出 iterable 的元素，每个元素的生成耗时单独计为一段"""
+    if not ENABLED:
+        return iterable
+    return _traced_iter(name, iterable)
+
+
+def _traced_iter(name, iterable):
+    iterator = iter(iterable)
+    while True:
+        with _Span(name):
+            try:
+                item = next(iterator)
+            except StopIteration:
+                return
+        yield item
+
+
+def begin_rerun(script, page=''):
+    """每次脚本重跑开始时调用，开始收集本次重跑的耗时"""
+    if not ENABLED:
+        return
+    _local.spans = []
+    _local.script = script
+    _local.page = page
+    _local.start = time.perf_counter()
+    _ensure_server()
+
+
+def set_page(page):
+    """确定本次重跑所属的页面，重跑中的所有耗时都归入该页面"""
+    if ENABLED:
+        _local.page = page
+
+
+def end_rerun():
+    """重跑结束时调用：把本次的耗时计入各页面的直方图，返回本次的 [(名称, 秒)] 列表"""
+    spans = getattr(_local, 'spans', None)
+    if not ENABLED or spans is None:
+        return []
+    spans.append(('rerun', time.perf_counter() - _local.start))
+    page = f'{_local.script}/{_local.page}' if _local.page else _local.script
+
+    with _lock:
+        for name, seconds in spans:
+            _histograms.setdefault((page, name), _Histogram()).observe(seconds)
+
+    _local.spans = None
+    _local.last_spans = spans
+    if METRICS_FILE:
+        write_metrics(METRICS_FILE)
+    return spans
+
+
+def snapshot():
+    """返回 {(页面, 阶段): (次数, 总秒数)}"""
+    with _lock:
+        return {key: (histogram.count, histogram.total) for key, histogram in _histograms.items()}
+
+
+def _escape(value):
+    return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def render_prometheus():
+    """以Prometheus文本格式输出所有直方图"""
+    lines = [
+        '# HELP streamlit_span_duration_seconds Duration of traced sections of Streamlit reruns.',
+        '# TYPE streamlit_span_duration_seconds histogram'
+    ]
+    with _lock:
+        for (page, name), histogram in sorted(_histograms.items()):
+            labels = f'page="{_escape(page)}",span="{_escape(name)}"'
+            for bound, count in zip(BUCKETS, histogram.counts):
+                lines.append(f'streamlit_span_duration_seconds_bucket{{{labels},le="{bound}"}} {count}')
+            lines.append(f'streamlit_span_duration_seconds_bucket{{{labels},le="+Inf"}} {histogram.count}')
+            lines.append(f'streamlit_span_duration_seconds_sum{{{labels}}} {histogram.total}')
+            lines.append(f'streamlit_span_duration_seconds_count{{{labels}}} {histogram.count}')
+    return '\n'.join(lines) + '\n'
+
+
+def write_metrics(path):
+    tmp_path = f'{path}.{os.getpid()}.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        f.write(render_prometheus())
+    os.replace(tmp_path, path)
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path != '/metrics':
+            self.send_error(404)
+            return
+        body = render_prometheus().encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/plain; version=0.0.4; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def _ensure_server():
+    """配置了端口时，在后台线程启动指标服务（每个进程一次）"""
+    global _server
+    if not METRICS_PORT or _server is not None:
+        return
+    with _lock:
+        if _server is None:
+            try:
+                _server = ThreadingHTTPServer(('127.0.0.1', METRICS_PORT), _MetricsHandler)
+            except OSError as e:
+                print(f"无法启动指标服务: {e}")
+                _server = False
+                return
+            threading.Thread(target=_server.serve_forever, daemon=True).start()
+            print(f"指标服务已启动: http://127.0.0.1:{METRICS_PORT}/metrics")
+
+
+def debug_panel():
+    """在侧边栏显示最近一次重跑的各段耗时"""
+    if not ENABLED:
+        return
+    import streamlit as st
+
+    if not (PANEL_ENABLED or st.query_params.get('debug') == '1'):
+        return
+    spans = getattr(_local, 'last_spans', None) or []
+    with st.sidebar.expander('⏱️ 本次重跑耗时', expanded=False):
+        st.dataframe(
+            [{'阶段': name, '耗时(ms)': round(seconds * 1000, 2)} for name, seconds in spans],
+            hide_index=True
+        )
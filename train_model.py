@@ -1,37 +1,170 @@
+import argparse
+import hashlib
+import itertools
+import json
+import os
+import resource
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
 import pandas as pd
-from sklearn.model_selection import train_test_split
+from sklearn.model_selection import KFold, train_test_split
 from sklearn.ensemble import RandomForestRegressor
+from sklearn.metrics import mean_absolute_error, mean_squared_error, r2_score
 import joblib
 
-# 读取数据
-df = pd.read_csv('student_data_adjusted_rounded.csv')
+import model_registry
+from forest_engine import CompiledForest
+from score_model import FEATURES, encode_students
+from student_aggregates import DATA_PATH, data_version
+
+TARGET = '期末考试分数'
+CACHE_DIR = '.train_cache'
+
+# 默认的超参数搜索网格，第一组即原来的配置
+PARAM_GRID = {
+    'n_estimators': [100],
+    'max_depth': [None, 20],
+    'min_samples_leaf': [1, 5]
+}
+
+
+def load_matrix(data_path, features):
+    """读取编码后的特征矩阵，按数据版本和特征列表缓存到磁盘，下次训练直接复用"""
+    key = hashlib.sha1(f'{os.path.abspath(data_path)}|{data_version(data_path)}|{features}'.encode('utf-8')).hexdigest()[:16]
+    cache_path = os.path.join(CACHE_DIR, f'features-{key}.npz')
+
+    if os.path.exists(cache_path):
+        cached = np.load(cache_path)
+        print(f"使用缓存的特征矩阵: {cache_path}")
+        return cached['X'], cached['y']
+
+    # 读取数据
+    df = pd.read_csv(data_path)
+
+    # 数据预处理：性别转换为数值（男=0，女=1），专业转换为独热编码，编码方案见 score_model.py
+    X = encode_students(df, features).to_numpy(dtype=np.float32)
+    y = df[TARGET].to_numpy(dtype=np.float64)
+
+    os.makedirs(CACHE_DIR, exist_ok=True)
+    np.savez(cache_path, X=X, y=y)
+    return X, y
+
+
+def expand_grid(grid):
+    """把参数网格展开为参数组合列表"""
+    keys = list(grid)
+    return [dict(zip(keys, values)) for values in itertools.product(*(grid[key] for key in keys))]
+
+
+def regression_metrics(y_true, y_pred):
+    return {
+        'mae': float(mean_absolute_error(y_true, y_pred)),
+        'rmse': float(np.sqrt(mean_squared_error(y_true, y_pred))),
+        'r2': float(r2_score(y_true, y_pred))
+    }
+
+
+def fit_and_score(params, X_train, y_train, X_eval, y_eval, seed):
+    """在子进程中训练一个模型并评估，返回指标、耗时和进程峰值内存"""
+    start = time.perf_counter()
+    model = RandomForestRegressor(random_state=seed, n_jobs=1, **params)
+    model.fit(X_train, y_train)
+    metrics = regression_metrics(y_eval, model.predict(X_eval))
+    metrics['seconds'] = time.perf_counter() - start
+    # 每个任务使用独立的子进程，ru_maxrss 即该任务的峰值内存（Linux下单位为KB）
+    metrics['peak_mb'] = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    return metrics
+
+
+def main():
+    parser = argparse.ArgumentParser(description='训练期末成绩预测模型')
+    parser.add_argument('--data', default=DATA_PATH, help='学生数据CSV')
+    parser.add_argument('--folds', type=int, default=5, help='交叉验证折数')
+    parser.add_argument('--workers', type=int, default=os.cpu_count(), help='并行进程数，默认使用全部CPU核心')
+    parser.add_argument('--grid', type=json.loads, default=PARAM_GRID, help='JSON格式的参数网格')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--report', default='training_report.json', help='训练报告输出路径')
+    args = parser.parse_args()
+
+    features = FEATURES
+    X, y = load_matrix(args.data, features)
+
+    # 划分训练集和测试集
+    X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, random_state=args.seed)
+
+    configs = expand_grid(args.grid)
+    folds = list(KFold(n_splits=args.folds, shuffle=True, random_state=args.seed).split(X_train))
+
+    # 所有参数组合的交叉验证和留出集评估一起并行执行
+    # max_tasks_per_child=1 让每个任务独占一个进程，便于统计各自的峰值内存
+    wall_start = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=args.workers, max_tasks_per_child=1) as pool:
+        cv_jobs = {
+            (i, k): pool.submit(fit_and_score, params, X_train[train_idx], y_train[train_idx],
+                                X_train[valid_idx], y_train[valid_idx], args.seed)
+            for i, params in enumerate(configs)
+            for k, (train_idx, valid_idx) in enumerate(folds)
+        }
+        holdout_jobs = {
+            i: pool.submit(fit_and_score, params, X_train, y_train, X_test, y_test, args.seed)
+            for i, params in enumerate(configs)
+        }
+
+        results = []
+        for i, params in enumerate(configs):
+            cv_scores = [cv_jobs[i, k].result() for k in range(len(folds))]
+            holdout = holdout_jobs[i].result()
+            cv_rmse = [score['rmse'] for score in cv_scores]
+            results.append({
+                'params': params,
+                'cv_rmse_mean': float(np.mean(cv_rmse)),
+                'cv_rmse_std': float(np.std(cv_rmse)),
+                'holdout': {key: holdout[key] for key in ('mae', 'rmse', 'r2')},
+                'fit_seconds': sum(score['seconds'] for score in cv_scores) + holdout['seconds'],
+                'peak_mb': max(score['peak_mb'] for score in cv_scores + [holdout])
+            })
+    search_seconds = time.perf_counter() - wall_start
+
+    for result in results:
+        print(f"{result['params']}  CV RMSE: {result['cv_rmse_mean']:.3f}±{result['cv_rmse_std']:.3f}  "
+              f"留出集 RMSE: {result['holdout']['rmse']:.3f}  R²: {result['holdout']['r2']:.4f}  "
+              f"训练耗时: {result['fit_seconds']:.1f}s  峰值内存: {result['peak_mb']:.0f}MB")
 
-# 数据预处理
-# 将性别转换为数值：男=0，女=1
-df['性别'] = df['性别'].map({'男': 0, '女': 1})
+    # 按交叉验证误差选出最优参数，使用全部核心在训练集上重新训练
+    best = min(results, key=lambda result: result['cv_rmse_mean'])
+    print(f"最优参数: {best['params']}")
 
-# 将专业转换为独热编码
-major_dummies = pd.get_dummies(df['专业'], prefix='专业')
-df = pd.concat([df, major_dummies], axis=1)
+    # 训练模型
+    model = RandomForestRegressor(random_state=args.seed, n_jobs=-1, **best['params'])
+    model.fit(pd.DataFrame(X_train, columns=features), y_train)
+    # 推理时单线程即可，避免每次预测都启动线程池
+    model.n_jobs = None
 
-# 选择特征和目标变量
-features = ['性别', '每周学习时长（小时）', '上课出勤率', '期中考试分数', '作业完成率'] + list(major_dummies.columns)
-target = '期末考试分数'
+    # 保存模型
+    joblib.dump(model, 'score_prediction_model.pkl')
 
-X = df[features]
-y = df[target]
+    # 保存特征列表
+    joblib.dump(features, 'features.pkl')
 
-# 划分训练集和测试集
-X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, random_state=42)
+    # 发布到模型注册表，应用加载展开后的推理引擎
+    version = model_registry.publish('student_score', {'engine': CompiledForest(model), 'features': features})
+    print(f"已发布到模型注册表: student_score@{version}")
 
-# 训练模型
-model = RandomForestRegressor(n_estimators=100, random_state=42)
-model.fit(X_train, y_train)
+    with open(args.report, 'w', encoding='utf-8') as f:
+        json.dump({
+            'data_version': data_version(args.data),
+            'rows': len(X),
+            'folds': args.folds,
+            'workers': args.workers,
+            'search_seconds': search_seconds,
+            'best_params': best['params'],
+            'results': results
+        }, f, ensure_ascii=False, indent=2)
 
-# 保存模型
-joblib.dump(model, 'score_prediction_model.pkl')
+    print(f"模型训练完成并保存成功！搜索耗时 {search_seconds:.1f} 秒，报告已写入 {args.report}")
 
-# 保存特征列表
-joblib.dump(features, 'features.pkl')
 
-print("模型训练完成并保存成功！")
\ No newline at end of file
+if __name__ == '__main__':
+    main()
@@ -1,8 +1,13 @@
 import streamlit as st
-import numpy as np
-import pandas as pd
-from sklearn.linear_model import LinearRegression
-from sklearn.preprocessing import LabelEncoder
+import gzip
+import io
+import os
+import time
+
+import model_registry
+import tracing
+from encoding_utils import sniff_encoding
+from insurance_model import PRICE_COLUMN, price_in_chunks, quote_charge
 
 # 设置页面配置
 st.set_page_config(
@@ -11,130 +16,173 @@ st.set_page_config(
     layout="wide"
 )
 
-# 创建侧边栏导航
-st.sidebar.title("导航")
-page = st.sidebar.radio(
-    "选择页面",
-    ["简介", "预测医疗费用"]
-)
+@st.cache_resource
+def load_model():
+    """加载医疗费用预测模型，所有会话共享同一份模型和编码器"""
+    return model_registry.load_or_publish('insurance')
 
-# 简介页面
-if page == "简介":
-    st.title("医疗费用预测应用")
-    st.write("=" * 50)
-    st.subheader("应用介绍")
-    st.write("这是一个基于机器学习的医疗费用预测应用。该应用使用线性回归模型，根据用户输入的个人信息预测未来可能的医疗费用支出。")
-    
-    st.subheader("功能特点")
-    st.write("- 📊 基于年龄、性别、BMI、子女数量、吸烟状态和区域等因素进行预测")
-    st.write("- 🎯 简单直观的用户界面，易于操作")
-    st.write("- 📈 实时显示预测结果")
-    st.write("- 💡 为保险公司的保险定价提供参考")
-    
-    st.subheader("使用方法")
-    st.write("1. 在侧边栏选择'预测医疗费用'页面")
-    st.write("2. 填写相关个人信息")
-    st.write("3. 系统将自动计算并显示预测的医疗费用")
-    
-    st.subheader("数据说明")
-    st.write("该模型基于公开的医疗费用数据集训练而成，数据包含了不同人群的医疗费用信息及其相关特征。")
+def render():
+    """页面内容"""
+    # 创建侧边栏导航
+    st.sidebar.title("导航")
+    page = st.sidebar.radio(
+        "选择页面",
+        ["简介", "预测医疗费用", "批量定价"]
+    )
+    tracing.set_page(page)
 
-# 预测医疗费用页面
-elif page == "预测医疗费用":
-    st.title("医疗费用预测")
-    st.write("=" * 50)
-    
-    # 使用说明
-    st.subheader("使用说明")
-    st.write("这个应用利用机器学习模型来预测医疗费用，为保险公司的保险定价提供参考。")
-    st.write("• 输入信息：在下面输入被保险人的个人信息、疾病信息等")
-    st.write("• 费用预测：应用会预测被保险人的未来医疗费用支出")
-    
-    # 创建输入表单
-    with st.form("prediction_form"):
-        col1, col2 = st.columns(2)
-        
-        with col1:
-            age = st.number_input("年龄", min_value=0, max_value=120, value=30)
-            sex = st.radio("性别", ["男性", "女性"], index=0)
-            bmi = st.number_input("BMI", min_value=0.0, max_value=70.0, value=25.0, step=0.1)
-        
-        with col2:
-            children = st.number_input("子女数量", min_value=0, max_value=10, value=0)
-            smoker = st.radio("是否吸烟", ["是", "否"], index=1)
-            region = st.selectbox("区域", ["东北部", "东南部", "西北部", "西南部"], index=0)
-        
-        submit_button = st.form_submit_button("预测费用")
-    
-    # 预测逻辑
-    if submit_button:
-        # 准备输入数据
-        input_data = {
-            'age': [age],
-            'sex': [sex],
-            'bmi': [bmi],
-            'children': [children],
-            'smoker': [smoker],
-            'region': [region]
-        }
-        
-        df = pd.DataFrame(input_data)
-        
-        # 读取真实数据并训练模型
-        # 使用GBK编码读取CSV文件
-        data = pd.read_csv('（医疗费用预测数据）insurance-chinese.csv', encoding='gbk')
-        
-        # 对分类变量进行编码
-        le_sex = LabelEncoder()
-        le_smoker = LabelEncoder()
-        le_region = LabelEncoder()
-        
-        data['性别'] = le_sex.fit_transform(data['性别'])
-        data['是否吸烟'] = le_smoker.fit_transform(data['是否吸烟'])
-        data['区域'] = le_region.fit_transform(data['区域'])
-        
-        # 划分特征和目标变量
-        X = data[['年龄', '性别', 'BMI', '子女数量', '是否吸烟', '区域']]
-        y = data['医疗费用']
-        
-        # 训练线性回归模型
-        model = LinearRegression()
-        model.fit(X, y)
-        
-        # 对输入数据进行编码
-        df['sex'] = le_sex.transform(df['sex'])
-        df['smoker'] = le_smoker.transform(df['smoker'])
-        df['region'] = le_region.transform(df['region'])
-        
-        # 重命名列名并调整顺序，使其与训练数据一致
-        df = df.rename(columns={
-            'age': '年龄',
-            'sex': '性别',
-            'bmi': 'BMI',
-            'children': '子女数量',
-            'smoker': '是否吸烟',
-            'region': '区域'
-        })
-        
-        # 确保特征顺序与训练数据一致
-        df = df[['年龄', '性别', 'BMI', '子女数量', '是否吸烟', '区域']]
-        
-        # 进行预测
-        prediction = model.predict(df)
-        
-        # 确保预测结果不为负数且不低于合理最小值（数据集中医疗费用的5%分位数）
-        prediction = max(1757.75, prediction[0])
-        
-        # 显示结果
-        st.subheader("预测结果")
-        st.info(f"根据您提供的信息，预测的年度医疗费用为：**¥{prediction:,.2f}**")
-        
-        st.subheader("费用分析")
-        st.write("• 年龄、BMI和吸烟状态是影响医疗费用的主要因素")
-        st.write("• 吸烟者的医疗费用通常是非吸烟者的2-3倍")
-        st.write("• 随着年龄的增长，医疗费用会逐渐增加")
+    # 简介页面
+    if page == "简介":
+        st.title("医疗费用预测应用")
+        st.write("=" * 50)
+        st.subheader("应用介绍")
+        st.write("这是一个基于机器学习的医疗费用预测应用。该应用使用线性回归模型，根据用户输入的个人信息预测未来可能的医疗费用支出。")
+        
+        st.subheader("功能特点")
+        st.write("- 📊 基于年龄、性别、BMI、子女数量、吸烟状态和区域等因素进行预测")
+        st.write("- 🎯 简单直观的用户界面，易于操作")
+        st.write("- 📈 实时显示预测结果")
+        st.write("- 💡 为保险公司的保险定价提供参考")
+        
+        st.subheader("使用方法")
+        st.write("1. 在侧边栏选择'预测医疗费用'页面")
+        st.write("2. 填写相关个人信息")
+        st.write("3. 系统将自动计算并显示预测的医疗费用")
+        
+        st.subheader("数据说明")
+        st.write("该模型基于公开的医疗费用数据集训练而成，数据包含了不同人群的医疗费用信息及其相关特征。")
+
+    # 预测医疗费用页面
+    elif page == "预测医疗费用":
+        st.title("医疗费用预测")
+        st.write("=" * 50)
+        
+        # 使用说明
+        st.subheader("使用说明")
+        st.write("这个应用利用机器学习模型来预测医疗费用，为保险公司的保险定价提供参考。")
+        st.write("• 输入信息：在下面输入被保险人的个人信息、疾病信息等")
+        st.write("• 费用预测：应用会预测被保险人的未来医疗费用支出")
+        
+        # 创建输入表单
+        with st.form("prediction_form"):
+            col1, col2 = st.columns(2)
+            
+            with col1:
+                age = st.number_input("年龄", min_value=0, max_value=120, value=30)
+                sex = st.radio("性别", ["男性", "女性"], index=0)
+                bmi = st.number_input("BMI", min_value=0.0, max_value=70.0, value=25.0, step=0.1)
+            
+            with col2:
+                children = st.number_input("子女数量", min_value=0, max_value=10, value=0)
+                smoker = st.radio("是否吸烟", ["是", "否"], index=1)
+                region = st.selectbox("区域", ["东北部", "东南部", "西北部", "西南部"], index=0)
+            
+            submit_button = st.form_submit_button("预测费用")
+        
+        # 预测逻辑
+        if submit_button:
+            # 查预先计算的报价表，请求路径上不调用sklearn
+            with tracing.span('load_model'):
+                model_data = load_model()
+            with tracing.span('predict'):
+                prediction = quote_charge(model_data, age, sex, bmi, children, smoker, region)
+            
+            # 显示结果
+            st.subheader("预测结果")
+            st.info(f"根据您提供的信息，预测的年度医疗费用为：**¥{prediction:,.2f}**")
+            
+            st.subheader("费用分析")
+            st.write("• 年龄、BMI和吸烟状态是影响医疗费用的主要因素")
+            st.write("• 吸烟者的医疗费用通常是非吸烟者的2-3倍")
+            st.write("• 随着年龄的增长，医疗费用会逐渐增加")
+
+    # 批量定价页面
+    elif page == "批量定价":
+        st.title("保单批量定价")
+        st.write("=" * 50)
+        
+        st.subheader("使用说明")
+        st.write("• 上传包含 年龄、性别、BMI、子女数量、是否吸烟、区域 列的CSV文件（UTF-8或GBK编码）")
+        st.write("• 文件按块读取和定价，结果以gzip压缩的CSV提供下载")
+        
+        uploaded_file = st.file_uploader("上传被保险人数据", type="csv")
+        
+        if uploaded_file is not None and st.button("开始定价"):
+            with tracing.span('load_model'):
+                model_data = load_model()
+            
+            # 根据文件开头判断编码
+            encoding = sniff_encoding(uploaded_file.read(65536))
+            uploaded_file.seek(0)
+            
+            # 丢弃上一次的定价结果
+            st.session_state.pop('pricing_result', None)
+            
+            # 结果逐块压缩写入内存，会话中只保存压缩后的数据，会话结束时随会话状态一起释放，不在磁盘上留下文件
+            output_buffer = io.BytesIO()
+            progress_bar = st.progress(0.0, text="正在定价...")
+            priced_rows = 0
+            total_charge = 0.0
+            start_time = time.perf_counter()
+            
+            try:
+                with gzip.open(output_buffer, 'wt', encoding='utf-8-sig', newline='') as output:
+                    for chunk in tracing.traced_iter('price_batch_chunk', price_in_chunks(model_data, uploaded_file, encoding=encoding)):
+                        chunk.to_csv(output, header=priced_rows == 0, index=False)
+                        priced_rows += len(chunk)
+                        total_charge += chunk[PRICE_COLUMN].sum()
+                        elapsed = time.perf_counter() - start_time
+                        progress_bar.progress(
+                            min(uploaded_file.tell() / max(uploaded_file.size, 1), 1.0),
+                            text=f"已定价 {priced_rows:,} 条，{priced_rows / max(elapsed, 1e-9):,.0f} 条/秒"
+                        )
+            except (ValueError, UnicodeDecodeError) as e:
+                progress_bar.empty()
+                st.error(f"批量定价失败: {e}")
+            else:
+                progress_bar.progress(1.0, text=f"已定价 {priced_rows:,} 条")
+                st.session_state.pricing_result = {
+                    'data': output_buffer.getvalue(),
+                    'rows': priced_rows,
+                    'total_charge': total_charge,
+                    'seconds': time.perf_counter() - start_time,
+                    'file_name': f"{os.path.splitext(uploaded_file.name)[0]}_定价结果.csv.gz"
+                }
+        
+        if 'pricing_result' in st.session_state:
+            pricing_result = st.session_state.pricing_result
+            
+            col1, col2, col3 = st.columns(3)
+            with col1:
+                st.metric("定价人数", f"{pricing_result['rows']:,}")
+            with col2:
+                st.metric("平均预测费用", f"¥{pricing_result['total_charge'] / max(pricing_result['rows'], 1):,.2f}")
+            with col3:
+                st.metric("吞吐量", f"{pricing_result['rows'] / max(pricing_result['seconds'], 1e-9):,.0f} 条/秒")
+            
+            st.download_button(
+                "📥 下载定价结果",
+                data=pricing_result['data'],
+                file_name=pricing_result['file_name'],
+                mime="application/gzip",
+                on_click="ignore"
+            )
+
+    # 添加页脚
+    st.sidebar.write("=" * 20)
+    st.sidebar.write("🏥 医疗费用预测应用")
+    st.sidebar.write("基于机器学习技术")
+
+def main():
+    """主函数"""
+    # 开启 PERF_TRACE 时记录本次重跑各阶段的耗时；提前结束的重跑（st.stop、st.rerun、异常）也在 finally 中记录
+    tracing.begin_rerun('yiliao.py')
+    try:
+        render()
+    finally:
+        tracing.end_rerun()
+    # 开启调试面板时在侧边栏显示本次重跑的耗时
+    tracing.debug_panel()
 
-# 添加页脚
-st.sidebar.write("=" * 20)
-st.sidebar.write("🏥 医疗费用预测应用")
-st.sidebar.write("基于机器学习技术")
\ No newline at end of file
+if __name__ == "__main__":
+    main()